@@ -5,7 +5,17 @@ from flask_minify import Minify
 from app.utils.helpers import ensure_https_filter, slugify_ascii
 from app.utils.translations import TranslationManager
 from app.models.data_loader import load_processed_books, load_processed_bestsellers
+from app.models.catalog_search import init_catalog_search
 from app.utils.context_processors import inject_global_template_variables
+from app.utils.template_cache import configure_bytecode_cache, precompile_templates
+from app.utils.assets import init_asset_fingerprinting
+from app.utils.url_builder import init_url_builder
+from app.utils.fragment_cache import init_fragment_cache
+from app.utils.response_cache import init_response_cache
+from app.utils.static_site import init_static_site
+from app.utils.streaming import init_streaming
+from app.utils.related_books import init_related_books
+from app.utils.edition_clusters import edition_similarity
 import logging
 import os  # Necesario para la configuración de logging
 
@@ -20,8 +30,16 @@ def create_app(config_class=Config):
     )
     app.config.from_object(config_class)
 
+    # Caché de páginas renderizadas (ETag/304, gzip) y servicio híbrido desde _site: sus endpoints se
+    # minifican una vez al cachearlos / escribirlos. Los hooks de la caché en memoria se registran antes.
+    # Los listados en streaming se minifican por bloques al generarse.
+    minify_bypass = init_response_cache(app)
+    minify_bypass += [p for p in init_static_site(app) + init_streaming(app) if p not in minify_bypass]
+
     # Flask-Minify (se basa en app.config['MINIFY_HTML'])
-    Minify(app=app, html=app.config.get('MINIFY_HTML', True), js=True, cssless=True)
+    # En build (StaticBuildConfig) se omite: generate_static.py minifica en su propia etapa con caché.
+    if app.config.get('MINIFY_HTML', True):
+        Minify(app=app, html=True, js=True, cssless=True, bypass=minify_bypass)
 
     # --- Configuración de Logging Detallado ---
     # Tu código de logging, asegurándose de que no haya conflicto si se corre desde generate_static.py
@@ -42,7 +60,8 @@ def create_app(config_class=Config):
             )
         ):
             app.logger.handlers.clear()  # Limpia los handlers por defecto de Flask si los hay
-            app.logger.setLevel(logging.DEBUG)  # O app.config.get('LOG_LEVEL', 'DEBUG').upper()
+            # Nivel configurable (antes fijo en DEBUG): en el build cada worker crea su app y no debe pagar logs de depuración
+            app.logger.setLevel(getattr(logging, str(app.config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO))
 
             log_dir = os.path.join(app.root_path, '..', 'logs')  # Asumiendo que logs está al nivel de la carpeta app
             os.makedirs(log_dir, exist_ok=True)
@@ -83,15 +102,19 @@ def create_app(config_class=Config):
     app.jinja_env.filters['ensure_https'] = ensure_https_filter
     app.jinja_env.filters['slugify_ascii'] = slugify_ascii
     app.context_processor(inject_global_template_variables)
+    configure_bytecode_cache(app)
+    init_fragment_cache(app)
+    init_asset_fingerprinting(app)
 
     # Cargar datos y gestor de traducciones
     # Usar try-except para robustez
     try:
-        app.books_data = load_processed_books(app.config['BOOKS_DATA_DIR'])
+        app.books_data = load_processed_books(app.config['BOOKS_DATA_DIR'], edition_similarity=edition_similarity(app.config))
         app.bestsellers_data = load_processed_bestsellers(app.config['BESTSELLERS_JSON_PATH'])
         app.translations_manager = TranslationManager(
             app.config['TRANSLATIONS_JSON_PATH'],
-            app.config['DEFAULT_LANGUAGE']
+            app.config['DEFAULT_LANGUAGE'],
+            warn_missing=app.config.get('TRANSLATION_MISSING_WARNINGS', True)
         )
         if not app.books_data:
             app.logger.error("CRITICAL ERROR: Book data not loaded (app.books_data is empty).")
@@ -108,10 +131,19 @@ def create_app(config_class=Config):
         # Podrías necesitar un TranslationManager dummy o manejar la ausencia
         app.translations_manager = None
 
+    init_catalog_search(app)
+    init_related_books(app)
+
     from app.routes.main_routes import main_bp
     from app.routes.sitemap_routes import sitemap_bp
+    from app.routes.api_routes import api_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(sitemap_bp)
+    app.register_blueprint(api_bp)
+    init_url_builder(app)
+
+    if app.config.get('PRECOMPILE_TEMPLATES', True):
+        precompile_templates(app)
 
     app.logger.info("BookList Application instance created and configured.")
     return app
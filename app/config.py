@@ -5,7 +5,18 @@ import os
 class Config:
     """Configuraciones base de la aplicación."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'una-clave-secreta-muy-dificil-de-adivinar'
-    MINIFY_HTML = True  # Opcional: si usas alguna extensión para minificar HTML
+    MINIFY_HTML = os.environ.get('MINIFY_HTML', '1') != '0'  # Minificación por respuesta (Flask-Minify) en servidor
+    # Minificación en build: los workers de generate_static.py minifican cada página antes de escribirla, con caché
+    # en disco por hash de entrada, acotada a MINIFY_CACHE_MAX_BYTES (se borran primero las entradas usadas hace más tiempo).
+    # Es independiente de MINIFY_HTML (el build desactiva Flask-Minify en el request, ver StaticBuildConfig).
+    MINIFY_HTML_BUILD = os.environ.get('MINIFY_HTML_BUILD', '1') != '0'
+    # Directorio base de las cachés en disco (minificación, bytecode de Jinja, índice de búsqueda, relacionados,
+    # manifest del build): relativo al directorio de trabajo, como las rutas de datos. Ignorado por git; con
+    # CACHE_DIR se puede sacar del checkout. Las rutas de abajo se derivan de él
+    CACHE_DIR = os.environ.get('CACHE_DIR', '.cache')
+    MINIFY_CACHE_DIR = os.path.join(CACHE_DIR, 'minify')
+    MINIFY_CACHE_MAX_BYTES = 512 * 1024 * 1024
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # Nivel del logger de la app (fuera de modo debug)
     SERVER_NAME = ''#'https://p4blo4p.github.io/libros-web-generator/' # Descomentar y ajustar para url_for(_external=True) si es necesario localmente
     # APPLICATION_ROOT = '/'
     PREFERRED_URL_SCHEME = 'https' # O 'https' si se sirve bajo HTTPS
@@ -14,10 +25,112 @@ class Config:
     BOOKS_DATA_DIR = 'data/books_collection/'
     BESTSELLERS_JSON_PATH = 'social/amazon_bestsellers_es.json'
     TRANSLATIONS_JSON_PATH = 'data/translations.json'
+    # Aviso en el log (una vez por idioma y clave) de las claves de traducción que faltan al renderizar
+    TRANSLATION_MISSING_WARNINGS = True
 
     # Carpetas de la aplicación Flask
     STATIC_FOLDER = 'static'
     TEMPLATE_FOLDER = 'templates'
+    # Caché de bytecode de Jinja en disco (bajo CACHE_DIR) y precarga al arrancar
+    TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(CACHE_DIR, 'jinja')
+    PRECOMPILE_TEMPLATES = True
+    # Fragmentos compartidos ({% cache_fragment %}: cabecera de assets, banners, aviso legal) renderizados una vez
+    # por (idioma, fragmento, entradas) y reutilizados entre páginas. El selector de idioma no se cachea: sus
+    # enlaces dependen de la URL de cada página y la clave no se repetiría nunca
+    FRAGMENT_CACHE = True
+    FRAGMENT_CACHE_MAX_ENTRIES = 4096
+    # Caché en memoria de páginas renderizadas en el servidor (libro, autor, versiones, índice) por URL y
+    # versión de datos, con variante gzip, ETag/Last-Modified y single-flight. Se desactiva en modo debug.
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', '1') != '0'
+    RESPONSE_CACHE_MAX_ENTRIES = 2048
+    RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    RESPONSE_CACHE_GZIP_LEVEL = 6
+    # Listados (autor, versiones y facetas) en streaming: el HTML se envía según Jinja lo genera, minificado
+    # por bloques de unos STREAM_FLUSH_BYTES (app/utils/streaming.py); la caché de respuestas solo guarda los
+    # que no superan RESPONSE_CACHE_STREAM_MAX_BYTES
+    STREAM_LISTING_PAGES = os.environ.get('STREAM_LISTING_PAGES', '1') != '0'
+    STREAM_FLUSH_BYTES = 16 * 1024
+    RESPONSE_CACHE_STREAM_MAX_BYTES = 1024 * 1024
+    # Servicio híbrido: las páginas se sirven desde el sitio generado si su firma sigue vigente y, si no,
+    # se renderizan y se escriben de vuelta. STATIC_SITE_MANIFEST es el manifest de generate_static.py.
+    STATIC_SITE_SERVING = os.environ.get('STATIC_SITE_SERVING', '0') == '1'
+    STATIC_SITE_OUTPUT_DIR = os.environ.get('STATIC_SITE_OUTPUT_DIR', '_site')
+    STATIC_SITE_MANIFEST = os.path.join(CACHE_DIR, 'generation_manifest.json')
+    STATIC_SITE_SERVED_LOG = os.path.join(CACHE_DIR, 'served_pages.jsonl')
+    # Assets de static/ con huella de contenido en el nombre (css/theme.<hash>.css) para caché de un año
+    STATIC_ASSET_FINGERPRINTING = True
+    STATIC_ASSET_MANIFEST = 'assets-manifest.json'
+
+    # Modo shell + datos del build (generate_static.py --shell-mode): solo los SHELL_FULL_RENDER_TOP libros con
+    # más valoraciones tienen HTML propio; el resto se sirve con el shell del idioma (vía 404.html o una regla
+    # del servidor hacia SHELL_DIR/<lang>/book.html) y sus datos en SHELL_DATA_SHARDS fragmentos JSON. Vía
+    # 404.html responden con estado 404 y todo usa rutas desde la raíz del dominio (ver app/utils/shell_build.py).
+    SHELL_FULL_RENDER_TOP = 1000
+    SHELL_DATA_SHARDS = 256
+    SHELL_DIR = '_shells'
+    SHELL_DATA_DIR = '_data/books'
+
+    # Índice de búsqueda estático de títulos y autores (lo escribe generate_static.py en las ejecuciones
+    # completas): fragmentos de tokens por prefijo de SEARCH_PREFIX_LEN caracteres y bloques de
+    # SEARCH_DOC_BLOCK documentos, bajo SEARCH_INDEX_DIR
+    SEARCH_INDEX_BUILD = True
+    SEARCH_INDEX_DIR = '_search'
+    SEARCH_PREFIX_LEN = 2
+    SEARCH_DOC_BLOCK = 64
+    # Búsqueda del servidor (/<lang>/search/ y /api/v1/suggest): índice FTS5 persistente en SEARCH_DB_PATH que
+    # solo reindexa los archivos de datos modificados, y autocompletado en memoria (prefijos de hasta
+    # SEARCH_SUGGEST_PRECOMPUTE_LEN caracteres precalculados)
+    SEARCH_SERVER_ENABLED = os.environ.get('SEARCH_SERVER_ENABLED', '1') != '0'
+    SEARCH_DB_PATH = os.path.join(CACHE_DIR, 'search.sqlite3')
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_SUGGEST_LIMIT = 10
+    SEARCH_SUGGEST_PRECOMPUTE_LEN = 2
+
+    # Libros relacionados (top RELATED_TOP_K por libro) precalculados por scripts/precompute_related.py o por
+    # generate_static.py en RELATED_BOOKS_PATH; los parámetros de candidatos se explican en app/utils/related_books.py
+    RELATED_BOOKS_PATH = os.path.join(CACHE_DIR, 'related_books.json')
+    RELATED_TOP_K = 6
+    RELATED_MAX_POSTINGS = 300
+    RELATED_CANDIDATE_CATEGORIES = 5
+    RELATED_PRESELECT = 50
+    RELATED_AUTHOR_WEIGHT = 8.0
+    RELATED_FULL_REBUILD_RATIO = 0.3
+
+    # Páginas de navegación por categoría, editorial y año (app/models/facet_index.py): solo los valores con al
+    # menos FACET_MIN_BOOKS libros; páginas de FACET_PAGE_SIZE libros de media con cortes estables
+    FACET_PAGES = True
+    FACET_MIN_BOOKS = 3
+    FACET_PAGE_SIZE = 48
+
+    # Páginas de autor paginadas (por título, con los mismos cortes estables que las de faceta): de media
+    # AUTHOR_PAGE_SIZE libros por página; la primera sigue en /<lang>/<autor>/<slug>/ y el resto en .../<n>/
+    AUTHOR_PAGE_SIZE = 48
+
+    # Clasificaciones (app/models/leaderboards.py): mejor valorados y más valorados (globales y por categoría) y
+    # mejores de cada año, con LEADERBOARD_SIZE libros. "Mejor valorados" exige LEADERBOARD_MIN_RATINGS
+    # valoraciones y solo tienen página las listas con al menos LEADERBOARD_MIN_ENTRIES libros
+    LEADERBOARDS = True
+    LEADERBOARD_SIZE = 50
+    LEADERBOARD_MIN_RATINGS = 100
+    LEADERBOARD_MIN_ENTRIES = 10
+
+    # Agrupación de ediciones al cargar los datos (app/utils/edition_clusters.py): por autor principal y
+    # similitud de título >= EDITION_SIMILARITY; el grupo se guarda en base_title_slug (páginas de versiones)
+    EDITION_CLUSTERING = True
+    EDITION_SIMILARITY = 0.75
+
+    # API JSON del catálogo (/api/v1): tamaño de página por defecto y máximo, campos devueltos si no se pide
+    # ?fields= y max-age de las respuestas (se revalidan con ETag)
+    API_PAGE_SIZE_DEFAULT = 50
+    API_PAGE_SIZE_MAX = 500
+    API_DEFAULT_FIELDS = (
+        'isbn10', 'isbn13', 'asin', 'title', 'author_list', 'author_slug', 'title_slug', 'base_title_slug',
+        'published_year', 'image_url'
+    )
+    API_CACHE_MAX_AGE = 300
+
+    # Sitemaps: además de cada .xml se escribe una copia .xml.gz (para servidores con gzip_static)
+    SITEMAP_GZIP = True
 
     # Configuraciones de idioma
     SUPPORTED_LANGUAGES = ['en', 'es', 'fr', 'it', 'de']
@@ -27,9 +140,13 @@ class Config:
     URL_SEGMENT_TRANSLATIONS = {
         'book': {'en': 'book', 'es': 'libro', 'fr': 'livre', 'it': 'libro', 'de': 'buch'},
         'author': {'en': 'author', 'es': 'autor', 'fr': 'auteur', 'it': 'autore', 'de': 'autor'},
-        'versions': {'en': 'versions', 'es': 'versiones', 'fr': 'versions', 'it': 'versioni', 'de': 'versionen'}
-        # Añade otros segmentos estructurales si los tienes, ej:  # E261 Corregido
-        # 'category': {'en': 'category', 'es': 'categoria', ...}
+        'versions': {'en': 'versions', 'es': 'versiones', 'fr': 'versions', 'it': 'versioni', 'de': 'versionen'},
+        # Navegación por faceta: no deben coincidir con los segmentos de libro, autor o versiones
+        'category': {'en': 'category', 'es': 'categoria', 'fr': 'categorie', 'it': 'categoria', 'de': 'kategorie'},
+        'publisher': {'en': 'publisher', 'es': 'editorial', 'fr': 'editeur', 'it': 'editore', 'de': 'verlag'},
+        'year': {'en': 'year', 'es': 'anio', 'fr': 'annee', 'it': 'anno', 'de': 'jahr'},
+        # Clasificaciones (el nombre de la lista, top-rated, most-rated o best-of, va después y no se traduce)
+        'top': {'en': 'top', 'es': 'mejores', 'fr': 'meilleurs', 'it': 'migliori', 'de': 'bestenliste'},
     }
 
     # Mapeo de endpoints a los segmentos de URL que deben ser traducidos
@@ -40,7 +157,31 @@ class Config:
         'main.book_by_identifier': {'book': 'book_url_segment'},
         'main.book_versions': {'versions': 'versions_url_segment'},
         'main.author_books': {'author': 'author_url_segment'},
+        'main.author_books_page': {'author': 'author_url_segment'},
         # 'main.index': {}, # No necesita segmentos traducibles en la ruta (aparte del lang_code)  # E261 Corregido
-        # Si tuvieras una ruta como /<lang_code>/<category_url_segment>/...  # E261 Corregido
-        # 'main.category_page': {'category': 'category_url_segment'},
+        # Facetas: índice de valores, primera página y páginas siguientes de cada tipo
+        'main.category_list': {'category': 'facet_url_segment'},
+        'main.category_books': {'category': 'facet_url_segment'},
+        'main.category_books_page': {'category': 'facet_url_segment'},
+        'main.publisher_list': {'publisher': 'facet_url_segment'},
+        'main.publisher_books': {'publisher': 'facet_url_segment'},
+        'main.publisher_books_page': {'publisher': 'facet_url_segment'},
+        'main.year_list': {'year': 'facet_url_segment'},
+        'main.year_books': {'year': 'facet_url_segment'},
+        'main.year_books_page': {'year': 'facet_url_segment'},
+        # Clasificaciones: índice, listas globales y listas por categoría o año
+        'main.leaderboard_list': {'top': 'top_url_segment'},
+        'main.leaderboard': {'top': 'top_url_segment'},
+        'main.leaderboard_scope': {'top': 'top_url_segment'},
     }
+
+
+class StaticBuildConfig(Config):
+    """Configuración usada por generate_static.py: sin minificación en el request (la hace el generador al escribir)."""
+    MINIFY_HTML = False
+    RESPONSE_CACHE = False  # Cada página se renderiza una sola vez
+    STATIC_SITE_SERVING = False  # El build es quien escribe el sitio
+    SEARCH_SERVER_ENABLED = False  # El sitio estático usa el índice de SEARCH_INDEX_DIR
+    TRANSLATION_MISSING_WARNINGS = False  # Las claves que faltan se informan una vez por build (informe de cobertura)
+    # Cada worker crea su propia app: solo avisos y errores de la app; el progreso lo informa el generador
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING')
@@ -0,0 +1,126 @@
+# app/models/catalog_index.py
+"""
+Índices en memoria del catálogo, construidos en una sola pasada sobre app.books_data y cacheados en la
+app (se reconstruyen si cambia la lista de libros cargada). Sustituyen los recorridos lineales del
+catálogo por búsquedas en diccionario: los usan la API JSON y el servicio híbrido desde _site.
+"""
+import threading
+from bisect import bisect_right
+
+from app.utils.pagination import stable_pages
+from app.utils.sitemap_engine import get_sitemap_buckets
+
+BOOK_IDENTIFIER_FIELDS = ('isbn10', 'isbn13', 'asin')
+
+
+def book_identifier(book):
+    return book.get('isbn10') or book.get('isbn13') or book.get('asin') or ''
+
+
+class SortedListing:
+    """
+    Libros ordenados por una clave estable, paginables por cursor (la última clave devuelta) con bisect.
+    La clave termina en la posición del libro en el catálogo: es única aunque haya libros con los mismos slugs
+    e identificador, así que un corte entre ellos no se salta ninguno.
+    """
+
+    def __init__(self, books, sort_key, positions):
+        pairs = sorted(((sort_key(b) + (positions[id(b)],), b) for b in books), key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.books = [book for _, book in pairs]
+        # Longitud de las claves (la de un cursor válido); None en un listado vacío, donde cualquier cursor vale
+        self.key_length = len(self.keys[0]) if self.keys else None
+
+    def __len__(self):
+        return len(self.books)
+
+    def page(self, after_key, limit):
+        """(libros, clave del último libro o None si no hay más) a partir de la clave after_key (exclusiva)."""
+        start = bisect_right(self.keys, tuple(after_key)) if after_key is not None else 0
+        end = min(start + limit, len(self.books))
+        next_key = self.keys[end - 1] if end < len(self.books) else None
+        return self.books[start:end], next_key
+
+
+def _title_sort_key(book):
+    return (book.get('title_slug') or '', book_identifier(book))
+
+
+def _catalog_sort_key(book):
+    return (book.get('author_slug') or '', book.get('title_slug') or '', book_identifier(book))
+
+
+class CatalogIndex:
+    def __init__(self, app, books):
+        self._app = app
+        self.by_url, self.by_identifier = {}, {}
+        books_by_author, books_by_version = {}, {}
+        fields = set()
+        for book in books:
+            a_slug, t_slug, bt_slug = book.get('author_slug'), book.get('title_slug'), book.get('base_title_slug')
+            for field in BOOK_IDENTIFIER_FIELDS:
+                ident = book.get(field)
+                if ident:
+                    # Mismo criterio que las rutas HTML: si hay duplicados gana el primero del catálogo
+                    self.by_url.setdefault((a_slug, t_slug, ident), book)
+                    self.by_identifier.setdefault(ident, book)
+            if a_slug:
+                books_by_author.setdefault(a_slug, []).append(book)
+                if bt_slug:
+                    books_by_version.setdefault((a_slug, bt_slug), []).append(book)
+            fields.update(book)
+        self.books_by_author = books_by_author
+        self.books_by_version = books_by_version
+        self.fields = frozenset(fields)
+        self._positions = {id(book): position for position, book in enumerate(books)}
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, cache_key, books, sort_key):
+        listing = self._listings.get(cache_key)
+        if listing is None:
+            listing = SortedListing(books, sort_key, self._positions)  # Se ordena una vez por lista, en su primera petición
+            with self._lock:
+                listing = self._listings.setdefault(cache_key, listing)
+        return listing
+
+    def author_listing(self, author_slug):
+        books = self.books_by_author.get(author_slug)
+        return self._listing(('author', author_slug), books, _title_sort_key) if books else None
+
+    def author_pages(self, author_slug):
+        """Páginas (listas de libros por título) del autor con cortes estables de AUTHOR_PAGE_SIZE, o None."""
+        listing = self.author_listing(author_slug)
+        if listing is None:
+            return None
+        cache_key = ('author_pages', author_slug)
+        pages = self._listings.get(cache_key)
+        if pages is None:
+            pages = stable_pages(listing.books, self._app.config.get('AUTHOR_PAGE_SIZE', 48))
+            with self._lock:
+                pages = self._listings.setdefault(cache_key, pages)
+        return pages
+
+    def versions_listing(self, author_slug, base_title_slug):
+        books = self.books_by_version.get((author_slug, base_title_slug))
+        return self._listing(('versions', author_slug, base_title_slug), books, _title_sort_key) if books else None
+
+    def char_group_keys(self):
+        return get_sitemap_buckets(self._app).keys()
+
+    def char_group_listing(self, char_key):
+        """Libros del grupo de sitemap char_key (inicial del autor o clave numérica del archivo de datos)."""
+        buckets = get_sitemap_buckets(self._app)
+        if char_key not in buckets.keys():
+            return None
+        return self._listing(('group', char_key), buckets.books_for(char_key), _catalog_sort_key)
+
+
+def get_catalog_index(app):
+    """Índice cacheado en la app (se invalida si cambia la lista de libros cargada), como los buckets de sitemap."""
+    books = getattr(app, 'books_data', []) or []
+    cached = getattr(app, '_catalog_index', None)
+    if cached is None or cached[0] is not books:
+        cached = (books, CatalogIndex(app, books))
+        app._catalog_index = cached
+    return cached[1]
@@ -0,0 +1,229 @@
+# app/models/catalog_search.py
+"""
+Búsqueda del catálogo en el despliegue dinámico (página /<lang>/search/ y autocompletado de la API).
+
+- Texto completo: tabla FTS5 de SQLite (SEARCH_DB_PATH) con los tokens normalizados de título y autor, los
+  mismos que el índice estático de app.utils.search_index. La base persiste entre arranques y se sincroniza
+  por archivo de datos (books_<n>.csv): solo se reindexan los archivos cuyo tamaño o fecha de modificación
+  cambiaron. Los resultados se ordenan por numRatings y average_rating.
+- Autocompletado: estructura en memoria (tokens ordenados para bisect, con sus libros por orden de ranking
+  y listas precalculadas para los prefijos cortos) que responde sin consultar la base.
+"""
+import heapq
+import os
+import sqlite3
+import threading
+from bisect import bisect_left
+
+from app.utils.search_index import book_tokens, document_key, normalize_tokens
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS shards (key TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, books INTEGER)",
+    "CREATE TABLE IF NOT EXISTS books (id INTEGER PRIMARY KEY, shard TEXT, position INTEGER, "
+    "num_ratings REAL, rating REAL)",
+    "CREATE INDEX IF NOT EXISTS books_shard ON books (shard)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5 (terms, prefix='2 3')",
+)
+
+
+def _to_float(value):
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+def rank_key(book):
+    """Orden de los resultados: más valoraciones primero y, a igualdad, mejor nota media."""
+    return (_to_float(book.get('numRatings')), _to_float(book.get('average_rating')))
+
+
+def _match_expression(tokens):
+    """Consulta FTS5: todos los tokens y el último también como prefijo (búsqueda mientras se escribe)."""
+    terms = [f'"{token}"' for token in tokens[:-1]]
+    return ' '.join(terms + [f'"{tokens[-1]}"*'])
+
+
+class CatalogSearch:
+    """Índice FTS5 persistente del catálogo cargado, sincronizado por archivo de datos."""
+
+    def __init__(self, db_path, books_dir, books):
+        self.db_path = db_path
+        self.books_dir = books_dir
+        self._local = threading.local()
+        self.shards = {}
+        for book in books:
+            self.shards.setdefault(book.get('source_file_key') or '', []).append(book)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)  # Transacciones explícitas
+            self._local.conn = conn
+        return conn
+
+    def _shard_signature(self, key):
+        """(tamaño, mtime_ns) de books_<key>.csv; None si el archivo no se puede identificar (siempre se reindexa)."""
+        if not key:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.books_dir, f"books_{key}.csv"))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def sync(self):
+        """Reindexa los archivos de datos que cambiaron y borra los que ya no están. Devuelve los reindexados."""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = self._connection()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        # BEGIN IMMEDIATE: con varios workers arrancando a la vez, solo uno reindexa y el resto ve su resultado
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = {key: (size, mtime_ns, count) for key, size, mtime_ns, count in conn.execute("SELECT * FROM shards")}
+            changed = []
+            for key in set(stored) - set(self.shards):
+                self._delete_shard(conn, key)
+            for key, books in self.shards.items():
+                signature = self._shard_signature(key)
+                if signature is not None and stored.get(key) == (*signature, len(books)):
+                    continue
+                self._delete_shard(conn, key)
+                self._insert_shard(conn, key, books)
+                if signature is not None:
+                    conn.execute("INSERT INTO shards VALUES (?, ?, ?, ?)", (key, *signature, len(books)))
+                changed.append(key)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    @staticmethod
+    def _delete_shard(conn, key):
+        conn.execute("DELETE FROM books_fts WHERE rowid IN (SELECT id FROM books WHERE shard = ?)", (key,))
+        conn.execute("DELETE FROM books WHERE shard = ?", (key,))
+        conn.execute("DELETE FROM shards WHERE key = ?", (key,))
+
+    @staticmethod
+    def _insert_shard(conn, key, books):
+        for position, book in enumerate(books):
+            if not document_key(book):
+                continue  # Sin página de detalle a la que enlazar
+            num_ratings, rating = rank_key(book)
+            row_id = conn.execute(
+                "INSERT INTO books (shard, position, num_ratings, rating) VALUES (?, ?, ?, ?)",
+                (key, position, num_ratings, rating)
+            ).lastrowid
+            conn.execute("INSERT INTO books_fts (rowid, terms) VALUES (?, ?)", (row_id, ' '.join(book_tokens(book))))
+
+    def search(self, query, limit, offset=0):
+        """(libros de la página, total de coincidencias) ordenados por ranking."""
+        tokens = normalize_tokens(query)
+        if not tokens:
+            return [], 0
+        conn = self._connection()
+        match = _match_expression(tokens)
+        total = conn.execute("SELECT count(*) FROM books_fts WHERE books_fts MATCH ?", (match,)).fetchone()[0]
+        rows = conn.execute(
+            "SELECT b.shard, b.position FROM books_fts JOIN books b ON b.id = books_fts.rowid "
+            "WHERE books_fts MATCH ? ORDER BY b.num_ratings DESC, b.rating DESC, b.id LIMIT ? OFFSET ?",
+            (match, limit, offset)
+        )
+        results = []
+        for shard, position in rows:
+            books = self.shards.get(shard)
+            if books is not None and position < len(books):
+                results.append(books[position])
+        return results, total
+
+
+class PrefixSuggester:
+    """Autocompletado en memoria: libros ordenados por ranking y, por token, las posiciones de sus libros."""
+
+    def __init__(self, books, precompute_len=2, per_prefix=10):
+        self.books = sorted((book for book in books if document_key(book)), key=rank_key, reverse=True)
+        self.doc_tokens = [frozenset(book_tokens(book)) for book in self.books]
+        postings = {}
+        for rank, tokens in enumerate(self.doc_tokens):
+            for token in tokens:
+                postings.setdefault(token, []).append(rank)  # Se recorren en orden de ranking: listas ya ordenadas
+        self.token_postings = postings
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+        self.per_prefix = per_prefix
+        # Prefijos cortos: demasiados tokens por prefijo para mezclarlos en cada petición
+        self.short_prefixes = {}
+        for token, ranks in zip(self.tokens, self.postings):
+            for length in range(1, min(precompute_len, len(token)) + 1):
+                self.short_prefixes.setdefault(token[:length], []).append(ranks[:per_prefix])
+        self.short_prefixes = {
+            prefix: self._first_unique(heapq.merge(*lists), per_prefix) for prefix, lists in self.short_prefixes.items()
+        }
+
+    @staticmethod
+    def _first_unique(ranks, limit, accept=None):
+        result, last = [], None
+        for rank in ranks:
+            if rank != last and (accept is None or accept(rank)):
+                result.append(rank)
+                if len(result) == limit:
+                    break
+            last = rank
+        return result
+
+    def _prefix_range(self, prefix):
+        """Listas de libros (por ranking) de los tokens que empiezan por prefix."""
+        start = bisect_left(self.tokens, prefix)
+        return self.postings[start:bisect_left(self.tokens, prefix + '\uffff', start)]
+
+    def suggest(self, query, limit=None):
+        limit = min(limit or self.per_prefix, self.per_prefix)
+        tokens = normalize_tokens(query)
+        if not tokens:
+            return []
+        *complete, prefix = tokens
+        if not complete and prefix in self.short_prefixes:
+            return [self.books[rank] for rank in self.short_prefixes[prefix][:limit]]
+        if any(token not in self.token_postings for token in complete):
+            return []
+        prefix_lists = self._prefix_range(prefix)
+        candidates, accept_rank = heapq.merge(*prefix_lists), None
+        if complete:
+            # Varias palabras: se recorre la lista de candidatos más corta (la palabra completa más rara o el
+            # rango del prefijo) y se filtra por el resto
+            required = set(complete)
+            shortest = min(complete, key=lambda token: len(self.token_postings[token]))
+            if len(self.token_postings[shortest]) < sum(len(ranks) for ranks in prefix_lists):
+                candidates = self.token_postings[shortest]
+
+            def accept(rank):
+                tokens_of_book = self.doc_tokens[rank]
+                return required <= tokens_of_book and any(token.startswith(prefix) for token in tokens_of_book)
+            accept_rank = accept
+        return [self.books[rank] for rank in self._first_unique(candidates, limit, accept_rank)]
+
+
+def init_catalog_search(app):
+    """
+    Sincroniza el índice FTS5 (solo los archivos de datos que cambiaron) y crea el autocompletado en memoria,
+    si SEARCH_SERVER_ENABLED está activo. Quedan en app.catalog_search y app.search_suggester.
+    """
+    if not app.config.get('SEARCH_SERVER_ENABLED', True):
+        return
+    books = getattr(app, 'books_data', []) or []
+    # Bajo CACHE_DIR, relativa al directorio de trabajo como el resto de cachés (ver Config)
+    db_path = app.config.get('SEARCH_DB_PATH') or os.path.join(app.config.get('CACHE_DIR', '.cache'), 'search.sqlite3')
+    search = CatalogSearch(db_path, app.config.get('BOOKS_DATA_DIR', ''), books)
+    try:
+        changed = search.sync()
+    except sqlite3.Error as e:
+        app.logger.error(f"No se pudo sincronizar el índice de búsqueda ({e}); búsqueda desactivada.")
+        return
+    if changed:
+        app.logger.info(f"Índice de búsqueda: reindexados {len(changed)} archivos de datos ({', '.join(sorted(changed))}).")
+    app.catalog_search = search
+    app.search_suggester = PrefixSuggester(
+        books, app.config.get('SEARCH_SUGGEST_PRECOMPUTE_LEN', 2), app.config.get('SEARCH_SUGGEST_LIMIT', 10)
+    )
@@ -5,6 +5,7 @@ import os
 import logging # <--- AÑADIR ESTA LÍNEA
 from flask import current_app # Sigue siendo útil si se corre en contexto de app
 from app.utils.helpers import slugify_ascii, load_json_file
+from app.utils.edition_clusters import cluster_editions
 
 
 def _process_book_row(row_data):
@@ -55,11 +56,12 @@ def _log_message(message, level_name="INFO"): # Cambiado level a level_name para
          print(f"[{level_name.upper()}] {message}", file=sys.stderr if level_name in ["ERROR", "WARNING"] else sys.stdout)
 
 
-def load_processed_books(directory_path, filename_filter_key=None):  # Cambiado nombre de parámetro
+def load_processed_books(directory_path, filename_filter_key=None, edition_similarity=None):  # Cambiado nombre de parámetro
     """
     Carga libros. Si filename_filter_key se proporciona (ej. '5'),
     solo carga de 'books_FILENAME_FILTER_KEY.csv'.
     Sino, carga de todos los CSVs en el directorio.
+    Con edition_similarity, base_title_slug pasa a ser el grupo de ediciones de cada libro (cluster_editions).
     """
     processed_books = []
     directory_path_str = str(directory_path)
@@ -90,11 +92,14 @@ def load_processed_books(directory_path, filename_filter_key=None):  # Cambiado
     for filename in files_to_process:
         csv_filepath = os.path.join(directory_path_str, filename)
         file_book_count = 0
+        # Clave del archivo de origen ('5' para books_5.csv): la usan los sitemaps por archivo de datos
+        source_file_key = filename[len('books_'):-len('.csv')] if filename.startswith('books_') else None
         try:
             with open(csv_filepath, mode='r', encoding='utf-8-sig') as csvfile:
                 reader = csv.DictReader(csvfile)
                 for row in reader:
                     processed_row = _process_book_row(row)
+                    processed_row['source_file_key'] = source_file_key
                     processed_books.append(processed_row)
                     file_book_count += 1
             _log_message(f"Cargados {file_book_count} libros desde '{csv_filepath}'")
@@ -104,6 +109,9 @@ def load_processed_books(directory_path, filename_filter_key=None):  # Cambiado
             _log_message(f"ERROR cargando/procesando libros desde '{csv_filepath}': {e}", "ERROR")
 
     _log_message(f"Total de libros cargados para esta llamada: {len(processed_books)}")
+    if edition_similarity is not None and processed_books:
+        clusters = cluster_editions(processed_books, edition_similarity)
+        _log_message(f"Ediciones agrupadas en {clusters} grupos de versiones (similitud >= {edition_similarity}).")
     return processed_books
 
 
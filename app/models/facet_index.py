@@ -0,0 +1,124 @@
+# app/models/facet_index.py
+"""
+Navegación por faceta: categoría, editorial y año de publicación.
+
+FacetIndex agrupa el catálogo en una sola pasada (tipo de faceta -> slug del valor -> libros) y solo da
+página a los valores con al menos FACET_MIN_BOOKS libros. Lo usan las rutas, los sitemaps y
+generate_static.py.
+
+Cada valor se pagina con cortes estables (app.utils.pagination): añadir o quitar un libro solo cambia,
+salvo casos límite, la página de faceta que lo contiene.
+"""
+import re
+import threading
+
+from app.utils.helpers import get_book_url_key, parse_list_field, slugify_ascii
+from app.utils.pagination import book_sort_key, stable_pages
+
+FACET_TYPES = ('category', 'publisher', 'year')
+FACET_PAGE_KINDS = ('list', 'books', 'books_page')  # Índice de valores, primera página y páginas siguientes
+YEAR_RE = re.compile(r'(?<!\d)(1\d{3}|20\d{2})(?!\d)')
+
+
+def facet_endpoint(facet_type, kind):
+    return f"main.{facet_type}_{kind}"
+
+
+FACET_ENDPOINTS = tuple(facet_endpoint(t, kind) for t in FACET_TYPES for kind in FACET_PAGE_KINDS)
+
+
+class SlugCache(dict):
+    """slugify_ascii memorizado: los mismos valores se repiten en miles de libros."""
+
+    def __missing__(self, text):
+        slug = self[text] = slugify_ascii(text)
+        return slug
+
+
+def book_facet_values(book, slugs=None):
+    """[(tipo, slug, nombre)] de un libro; published_year viene como '2006', '2006.0' o 'March 10th 2014'."""
+    slugs = SlugCache() if slugs is None else slugs
+    values = []
+    for category in parse_list_field(book.get('categories')):
+        category = category.strip()
+        if category:
+            values.append(('category', slugs[category], category))
+    publisher = (book.get('publisher') or '').strip()
+    if publisher:
+        values.append(('publisher', slugs[publisher], publisher))
+    year = YEAR_RE.search(str(book.get('published_year') or ''))
+    if year:
+        values.append(('year', year.group(1), year.group(1)))
+    return values
+
+
+class FacetIndex:
+    def __init__(self, books, min_books=3, page_size=48):
+        self.page_size = page_size
+        groups = {facet_type: {} for facet_type in FACET_TYPES}
+        names = {facet_type: {} for facet_type in FACET_TYPES}
+        self._slugs = SlugCache()
+        seen = set()
+        for book in books:
+            url_key = get_book_url_key(book)
+            if url_key is None or url_key in seen:
+                continue  # Sin página de detalle a la que enlazar (o misma URL que otro libro: gana el primero)
+            seen.add(url_key)
+            for facet_type, slug, name in book_facet_values(book, self._slugs):
+                members = groups[facet_type].setdefault(slug, [])
+                if not members or members[-1] is not book:  # Categoría repetida en el mismo libro
+                    members.append(book)
+                    names[facet_type].setdefault(slug, name)
+        self.books = {
+            facet_type: {slug: members for slug, members in by_slug.items() if len(members) >= min_books}
+            for facet_type, by_slug in groups.items()
+        }
+        self.names = {
+            facet_type: {slug: names[facet_type][slug] for slug in self.books[facet_type]} for facet_type in FACET_TYPES
+        }
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def value_slugs(self, facet_type):
+        """Slugs con página de un tipo, en el orden del índice de valores."""
+        return sorted(self.books.get(facet_type, ()))
+
+    def name(self, facet_type, slug):
+        return self.names.get(facet_type, {}).get(slug)
+
+    def pages(self, facet_type, slug):
+        """Páginas (listas de libros) de un valor o None si no tiene página. Se calculan en la primera petición."""
+        members = self.books.get(facet_type, {}).get(slug)
+        if members is None:
+            return None
+        cache_key = (facet_type, slug)
+        pages = self._pages.get(cache_key)
+        if pages is None:
+            pages = stable_pages(sorted(members, key=book_sort_key), self.page_size)
+            with self._lock:
+                pages = self._pages.setdefault(cache_key, pages)
+        return pages
+
+    def book_facets(self, book):
+        """[(tipo, slug, nombre)] de los valores del libro que tienen página."""
+        links, seen = [], set()
+        for facet_type, slug, _ in book_facet_values(book, self._slugs):
+            if slug in self.books[facet_type] and (facet_type, slug) not in seen:
+                seen.add((facet_type, slug))
+                links.append((facet_type, slug, self.names[facet_type][slug]))
+        return links
+
+
+def get_facet_index(app):
+    """Índice cacheado en la app (se invalida si cambia la lista de libros cargada), como get_catalog_index."""
+    books = getattr(app, 'books_data', []) or []
+    cached = getattr(app, '_facet_index', None)
+    if cached is None or cached[0] is not books:
+        cached = (books, FacetIndex(books, app.config.get('FACET_MIN_BOOKS', 3), app.config.get('FACET_PAGE_SIZE', 48)))
+        app._facet_index = cached
+    return cached[1]
+
+
+def book_facet_links(app, book):
+    """[(tipo, slug, nombre)] de las facetas del libro con página ([] si FACET_PAGES está desactivado)."""
+    return get_facet_index(app).book_facets(book) if app.config.get('FACET_PAGES', True) else []
@@ -0,0 +1,161 @@
+# app/models/leaderboards.py
+"""
+Clasificaciones del catálogo (top-k): mejor valorados, más valorados y mejores libros de cada año.
+
+- top-rated: average_rating (a igualdad, numRatings); solo libros con al menos LEADERBOARD_MIN_RATINGS valoraciones.
+- most-rated: numRatings.
+- best-of: bbeScore de los libros publicados ese año (published_year, leído como en las páginas de faceta).
+
+top-rated y most-rated tienen lista global y una por categoría (con los mismos slugs que las páginas de
+faceta); best-of, una por año. LeaderboardIndex las calcula todas en una sola pasada con un montículo acotado
+de LEADERBOARD_SIZE elementos por lista (heapq.heapreplace solo si el libro supera al último): O(n log k)
+en total en lugar de ordenar el catálogo una vez por lista. Solo tienen página las listas con al menos
+LEADERBOARD_MIN_ENTRIES libros. Lo usan las rutas, los sitemaps y generate_static.py.
+"""
+import heapq
+
+from app.models.facet_index import SlugCache, book_facet_values
+from app.utils.helpers import get_book_url_key
+
+GLOBAL_BOARDS = ('top-rated', 'most-rated')  # best-of solo existe por año
+LEADERBOARD_ENDPOINTS = ('main.leaderboard_list', 'main.leaderboard', 'main.leaderboard_scope')
+
+
+def _to_float(value):
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+def board_scores(book, min_ratings):
+    """{clasificación: clave de orden (mayor es mejor)} de las clasificaciones en las que puede entrar el libro."""
+    rating, votes, bbe_score = (_to_float(book.get(field)) for field in ('average_rating', 'numRatings', 'bbeScore'))
+    scores = {}
+    if rating > 0 and votes >= max(min_ratings, 1):
+        scores['top-rated'] = (rating, votes)
+    if votes > 0:
+        scores['most-rated'] = (votes, rating)
+    if bbe_score > 0:
+        scores['best-of'] = (bbe_score, votes)
+    return scores
+
+
+def leaderboard_endpoint(scope):
+    return 'main.leaderboard' if scope is None else 'main.leaderboard_scope'
+
+
+def _book_scopes(book, slugs):
+    """({slug: nombre} de las categorías del libro, slug de su año o None)."""
+    categories, year = {}, None
+    for facet_type, slug, name in book_facet_values(book, slugs):
+        if facet_type == 'category':
+            categories.setdefault(slug, name)
+        elif facet_type == 'year':
+            year = slug
+    return categories, year
+
+
+def _board_scopes(board, categories, year):
+    """Ámbitos de una clasificación en los que entra el libro: su año (best-of) o la global y sus categorías."""
+    if board == 'best-of':
+        return (year,) if year else ()
+    return (None, *categories)
+
+
+def _push_bounded(heap, entry, size):
+    """Mete entry en el montículo de los size mejores (sale el peor si ya está lleno y entry lo supera)."""
+    if len(heap) < size:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+class LeaderboardIndex:
+    def __init__(self, books, size=50, min_ratings=100, min_entries=10):
+        self.size = size
+        heaps, candidates, names = {}, [], {}
+        slugs, seen = SlugCache(), set()
+        for book in books:
+            url_key = get_book_url_key(book)
+            if url_key is None or url_key in seen:
+                continue  # Sin página de detalle a la que enlazar (o misma URL que otro libro: gana el primero)
+            seen.add(url_key)
+            scores = board_scores(book, min_ratings)
+            if not scores:
+                continue
+            categories, year = _book_scopes(book, slugs)
+            # -posición desempata a favor del primero del catálogo y sirve para recuperar el libro
+            position = len(candidates)
+            candidates.append(book)
+            for board, score in scores.items():
+                for scope in _board_scopes(board, categories, year):
+                    _push_bounded(heaps.setdefault((board, scope), []), (score, -position), size)
+            for slug, name in categories.items():
+                names.setdefault(slug, name)
+        self.boards = {
+            key: [candidates[-position] for _, position in sorted(heap, reverse=True)]
+            for key, heap in heaps.items() if len(heap) >= min_entries
+        }
+        self.names = {scope: names[scope] for _, scope in self.boards if scope in names}
+
+    def books(self, board, scope=None):
+        """Libros de una clasificación, del primero al último, o None si no tiene página."""
+        return self.boards.get((board, scope))
+
+    def name(self, board, scope):
+        """Nombre del ámbito: la categoría, el año (best-of) o None en las globales."""
+        if scope is None:
+            return None
+        return scope if board == 'best-of' else self.names.get(scope)
+
+    def scopes(self, board):
+        """Ámbitos con página de una clasificación: años de más reciente a más antiguo o categorías por slug."""
+        scopes = [scope for b, scope in self.boards if b == board and scope is not None]
+        return sorted(scopes, reverse=board == 'best-of')
+
+    def keys(self):
+        """(clasificación, ámbito) de todas las listas con página, en orden estable: globales, años y categorías."""
+        keys = [(board, None) for board in GLOBAL_BOARDS if (board, None) in self.boards]
+        keys += [('best-of', year) for year in self.scopes('best-of')]
+        categories = sorted({scope for board, scope in self.boards if board != 'best-of' and scope is not None})
+        return keys + [(board, slug) for slug in categories for board in GLOBAL_BOARDS if (board, slug) in self.boards]
+
+    def list_page(self):
+        """Contenido del índice de clasificaciones: listas globales, años de best-of y (slug, nombre, listas) por categoría."""
+        categories = {}
+        for board, scope in self.keys():
+            if board != 'best-of' and scope is not None:
+                categories.setdefault(scope, []).append(board)
+        return {
+            'boards': [board for board in GLOBAL_BOARDS if (board, None) in self.boards],
+            'years': self.scopes('best-of'),
+            'categories': [(slug, self.names.get(slug), boards) for slug, boards in categories.items()],
+        }
+
+
+def get_leaderboards(app):
+    """Índice cacheado en la app (se invalida si cambia la lista de libros cargada), como get_facet_index."""
+    books = getattr(app, 'books_data', []) or []
+    cached = getattr(app, '_leaderboards', None)
+    if cached is None or cached[0] is not books:
+        cached = (books, LeaderboardIndex(
+            books, app.config.get('LEADERBOARD_SIZE', 50), app.config.get('LEADERBOARD_MIN_RATINGS', 100),
+            app.config.get('LEADERBOARD_MIN_ENTRIES', 10)
+        ))
+        app._leaderboards = cached
+    return cached[1]
+
+
+def leaderboard_pages(app):
+    """(endpoint, kwargs) del índice de clasificaciones y de cada lista con página ([] si LEADERBOARDS está desactivado)."""
+    if not app.config.get('LEADERBOARDS', True):
+        return []
+    keys = get_leaderboards(app).keys()
+    if not keys:
+        return []
+    pages = [('main.leaderboard_list', {})]
+    for board, scope in keys:
+        kwargs = {'board': board} if scope is None else {'board': board, 'scope': scope}
+        pages.append((leaderboard_endpoint(scope), kwargs))
+    return pages
@@ -0,0 +1,150 @@
+# app/routes/api_routes.py
+import base64
+import hashlib
+import json
+
+from flask import Blueprint, Response, abort, current_app, request
+from werkzeug.exceptions import HTTPException
+
+from app.models.catalog_index import get_catalog_index
+from app.utils.helpers import get_book_identifier
+
+# API JSON de solo lectura del catálogo. Todo sale de los índices en memoria (app.models.catalog_index):
+# búsquedas por diccionario y páginas por cursor con bisect, sin recorrer current_app.books_data.
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _dumps(payload):
+    # Serialización compacta: sin espacios y UTF-8 tal cual
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def _json_response(payload, status=200):
+    body = _dumps(payload).encode('utf-8')
+    response = Response(body, status=status, mimetype='application/json')
+    if status == 200:
+        response.set_etag(hashlib.sha1(body).hexdigest()[:20])
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get('API_CACHE_MAX_AGE', 300)
+        response = response.make_conditional(request)
+    return response
+
+
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(_dumps(list(key)).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, key_length):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        abort(400, description="Cursor no válido.")
+    # Claves de SortedListing: cadenas y la posición del libro en el catálogo al final, con la longitud del
+    # listado (bisect compararía una cadena con un entero y fallaría con TypeError)
+    if not (isinstance(key, list) and key and key_length in (None, len(key))
+            and all(isinstance(part, str) for part in key[:-1])
+            and isinstance(key[-1], int) and not isinstance(key[-1], bool)):
+        abort(400, description="Cursor no válido.")
+    return tuple(key)
+
+
+def _requested_fields(catalog):
+    """Proyección (?fields=title,isbn13): campos pedidos o API_DEFAULT_FIELDS."""
+    raw = request.args.get('fields')
+    if not raw:
+        return [f for f in current_app.config.get('API_DEFAULT_FIELDS', ()) if f in catalog.fields]
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in catalog.fields]
+    if unknown:
+        abort(400, description=f"Campos desconocidos: {', '.join(unknown)}.")
+    return fields
+
+
+def _project(book, fields):
+    return {field: book.get(field) for field in fields}
+
+
+def _page_size():
+    default = current_app.config.get('API_PAGE_SIZE_DEFAULT', 50)
+    maximum = current_app.config.get('API_PAGE_SIZE_MAX', 500)
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        abort(400, description="'limit' debe ser un entero.")
+    return max(1, min(limit, maximum))
+
+
+def _listing_response(catalog, listing):
+    if listing is None:
+        abort(404)
+    fields = _requested_fields(catalog)
+    cursor = request.args.get('cursor')
+    books, next_key = listing.page(_decode_cursor(cursor, listing.key_length) if cursor else None, _page_size())
+    return _json_response({
+        'data': [_project(book, fields) for book in books],
+        'total': len(listing),
+        'next_cursor': _encode_cursor(next_key) if next_key is not None else None,
+    })
+
+
+@api_bp.errorhandler(HTTPException)
+def api_error(error):
+    return _json_response({'error': error.name, 'description': error.description}, status=error.code)
+
+
+@api_bp.route('/books/<identifier>')
+def book_by_identifier(identifier):
+    catalog = get_catalog_index(current_app)
+    book = catalog.by_identifier.get(identifier)
+    if book is None:
+        abort(404, description=f"Libro '{identifier}' no encontrado.")
+    return _json_response({'data': _project(book, _requested_fields(catalog))})
+
+
+@api_bp.route('/authors/<author_slug>/books')
+def books_by_author(author_slug):
+    catalog = get_catalog_index(current_app)
+    return _listing_response(catalog, catalog.author_listing(author_slug))
+
+
+@api_bp.route('/authors/<author_slug>/versions/<base_title_slug>')
+def book_versions(author_slug, base_title_slug):
+    catalog = get_catalog_index(current_app)
+    return _listing_response(catalog, catalog.versions_listing(author_slug, base_title_slug))
+
+
+@api_bp.route('/groups/')
+def char_groups():
+    catalog = get_catalog_index(current_app)
+    return _json_response({'data': catalog.char_group_keys()})
+
+
+@api_bp.route('/groups/<char_key>/books')
+def books_by_char_group(char_key):
+    catalog = get_catalog_index(current_app)
+    return _listing_response(catalog, catalog.char_group_listing(char_key))
+
+
+@api_bp.route('/suggest')
+def suggest():
+    """Autocompletado (?q=texto&lang=es&limit=5): libros por ranking con un token que empieza por la última palabra."""
+    suggester = getattr(current_app, 'search_suggester', None)
+    if suggester is None:
+        abort(404, description="Búsqueda del servidor desactivada.")
+    lang_code = request.args.get('lang') or current_app.config.get('DEFAULT_LANGUAGE', 'en')
+    if lang_code not in current_app.config.get('SUPPORTED_LANGUAGES', ['en']):
+        abort(400, description=f"Idioma no soportado: '{lang_code}'.")
+    try:
+        limit = int(request.args.get('limit', 0)) or None
+    except ValueError:
+        abort(400, description="'limit' debe ser un entero.")
+    books = suggester.suggest(request.args.get('q', ''), limit)
+    url_builder = current_app.url_builder
+    return _json_response({'data': [{
+        'title': book.get('title'),
+        'author': book.get('author'),
+        'url': url_builder.url_for(
+            'main.book_by_identifier', lang_code, author_slug=book.get('author_slug'),
+            book_slug=book.get('title_slug'), identifier=get_book_identifier(book)
+        ),
+    } for book in books]})
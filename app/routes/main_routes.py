@@ -1,20 +1,24 @@
 # app/routes/main_routes.py
 from flask import (
     Blueprint, render_template, request, abort,
-    current_app, redirect, url_for, Response
+    current_app, redirect, url_for, Response, stream_with_context
 )
 # from jinja2 import Environment, FileSystemLoader  # F401: Unused
-from pathlib import Path
+from jinja2.filters import do_truncate
+from markupsafe import Markup, escape
 
 # Asumiendo que estas utilidades son accesibles
-from app.utils.helpers import is_valid_isbn, is_valid_asin
-# Necesitarás una función slugify consistente y la función de grupo de sitemap
-from app.utils.helpers import get_sitemap_char_group_for_author, slugify_ascii
-# o mover el de generate_static.py
-# a un lugar común.
-
-# Para cargar datos de libros específicos para sitemaps de archivos
-from app.models.data_loader import load_processed_books as app_load_books
+from app.utils.helpers import is_valid_isbn, is_valid_asin, ensure_https_filter, get_book_identifier
+from app.utils.related_books import related_book_ids
+from app.utils.streaming import stream_page, streaming_enabled
+from app.config import Config
+from app.models.catalog_index import get_catalog_index
+from app.models.facet_index import FACET_TYPES, book_facet_links, facet_endpoint, get_facet_index
+from app.models.leaderboards import get_leaderboards
+from app.utils.sitemap_engine import (
+    get_sitemap_buckets, stream_sitemap_part, render_sitemap_index, sitemap_file_url, parse_sitemap_part,
+    core_part_names, sitemap_url_entries
+)
 
 
 main_bp = Blueprint('main', __name__)
@@ -99,6 +103,132 @@ def url_defaults(endpoint, values):  # noqa: C901
             values.setdefault(target_url_param_name, translated_segment)
 
 
+# --- Contexto de página independiente del idioma ---
+# Las rutas y generate_static.py comparten estos builders: el generador calcula la parte
+# común una sola vez por libro/autor/versiones y solo re-renderiza lo traducido por idioma.
+
+def build_book_page_data(book):
+    """Parte del contexto de book.html que no depende del idioma."""
+    env = current_app.jinja_env
+    title = book.get('title') or ''
+    description_text = Markup(book.get('description') or '').striptags()
+    return {
+        'identifier': get_book_identifier(book),
+        'amazon_identifier': book.get('asin') or book.get('isbn10') or book.get('isbn13'),
+        'base_title_display': title.split('(')[0].strip(),
+        'description_meta': do_truncate(env, description_text, 160),
+        'description_social': do_truncate(env, description_text, 200),
+        'description_ld': escape(description_text),
+        'image_url': ensure_https_filter(book.get('image_url')),
+        'related': related_books_for(book),
+        'facets': book_facet_links(current_app, book),
+    }
+
+
+def related_books_for(book):
+    """Libros relacionados precalculados (app.utils.related_books) que siguen en el catálogo cargado."""
+    keys = related_book_ids(current_app, book)
+    if not keys:
+        return []
+    by_url = get_catalog_index(current_app).by_url
+    return [by_url[key] for key in keys if key in by_url]
+
+
+def build_author_page_data(author_slug, books, page_number=1, page_count=1):
+    """Parte del contexto de author_books.html que no depende del idioma (books: los de la página)."""
+    return {
+        'author_slug': author_slug,
+        'author_display': books[0].get('author', author_slug),
+        'image_url': ensure_https_filter(books[0].get('image_url')),
+        'page_number': page_number,
+        'has_next': page_number < page_count,
+    }
+
+
+def build_versions_page_data(author_slug, base_book_slug, books):
+    """Parte del contexto de book_versions.html que no depende del idioma."""
+    original_title = books[0].get('title', '')
+    display_base_title = original_title.split('(')[0].strip() if original_title else base_book_slug
+    if not display_base_title:
+        display_base_title = books[0].get('base_title_slug', base_book_slug)
+    return {
+        'author_slug': author_slug,
+        'base_book_slug': base_book_slug,
+        'author_display': books[0].get('author', author_slug),
+        'base_title_display': display_base_title,
+        'image_url': ensure_https_filter(books[0].get('image_url')),
+    }
+
+
+def build_facet_page_data(facet_type, facet_slug, page_number, page_count):
+    """Contexto de facet_books.html que no depende del idioma (sin el total de páginas: no cambia con él)."""
+    return {
+        'facet_type': facet_type,
+        'facet_slug': facet_slug,
+        'facet_name': get_facet_index(current_app).name(facet_type, facet_slug),
+        'page_number': page_number,
+        'has_next': page_number < page_count,
+    }
+
+
+def build_facet_list_data(facet_type):
+    """Contexto de facet_list.html: valores con página de un tipo de faceta."""
+    index = get_facet_index(current_app)
+    return {
+        'facet_type': facet_type,
+        'values': [(slug, index.name(facet_type, slug)) for slug in index.value_slugs(facet_type)],
+    }
+
+
+def build_leaderboard_page_data(board, scope):
+    """Contexto de leaderboard.html que no depende del idioma."""
+    return {'board': board, 'scope': scope, 'scope_name': get_leaderboards(current_app).name(board, scope)}
+
+
+def build_leaderboard_list_data():
+    """Contexto de leaderboard_list.html: listas globales, años de best-of y categorías con sus listas."""
+    return get_leaderboards(current_app).list_page()
+
+
+def render_book_page(lang_code, book, page=None):
+    if page is None:
+        page = build_book_page_data(book)
+    return render_template('book.html', libro=book, page=page, lang=lang_code, t=get_t_func(lang_code))
+
+
+# Listados: con stream=True (solo desde las vistas) devuelven una respuesta en streaming (app.utils.streaming)
+def render_author_page(lang_code, books, page, stream=False):
+    return (stream_page if stream else render_template)(
+        'author_books.html', books=books, page=page, lang=lang_code, t=get_t_func(lang_code),
+        page_author_display=page['author_display']
+    )
+
+
+def render_versions_page(lang_code, books, page, stream=False):
+    return (stream_page if stream else render_template)(
+        'book_versions.html', books=books, page=page, lang=lang_code, t=get_t_func(lang_code),
+        page_author_display=page['author_display'], page_base_title_display=page['base_title_display']
+    )
+
+
+def render_facet_page(lang_code, books, page, stream=False):
+    return (stream_page if stream else render_template)(
+        'facet_books.html', books=books, page=page, lang=lang_code, t=get_t_func(lang_code)
+    )
+
+
+def render_facet_list_page(lang_code, page):
+    return render_template('facet_list.html', page=page, lang=lang_code, t=get_t_func(lang_code))
+
+
+def render_leaderboard_page(lang_code, books, page):
+    return render_template('leaderboard.html', books=books, page=page, lang=lang_code, t=get_t_func(lang_code))
+
+
+def render_leaderboard_list_page(lang_code, page):
+    return render_template('leaderboard_list.html', page=page, lang=lang_code, t=get_t_func(lang_code))
+
+
 # --- Rutas HTML (existentes) ---
 @main_bp.route('/')
 def root_index():
@@ -116,6 +246,104 @@ def index(lang_code):
     return render_template('index.html', books_data=bestsellers, lang=lang_code, t=t)
 
 
+# --- Navegación por faceta (categoría, editorial, año; ver app.models.facet_index) ---
+# Tienen la misma forma que las rutas de autor y versiones: el segmento se restringe (any) a sus
+# traducciones y las reglas se registran antes, porque a igual peso Werkzeug prueba primero las más antiguas.
+def _segment_converter(segment_key):
+    translations = Config.URL_SEGMENT_TRANSLATIONS.get(segment_key, {})
+    return f"any({', '.join(sorted(set(translations.values()) | {segment_key}))})"
+
+
+def _facet_redirect_target(lang_code, facet_type, facet_url_segment, **values):
+    """URL correcta si el segmento no es el del idioma o la página es '1'; None si la URL ya es la canónica."""
+    endpoint = request.endpoint
+    if values.get('page') == '1':
+        endpoint = facet_endpoint(facet_type, 'books')
+        values.pop('page')
+    elif facet_url_segment == get_url_segment(facet_type, lang_code, facet_type):
+        return None
+    return url_for(endpoint, lang_code=lang_code, **values)
+
+
+def _facet_pages_available(lang_code):
+    return lang_code in current_app.config.get('SUPPORTED_LANGUAGES', ['en']) and current_app.config.get('FACET_PAGES', True)
+
+
+def facet_list(lang_code, facet_url_segment, facet_type):
+    if not _facet_pages_available(lang_code):
+        abort(404)
+    target = _facet_redirect_target(lang_code, facet_type, facet_url_segment)
+    if target:
+        return redirect(target, code=301)
+    page = build_facet_list_data(facet_type)
+    if not page['values']:
+        abort(404)
+    return render_facet_list_page(lang_code, page)
+
+
+def facet_books(lang_code, facet_url_segment, facet_type, facet_slug, page=None):
+    if not _facet_pages_available(lang_code):
+        abort(404)
+    values = {'facet_slug': facet_slug} if page is None else {'facet_slug': facet_slug, 'page': page}
+    target = _facet_redirect_target(lang_code, facet_type, facet_url_segment, **values)
+    if target:
+        return redirect(target, code=301)
+    if page is not None and not page.isdigit():
+        abort(404)
+    page_number = int(page or 1)
+    pages = get_facet_index(current_app).pages(facet_type, facet_slug)
+    if not pages or not 1 <= page_number <= len(pages):
+        abort(404)
+    page_data = build_facet_page_data(facet_type, facet_slug, page_number, len(pages))
+    return render_facet_page(lang_code, pages[page_number - 1], page_data, stream=streaming_enabled())
+
+
+for _facet_type in FACET_TYPES:
+    _rule = f"/<lang_code>/<{_segment_converter(_facet_type)}:facet_url_segment>/"
+    _defaults = {'facet_type': _facet_type}
+    _names = {kind: facet_endpoint(_facet_type, kind).split('.')[1] for kind in ('list', 'books', 'books_page')}
+    main_bp.add_url_rule(_rule, _names['list'], facet_list, defaults=_defaults)
+    main_bp.add_url_rule(_rule + '<facet_slug>/', _names['books'], facet_books, defaults=_defaults)
+    main_bp.add_url_rule(_rule + '<facet_slug>/<page>/', _names['books_page'], facet_books, defaults=_defaults)
+
+
+# --- Clasificaciones (app.models.leaderboards): mismo esquema de registro que las facetas ---
+def _leaderboards_available(lang_code):
+    return lang_code in current_app.config.get('SUPPORTED_LANGUAGES', ['en']) and current_app.config.get('LEADERBOARDS', True)
+
+
+@main_bp.route(f"/<lang_code>/<{_segment_converter('top')}:top_url_segment>/")
+def leaderboard_list(lang_code, top_url_segment):
+    if not _leaderboards_available(lang_code):
+        abort(404)
+    if top_url_segment != get_url_segment('top', lang_code, 'top'):
+        return redirect(url_for('main.leaderboard_list', lang_code=lang_code), code=301)
+    page = build_leaderboard_list_data()
+    if not (page['boards'] or page['years'] or page['categories']):
+        abort(404)
+    return render_leaderboard_list_page(lang_code, page)
+
+
+@main_bp.route(f"/<lang_code>/<{_segment_converter('top')}:top_url_segment>/<board>/")
+@main_bp.route(f"/<lang_code>/<{_segment_converter('top')}:top_url_segment>/<board>/<scope>/", endpoint='leaderboard_scope')
+def leaderboard(lang_code, top_url_segment, board, scope=None):
+    if not _leaderboards_available(lang_code):
+        abort(404)
+    if top_url_segment != get_url_segment('top', lang_code, 'top'):
+        values = {'board': board} if scope is None else {'board': board, 'scope': scope}
+        return redirect(url_for(request.endpoint, lang_code=lang_code, **values), code=301)
+    books = get_leaderboards(current_app).books(board, scope)
+    if not books:
+        abort(404)
+    return render_leaderboard_page(lang_code, books, build_leaderboard_page_data(board, scope))
+
+
+# Páginas 2 y siguientes de un autor: misma forma que versiones, así que también se registra antes
+@main_bp.route(f"/<lang_code>/<{_segment_converter('author')}:author_url_segment>/<author_slug>/<page>/")
+def author_books_page(lang_code, author_url_segment, author_slug, page):
+    return author_books(lang_code, author_url_segment, author_slug, page)
+
+
 @main_bp.route('/<lang_code>/<book_url_segment>/<author_slug>/<book_slug>/<identifier>/')
 def book_by_identifier(lang_code, book_url_segment, author_slug, book_slug, identifier):
     supported_languages = current_app.config.get('SUPPORTED_LANGUAGES', ['en'])
@@ -129,7 +357,6 @@ def book_by_identifier(lang_code, book_url_segment, author_slug, book_slug, iden
                 book_slug=book_slug, identifier=identifier
             ), code=301
         )
-    t = get_t_func(lang_code)
     books = get_books_data_for_request()
     if not (is_valid_isbn(identifier) or is_valid_asin(identifier)):
         abort(400)
@@ -140,7 +367,7 @@ def book_by_identifier(lang_code, book_url_segment, author_slug, book_slug, iden
         None
     )
     if found_book:
-        return render_template('book.html', libro=found_book, lang=lang_code, t=t)
+        return render_book_page(lang_code, found_book)
     else:
         abort(404)
 
@@ -158,75 +385,77 @@ def book_versions(lang_code, versions_url_segment, author_slug, base_book_slug):
                 base_book_slug=base_book_slug
             ), code=301
         )
-    t = get_t_func(lang_code)
     books = get_books_data_for_request()
     matched_versions = [
         b for b in books if b.get('author_slug') == author_slug and
         b.get('base_title_slug') == base_book_slug
     ]
     if matched_versions:
-        display_author = matched_versions[0].get('author', author_slug)
-        original_title = matched_versions[0].get('title', '')
-        display_base_title = original_title.split('(')[0].strip() if original_title else base_book_slug
-        if not display_base_title:
-            display_base_title = matched_versions[0].get('base_title_slug', base_book_slug)
-        return render_template(
-            'book_versions.html', books=matched_versions, lang=lang_code, t=t,
-            page_author_display=display_author, page_base_title_display=display_base_title
-        )
+        page = build_versions_page_data(author_slug, base_book_slug, matched_versions)
+        return render_versions_page(lang_code, matched_versions, page, stream=streaming_enabled())
     else:
         abort(404)
 
 
 @main_bp.route('/<lang_code>/<author_url_segment>/<author_slug>/')
-def author_books(lang_code, author_url_segment, author_slug):
+def author_books(lang_code, author_url_segment, author_slug, page=None):
     supported_languages = current_app.config.get('SUPPORTED_LANGUAGES', ['en'])
     if lang_code not in supported_languages:
         abort(404)
     expected_segment = get_url_segment('author', lang_code, 'author')
-    if author_url_segment != expected_segment:
+    if page == '1':
         return redirect(url_for('main.author_books', lang_code=lang_code, author_slug=author_slug), code=301)
-    t = get_t_func(lang_code)
-    books = get_books_data_for_request()
-    matched_books = [b for b in books if b.get('author_slug') == author_slug]
-    if matched_books:
-        display_author = matched_books[0].get('author', author_slug)
-        return render_template(
-            'author_books.html', books=matched_books, lang=lang_code, t=t,
-            page_author_display=display_author
-        )
+    if author_url_segment != expected_segment:
+        if page is None:
+            return redirect(url_for('main.author_books', lang_code=lang_code, author_slug=author_slug), code=301)
+        return redirect(url_for('main.author_books_page', lang_code=lang_code, author_slug=author_slug, page=page), code=301)
+    if page is not None and not page.isdigit():
+        abort(404)
+    page_number = int(page or 1)
+    pages = get_catalog_index(current_app).author_pages(author_slug)
+    if pages and 1 <= page_number <= len(pages):
+        page_data = build_author_page_data(author_slug, pages[page_number - 1], page_number, len(pages))
+        return render_author_page(lang_code, pages[page_number - 1], page_data, stream=streaming_enabled())
     else:
         abort(404)
 
 
+@main_bp.route('/<lang_code>/search/')
+def search(lang_code):
+    supported_languages = current_app.config.get('SUPPORTED_LANGUAGES', ['en'])
+    if lang_code not in supported_languages:
+        abort(404)
+    catalog_search = getattr(current_app, 'catalog_search', None)
+    if catalog_search is None:
+        abort(404)  # SEARCH_SERVER_ENABLED desactivado o índice no disponible
+    query = request.args.get('q', '').strip()
+    try:
+        page_number = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        abort(400)
+    page_size = current_app.config.get('SEARCH_PAGE_SIZE', 20)
+    books, total = catalog_search.search(query, page_size, (page_number - 1) * page_size)
+    return render_template(
+        'search.html', books=books, query=query, total=total, page_number=page_number,
+        has_next=page_number * page_size < total, lang=lang_code, t=get_t_func(lang_code)
+    )
+
+
 @main_bp.route('/test/')
 def test_page():
     return "<h1>Test Page</h1><p>This is a test page for static generation.</p>", 200
 
 
 # --- Nuevas Rutas para Sitemaps ---
+# Toda la lógica vive en app.utils.sitemap_engine (compartida con sitemap_routes y generate_static.py).
 
 def get_sitemap_char_keys_for_language(app, lang_code):
     """
     Determina los char_keys válidos para los que se pueden generar sitemaps individuales
-    para un idioma específico. Esto podría involucrar verificar la existencia de contenido.
-    Por ahora, usa la configuración global y la exploración de archivos.
+    para un idioma específico: a-z, '0' y las claves numéricas de los archivos books_<n>.csv
+    cargados (sale de los buckets en memoria, sin comprobar archivos en disco).
     """
-    author_filter_config_key = 'VALID_SITEMAP_CHAR_GROUPS_AUTHOR_FILTER'
-    default_author_keys = list(ALPHABET_SITEMAP) + [SPECIAL_CHARS_SITEMAP_KEY_SITEMAP]
-    author_filter_keys = list(app.config.get(author_filter_config_key, default_author_keys))
-
-    data_file_keys = []
-    books_data_dir_str = app.config.get('BOOKS_DATA_DIR')
-    if books_data_dir_str:
-        books_data_dir = Path(books_data_dir_str)
-        if books_data_dir.is_dir():
-            for i in range(100):  # Un límite práctico
-                if (books_data_dir / f"books_{i}.csv").exists():
-                    data_file_keys.append(str(i))
-
-    all_keys = list(set(author_filter_keys + data_file_keys))
-    return sorted(all_keys)
+    return get_sitemap_buckets(app).keys()
 
 
 @main_bp.route('/sitemap.xml')
@@ -236,150 +465,25 @@ def sitemap_index_xml():
     sitemaps de índice de cada idioma (sitemap_<lang>_core.xml).
     """
     langs = current_app.config.get('SUPPORTED_LANGUAGES', ['en'])
-    sitemap_entries = []
-    for lang_code in langs:
-        loc = url_for('main.sitemap_char_group_xml', lang_code=lang_code, char_group='core', _external=True)
-        sitemap_entries.append({'loc': loc})
+    entries = [(sitemap_file_url(f"sitemap_{lang_code}_core.xml"), None) for lang_code in langs]
+    return Response(render_sitemap_index(entries), mimetype='application/xml')
 
-    xml_template_path = Path(current_app.template_folder) / 'sitemap_index.xml'
-    if not xml_template_path.exists():
-        xml_content = ('<?xml version="1.0" encoding="UTF-8"?>'
-                       '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-        for entry in sitemap_entries:
-            xml_content += f"<sitemap><loc>{entry['loc']}</loc></sitemap>"
-        xml_content += '</sitemapindex>'
-        return Response(xml_content, mimetype='application/xml')
 
-    return render_template('sitemap_index.xml', sitemaps=sitemap_entries)
-
-
-@main_bp.route('/sitemap_<lang_code>_<char_group>.xml')  # noqa: C901
+@main_bp.route('/sitemap_<lang_code>_<char_group>.xml')
 def sitemap_char_group_xml(lang_code, char_group):
     supported_languages = current_app.config.get('SUPPORTED_LANGUAGES', ['en'])
     if lang_code not in supported_languages:
         abort(404, description=f"Idioma '{lang_code}' no soportado para sitemap.")
 
-    all_individual_sitemap_keys_for_lang = get_sitemap_char_keys_for_language(current_app, lang_code)
-
     if char_group == 'core':
-        sitemap_entries = []
-        for key in all_individual_sitemap_keys_for_lang:
-            loc = url_for('main.sitemap_char_group_xml', lang_code=lang_code, char_group=key, _external=True)
-            sitemap_entries.append({'loc': loc})
-
-        xml_template_path = Path(current_app.template_folder) / 'sitemap_index.xml'
-        if not xml_template_path.exists():
-            xml_content = ('<?xml version="1.0" encoding="UTF-8"?>'
-                           '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-            for entry in sitemap_entries:
-                xml_content += f"<sitemap><loc>{entry['loc']}</loc></sitemap>"
-            xml_content += '</sitemapindex>'
-            return Response(xml_content, mimetype='application/xml')
-        return render_template('sitemap_index.xml', sitemaps=sitemap_entries)
-
-    else:
-        urls = []
-        books_for_sitemap = []
-        is_author_filter_key = char_group in list(ALPHABET_SITEMAP) + [SPECIAL_CHARS_SITEMAP_KEY_SITEMAP]
-        is_data_file_key = char_group.isdigit()
-
-        if is_data_file_key:
-            current_app.logger.debug(f"Sitemap: char_group '{char_group}' es data_file_key. Cargando books_{char_group}.csv.")
-            books_data_dir = current_app.config.get('BOOKS_DATA_DIR')
-            if books_data_dir:
-                try:
-                    books_for_sitemap = app_load_books(books_data_dir, filename_filter_key=char_group)
-                    current_app.logger.info(
-                        f"Cargados {len(books_for_sitemap)} libros desde books_{char_group}.csv para sitemap."
-                    )
-                except Exception as e:
-                    current_app.logger.error(f"Error cargando books_{char_group}.csv para sitemap: {e}")
-                    books_for_sitemap = []
-            else:
-                current_app.logger.warning(
-                    f"BOOKS_DATA_DIR no configurado, no se pueden cargar datos para sitemap de archivo '{char_group}'."
-                )
-                books_for_sitemap = []
-
-            if not books_for_sitemap and char_group not in all_individual_sitemap_keys_for_lang:
-                current_app.logger.warning(
-                    f"No se encontraron datos ni definición para sitemap char_group '{char_group}', lang '{lang_code}'."
-                )
-                abort(404)
-
-        elif is_author_filter_key:
-            all_books_in_context = get_books_data_for_request()
-            current_app.logger.debug(
-                f"Sitemap: char_group '{char_group}' es author_filter_key. "
-                f"Usando {len(all_books_in_context)} libros en contexto."
-            )
-            for book in all_books_in_context:
-                author_sitemap_group = get_sitemap_char_group_for_author(book.get('author_slug'), slugify_ascii)
-                if author_sitemap_group == char_group:
-                    books_for_sitemap.append(book)
-            current_app.logger.info(
-                f"Encontrados {len(books_for_sitemap)} libros para filtro de autor '{char_group}' en sitemap."
-            )
-
-        else:
-            current_app.logger.warning(
-                f"Sitemap: char_group '{char_group}' no reconocido como filtro de autor ni de archivo de datos."
-            )
-            if char_group not in all_individual_sitemap_keys_for_lang:
-                abort(404, description=f"Sitemap char_group '{char_group}' no válido para idioma '{lang_code}'.")
-
-        processed_authors = set()
-        processed_versions = set()
-
-        for book in books_for_sitemap:
-            try:
-                book_url = url_for(
-                    'main.book_by_identifier',
-                    lang_code=lang_code,
-                    author_slug=book.get('author_slug'),
-                    book_slug=book.get('title_slug'),
-                    identifier=(book.get('isbn10') or book.get('isbn13') or book.get('asin')),
-                    _external=True
-                )
-                urls.append({'loc': book_url, 'lastmod': book.get('last_modified_sitemap_date')})
-            except Exception as e:
-                current_app.logger.error(f"Error generando URL de libro para sitemap: {book.get('title')} - {e}")
-
-            author_s = book.get('author_slug')
-            if author_s and author_s not in processed_authors:
-                try:
-                    author_url = url_for('main.author_books', lang_code=lang_code, author_slug=author_s, _external=True)
-                    urls.append({'loc': author_url, 'lastmod': book.get('last_modified_sitemap_date')})
-                    processed_authors.add(author_s)
-                except Exception as e:
-                    current_app.logger.error(f"Error generando URL de autor para sitemap: {author_s} - {e}")
-
-            base_title_s = book.get('base_title_slug')
-            if author_s and base_title_s and (author_s, base_title_s) not in processed_versions:
-                try:
-                    versions_url = url_for(
-                        'main.book_versions', lang_code=lang_code, author_slug=author_s,
-                        base_book_slug=base_title_s, _external=True
-                    )
-                    urls.append({'loc': versions_url, 'lastmod': book.get('last_modified_sitemap_date')})
-                    processed_versions.add((author_s, base_title_s))
-                except Exception as e:
-                    current_app.logger.error(
-                        f"Error generando URL de versiones para sitemap: {author_s}/{base_title_s} - {e}"
-                    )
-
-        xml_template_path = Path(current_app.template_folder) / 'sitemap_content.xml'
-        if not xml_template_path.exists():
-            xml_content = ('<?xml version="1.0" encoding="UTF-8"?>'
-                           '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-            for url_entry in urls:
-                xml_content += f"<url><loc>{url_entry['loc']}</loc>"
-                if url_entry.get('lastmod'):
-                    xml_content += f"<lastmod>{url_entry['lastmod']}</lastmod>"
-                xml_content += "</url>"
-            xml_content += '</urlset>'
-            return Response(xml_content, mimetype='application/xml')
-
-        return render_template('sitemap_content.xml', urls=urls)
+        entries = [(sitemap_file_url(name), None) for name in core_part_names(current_app, lang_code)]
+        return Response(render_sitemap_index(entries), mimetype='application/xml')
+
+    char_key, part_no = parse_sitemap_part(char_group)
+    entries = sitemap_url_entries(current_app, char_key, lang_code)
+    if entries is None:
+        abort(404, description=f"Sitemap char_group '{char_group}' no válido para idioma '{lang_code}'.")
+    # Streaming: el XML se envía según se genera, sin construir la lista completa en memoria
+    return Response(stream_with_context(stream_sitemap_part(entries, part_no)), mimetype='application/xml')
 
 # --- FIN Nuevas Rutas para Sitemaps ---
@@ -0,0 +1,90 @@
+/* Hidrata el shell de detalle de libro (generate_static.py --shell-mode): pide el fragmento JSON del
+   libro de la URL y sustituye los marcadores __shell_<campo>__ del documento. Ver app/utils/shell_build.py. */
+(function () {
+    var script = document.currentScript;
+    var shardCount = parseInt(script.getAttribute('data-shards'), 10);
+    var shardBase = script.getAttribute('data-shard-base');
+    var optional = script.getAttribute('data-optional').split(',');
+    var htmlFields = script.getAttribute('data-html').split(',');
+    var TOKEN = /__shell_([A-Za-z0-9_]+?)__/g;
+    var parts = location.pathname.split('/').filter(Boolean);
+    // Misma clave que shell_record_key() en Python: "<autor>/<título>/<identificador>" (hay identificadores repetidos)
+    var key = parts.slice(2, 5).map(decodeURIComponent).join('/');
+
+    // Mismo hash que identifier_shard() en Python (FNV-1a de 32 bits sobre UTF-8)
+    function shardOf(value) {
+        var bytes = new TextEncoder().encode(value), h = 0x811c9dc5;
+        for (var i = 0; i < bytes.length; i++) { h = Math.imul(h ^ bytes[i], 0x01000193) >>> 0; }
+        return h % shardCount;
+    }
+
+    function reveal() {
+        var cloak = document.getElementById('shell-cloak');
+        if (cloak) { cloak.parentNode.removeChild(cloak); }
+    }
+
+    function notFound() {
+        var main = document.querySelector('main');
+        if (main) { main.textContent = '404'; }
+        var robots = document.createElement('meta');
+        robots.name = 'robots';
+        robots.content = 'noindex';
+        document.head.appendChild(robots);
+        document.title = '404';
+        reveal();
+    }
+
+    function onlyToken(text) {
+        var m = text.trim().match(/^__shell_([A-Za-z0-9_]+?)__$/);
+        return m ? m[1] : null;
+    }
+
+    function hydrate(values) {
+        var removals = [];
+        var walker = document.createTreeWalker(document.documentElement, NodeFilter.SHOW_TEXT);
+        var textNodes = [];
+        while (walker.nextNode()) { if (walker.currentNode.nodeValue.indexOf('__shell_') !== -1) { textNodes.push(walker.currentNode); } }
+        textNodes.forEach(function (node) {
+            var parent = node.parentNode;
+            var field = onlyToken(node.nodeValue);
+            if (field && !values[field] && optional.indexOf(field) !== -1) {
+                removals.push(parent.closest('p, h3') || parent);
+                return;
+            }
+            if (parent.tagName === 'SCRIPT') {
+                // JSON-LD: valores escapados como cadena JSON
+                node.nodeValue = node.nodeValue.replace(TOKEN, function (_, f) { return JSON.stringify(values[f] || '').slice(1, -1); });
+            } else if (field && htmlFields.indexOf(field) !== -1) {
+                var tpl = document.createElement('template');
+                tpl.innerHTML = node.nodeValue.replace(TOKEN, function (_, f) { return values[f] || ''; });
+                parent.replaceChild(tpl.content, node);
+            } else {
+                node.nodeValue = node.nodeValue.replace(TOKEN, function (_, f) { return values[f] || ''; });
+            }
+        });
+        document.querySelectorAll('*').forEach(function (el) {
+            Array.prototype.forEach.call(el.attributes, function (attr) {
+                if (attr.value.indexOf('__shell_') === -1) { return; }
+                var field = onlyToken(attr.value);
+                if (field && !values[field] && optional.indexOf(field) !== -1 && el.tagName === 'META') {
+                    removals.push(el);
+                    return;
+                }
+                el.setAttribute(attr.name, attr.value.replace(TOKEN, function (_, f) { return values[f] || ''; }));
+            });
+        });
+        removals.forEach(function (el) { if (el.parentNode) { el.parentNode.removeChild(el); } });
+        reveal();
+    }
+
+    fetch(shardBase + shardOf(key) + '.json')
+        .then(function (res) { if (!res.ok) { throw new Error(res.status); } return res.json(); })
+        .then(function (shard) {
+            var record = shard.books[key];
+            if (!record) { return notFound(); }
+            var values = {};
+            shard.fields.forEach(function (field, i) { values[field] = record[i]; });
+            hydrate(values);
+        })
+        .catch(notFound);
+})();
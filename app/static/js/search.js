@@ -0,0 +1,88 @@
+/* Búsqueda sobre el índice estático de títulos y autores (app/utils/search_index.py): por cada palabra
+   escrita se pide solo el fragmento de su prefijo y, para los resultados mostrados, sus bloques de documentos. */
+(function () {
+    var input = document.querySelector('.google-search-input[data-search-base]');
+    if (!input) { return; }
+    var base = input.getAttribute('data-search-base');
+    var bookUrl = input.getAttribute('data-book-url');
+    var prefixLen = parseInt(input.getAttribute('data-prefix-len'), 10);
+    var docBlock = parseInt(input.getAttribute('data-doc-block'), 10);
+    var maxResults = 10;
+    var cache = {};
+    var pending = null;
+    var list = document.createElement('ul');
+    list.className = 'search-results';
+    input.closest('.google-search-container').insertAdjacentElement('afterend', list);
+
+    // Como normalize_tokens(): sin diacríticos (aproximación de unidecode), minúsculas, se eliminan los
+    // signos y se separa por espacios, guiones y guiones bajos
+    function tokenize(text) {
+        return text.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase()
+            .replace(/[^a-z0-9\s_-]/g, '').split(/[\s_-]+/).filter(Boolean);
+    }
+
+    function fetchJson(path) {
+        if (!cache[path]) {
+            cache[path] = fetch(base + path).then(function (res) { return res.ok ? res.json() : null; }).catch(function () { return null; });
+        }
+        return cache[path];
+    }
+
+    function decode(deltas) {
+        var ids = [], current = 0;
+        deltas.forEach(function (d) { current += d; ids.push(current); });
+        return ids;
+    }
+
+    // Ids de una palabra: exacta o, si es la última y tiene al menos prefixLen letras, como prefijo
+    function idsFor(token, asPrefix) {
+        return fetchJson('t/' + token.slice(0, prefixLen) + '.json').then(function (shard) {
+            var ids = {};
+            if (!shard) { return ids; }
+            Object.keys(shard).forEach(function (key) {
+                if (key === token || (asPrefix && key.indexOf(token) === 0)) {
+                    decode(shard[key]).forEach(function (id) { ids[id] = true; });
+                }
+            });
+            return ids;
+        });
+    }
+
+    function render(docs) {
+        list.textContent = '';
+        docs.forEach(function (doc) {
+            var item = document.createElement('li');
+            var link = document.createElement('a');
+            link.href = bookUrl.replace('__author__/__title__/__identifier__', doc[2]);
+            link.textContent = doc[0] + (doc[1] ? ' — ' + doc[1] : '');
+            item.appendChild(link);
+            list.appendChild(item);
+        });
+    }
+
+    function search(text) {
+        var tokens = tokenize(text);
+        if (!tokens.length) { render([]); return; }
+        var query = pending = {};
+        Promise.all(tokens.map(function (token, i) {
+            return idsFor(token, i === tokens.length - 1 && token.length >= prefixLen);
+        })).then(function (sets) {
+            var ids = Object.keys(sets[0]).filter(function (id) {
+                return sets.every(function (set) { return set[id]; });
+            }).map(Number).sort(function (a, b) { return a - b; }).slice(0, maxResults);
+            return Promise.all(ids.map(function (id) {
+                return fetchJson('d/' + Math.floor(id / docBlock) + '.json').then(function (block) {
+                    return block && block[id % docBlock];
+                });
+            }));
+        }).then(function (docs) {
+            if (query === pending) { render(docs.filter(Boolean)); }
+        });
+    }
+
+    var timer = null;
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () { search(input.value); }, 150);
+    });
+})();
@@ -0,0 +1,46 @@
+/* Autocompletado contra la API del servidor (/api/v1/suggest, app/models/catalog_search.py). Si la caja
+   no está dentro de un formulario, Intro lleva a la página de búsqueda (data-search-url). */
+(function () {
+    var input = document.querySelector('.google-search-input[data-suggest-url]');
+    if (!input) { return; }
+    var suggestUrl = input.getAttribute('data-suggest-url');
+    var searchUrl = input.getAttribute('data-search-url');
+    var list = document.createElement('ul');
+    list.className = 'search-results';
+    input.closest('.google-search-container').insertAdjacentElement('afterend', list);
+    var latest = 0;
+    var timer = null;
+
+    function render(items) {
+        list.textContent = '';
+        items.forEach(function (item) {
+            var entry = document.createElement('li');
+            var link = document.createElement('a');
+            link.href = item.url;
+            link.textContent = item.title + (item.author ? ' — ' + item.author : '');
+            entry.appendChild(link);
+            list.appendChild(entry);
+        });
+    }
+
+    function suggest(text) {
+        var request = ++latest;
+        if (!text.trim()) { render([]); return; }
+        fetch(suggestUrl + (suggestUrl.indexOf('?') === -1 ? '?' : '&') + 'q=' + encodeURIComponent(text))
+            .then(function (res) { return res.ok ? res.json() : { data: [] }; })
+            .then(function (payload) { if (request === latest) { render(payload.data); } })
+            .catch(function () {});
+    }
+
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () { suggest(input.value); }, 100);
+    });
+    if (searchUrl && !input.form) {
+        input.addEventListener('keydown', function (event) {
+            if (event.key === 'Enter' && input.value.trim()) {
+                location.href = searchUrl + '?q=' + encodeURIComponent(input.value.trim());
+            }
+        });
+    }
+})();
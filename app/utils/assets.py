@@ -0,0 +1,139 @@
+# app/utils/assets.py
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from flask import request
+
+# Un año: los archivos con huella en el nombre nunca cambian de contenido
+FINGERPRINTED_MAX_AGE = 31536000
+
+
+def file_content_hash(path_obj):
+    h = hashlib.sha256()
+    with open(path_obj, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprinted_name(rel_path, content_hash):
+    """css/theme.css -> css/theme.<hash10>.css"""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{content_hash[:10]}{ext}"
+
+
+def build_asset_manifest(static_dir):
+    """
+    Recorre la carpeta static y devuelve {ruta_relativa: {'hash': ..., 'fingerprinted': ...}}.
+    Las rutas usan '/' como separador, igual que url_for('static', filename=...).
+    """
+    manifest = {}
+    static_dir = Path(static_dir)
+    if not static_dir.is_dir():
+        return manifest
+    for path_obj in sorted(static_dir.rglob('*')):
+        if not path_obj.is_file():
+            continue
+        rel_path = path_obj.relative_to(static_dir).as_posix()
+        content_hash = file_content_hash(path_obj)
+        manifest[rel_path] = {'hash': content_hash, 'fingerprinted': fingerprinted_name(rel_path, content_hash)}
+    return manifest
+
+
+def _copy_if_changed(src, dst, content_hash, previous_hash):
+    """Copia src a dst solo si dst no existe o su contenido es distinto. Devuelve True si copió."""
+    if dst.is_file() and previous_hash == content_hash:
+        return False
+    if dst.is_file() and previous_hash is None and file_content_hash(dst) == content_hash:
+        return False
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(src, dst)
+    return True
+
+
+def sync_file_by_hash(src, dst):
+    """Copia un único archivo solo si su contenido (hash) cambió respecto al destino."""
+    src, dst = Path(src), Path(dst)
+    return _copy_if_changed(src, dst, file_content_hash(src), None)
+
+
+def sync_static_assets(static_dir, target_dir, manifest_filename):
+    """
+    Sincroniza static/ con el directorio de salida de forma incremental: copia solo los archivos
+    cuyo hash cambió (con su nombre original y con el nombre con huella), borra los que ya no existen
+    y escribe el manifest de assets. Devuelve (copiados, eliminados).
+    """
+    static_dir, target_dir = Path(static_dir), Path(target_dir)
+    manifest = build_asset_manifest(static_dir)
+    manifest_path = target_dir / manifest_filename
+    previous = {}
+    if manifest_path.is_file():
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            previous = {}
+
+    copied = 0
+    for rel_path, entry in manifest.items():
+        src = static_dir / rel_path
+        prev_hash = previous.get(rel_path, {}).get('hash')
+        copied += _copy_if_changed(src, target_dir / rel_path, entry['hash'], prev_hash)
+        copied += _copy_if_changed(src, target_dir / entry['fingerprinted'], entry['hash'], prev_hash)
+
+    removed = 0
+    wanted = {manifest_filename}
+    for entry_rel, entry in manifest.items():
+        wanted.add(entry_rel)
+        wanted.add(entry['fingerprinted'])
+    if target_dir.is_dir():
+        for path_obj in target_dir.rglob('*'):
+            if path_obj.is_file() and path_obj.relative_to(target_dir).as_posix() not in wanted:
+                path_obj.unlink()
+                removed += 1
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return copied, removed
+
+
+def init_asset_fingerprinting(app):
+    """
+    Hace que url_for('static', filename=...) devuelva el nombre con huella del manifest
+    y que la vista static sirva esos nombres con caché de un año, si STATIC_ASSET_FINGERPRINTING está activo.
+    """
+    if not app.config.get('STATIC_ASSET_FINGERPRINTING', True):
+        return
+    static_dir = os.path.join(app.root_path, app.static_folder) if app.static_folder else None
+    manifest = build_asset_manifest(static_dir) if static_dir else {}
+    app.asset_manifest = {rel: entry['fingerprinted'] for rel, entry in manifest.items()}
+    reverse_manifest = {fp: rel for rel, fp in app.asset_manifest.items()}
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static':
+            filename = values.get('filename')
+            if filename in app.asset_manifest:
+                values['filename'] = app.asset_manifest[filename]
+
+    original_static_view = app.view_functions.get('static')
+    if original_static_view is None:
+        return
+
+    def static_with_fingerprints(filename):
+        original_filename = reverse_manifest.get(filename)
+        if original_filename is None:
+            return original_static_view(filename=filename)
+        response = app.send_static_file(original_filename)
+        if request.method != 'OPTIONS':
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = FINGERPRINTED_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static_with_fingerprints
@@ -0,0 +1,193 @@
+# app/utils/edition_clusters.py
+"""
+Agrupación de ediciones: qué libros comparten página de versiones (author_slug, base_title_slug).
+
+El título base por sí solo (title.split('(')[0]) separa ediciones con subtítulo o puntuación distinta y junta
+libros sin relación que se titulan igual. Aquí los libros se agrupan por autor principal (el primero de
+author_list; author_slug no distingue autores en los datos actuales) y, dentro de cada autor, por similitud de
+Jaccard de los trigramas del título normalizado (sin paréntesis, artículos ni palabras de edición): se unen
+los pares con similitud >= EDITION_SIMILARITY y también el título sin subtítulo con sus variantes "título: subtítulo".
+
+Comparar todos los pares es cuadrático, así que en los autores con más de EXACT_BLOCK_MAX libros los candidatos
+salen de LSH sobre firmas MinHash (LSH_BANDS bandas de LSH_ROWS filas): solo se comparan los libros que
+coinciden en alguna banda. Con bloques pequeños o acotados por LSH el coste total es casi lineal.
+
+Cada grupo toma como slug su base_title_slug más frecuente; si otro grupo del mismo author_slug tiene el mismo,
+se les añade el slug del autor principal (y un número si aún coinciden). El slug se escribe en el propio
+base_title_slug de cada libro, así que rutas, sitemaps, generate_static.py y la API lo usan sin cambios.
+Como el slug depende de los demás grupos del autor, se agrupa siempre el catálogo entero (generate_static.py
+con --char-key numérico filtra los libros después de agruparlos).
+"""
+import random
+import re
+import zlib
+from collections import Counter
+
+from app.utils.helpers import parse_list_field, slugify_ascii
+
+EXACT_BLOCK_MAX = 32
+LSH_BANDS = 8
+LSH_ROWS = 2
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+_PAREN_RE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+_SUBTITLE_RE = re.compile(r'\s*[:;]\s*|\s+[-–—]\s+')
+STOP_WORDS = frozenset(
+    'a an the el la los las un una le les il lo der die das ein eine '
+    'edition ed deluxe anniversary illustrated annotated unabridged abridged complete novel vol volume'.split()
+)
+# Semilla fija: las firmas deben coincidir entre procesos (servidor, workers del build)
+_rng = random.Random(50)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(LSH_BANDS * LSH_ROWS)]
+
+
+def normalize_title(text):
+    tokens = slugify_ascii(_PAREN_RE.sub(' ', text or '')).split('-')
+    return ' '.join(token for token in tokens if token and token not in STOP_WORDS)
+
+
+def title_shingles(normalized):
+    padded = f" {normalized} "
+    if len(padded) <= SHINGLE_SIZE:
+        return frozenset([padded])
+    return frozenset(padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def minhash_bands(shingles):
+    """Claves de las LSH_BANDS bandas de la firma MinHash de un conjunto de trigramas."""
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+    signature = [min((a * x + b) % _PRIME for x in hashes) for a, b in _HASH_PARAMS]
+    return [(band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+
+
+def primary_author(book):
+    """Nombre del autor principal (author o el primero de author_list), o '' si no tiene."""
+    names = [book['author']] if book.get('author') else parse_list_field(book.get('author_list'))
+    return next((name.strip() for name in names if name and name.strip()), '')
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def _candidate_pairs(shingles):
+    """Pares (i, j) a comparar de un bloque: todos si es pequeño; si no, los que comparten alguna banda LSH."""
+    n = len(shingles)
+    if n <= EXACT_BLOCK_MAX:
+        return ((i, j) for i in range(n) for j in range(i + 1, n))
+    buckets = {}
+    for i, item in enumerate(shingles):
+        for key in minhash_bands(item):
+            buckets.setdefault(key, []).append(i)
+    pairs = set()
+    for members in buckets.values():
+        for position, i in enumerate(members):
+            pairs.update((i, j) for j in members[position + 1:])
+    return sorted(pairs)
+
+
+def _cluster_block(titles, threshold):
+    """Grupo (índice de su representante) de cada (título normalizado, título principal o None) de un bloque."""
+    shingles = [title_shingles(full) for full, _ in titles]
+    numbers = [[token for token in full.split() if token.isdigit()] for full, _ in titles]
+    groups = _UnionFind(len(titles))
+    for i, j in _candidate_pairs(shingles):
+        # Títulos casi iguales con distinto número (tomo 1 / tomo 12) son obras distintas
+        if titles[i][0] == titles[j][0] or (numbers[i] == numbers[j] and jaccard(shingles[i], shingles[j]) >= threshold):
+            groups.union(i, j)
+    # Título sin subtítulo y sus variantes "título: subtítulo"
+    bare = {}
+    for i, (full, main) in enumerate(titles):
+        if main is None:
+            bare.setdefault(full, i)
+    for i, (_, main) in enumerate(titles):
+        if main and main in bare:
+            groups.union(i, bare[main])
+    return [groups.find(i) for i in range(len(titles))]
+
+
+def _block_titles(book):
+    """(título normalizado, título principal normalizado si tiene subtítulo o None)."""
+    title = (book.get('title') or '').split('(')[0]
+    full = normalize_title(title) or book['base_title_slug']
+    parts = _SUBTITLE_RE.split(title, 1)
+    return full, (normalize_title(parts[0]) or None) if len(parts) > 1 else None
+
+
+def _block_roots(author_key, members, threshold):
+    """Grupo (índice de su representante) de cada libro de un bloque de autor."""
+    if len(members) == 1:
+        return [0]
+    if not author_key:
+        # Sin autor no se distingue un libro homónimo de otra edición: solo se agrupa por título base exacto
+        first = {}
+        return [first.setdefault(book['base_title_slug'], i) for i, book in enumerate(members)]
+    return _cluster_block([_block_titles(book) for book in members], threshold)
+
+
+def _cluster_slug(group):
+    """Título base más frecuente del grupo (a igualdad, el más corto y luego el primero alfabéticamente)."""
+    counts = Counter(book['base_title_slug'] for book in group)
+    return min(counts, key=lambda s: (-counts[s], len(s), s)) if len(counts) > 1 else group[0]['base_title_slug']
+
+
+def _name_clusters(clusters):
+    """Escribe en cada libro el slug de su grupo: el título base, con el autor (y un número) si coincide con otro."""
+    named = {}
+    for author_slug, author_key, group in clusters:
+        named.setdefault((author_slug, _cluster_slug(group)), []).append((author_key, group))
+    used = {key for key, same in named.items() if len(same) == 1}
+    for (author_slug, slug), same in sorted(item for item in named.items() if len(item[1]) > 1):
+        for author_key, group in sorted(same, key=lambda c: (c[0], _first_key(c[1]))):
+            base = f"{slug}-{slugify_ascii(author_key)}" if author_key else slug
+            unique, n = base, 2
+            while (author_slug, unique) in used:
+                unique, n = f"{base}-{n}", n + 1
+            used.add((author_slug, unique))
+            for book in group:
+                book['base_title_slug'] = unique
+    for (author_slug, slug), same in named.items():
+        if len(same) == 1:
+            for book in same[0][1]:
+                book['base_title_slug'] = slug
+
+
+def cluster_editions(books, threshold=0.75):
+    """Asigna a cada libro el base_title_slug de su grupo de ediciones. Devuelve el número de grupos."""
+    blocks = {}
+    for book in books:
+        if book.get('author_slug') and book.get('base_title_slug'):
+            blocks.setdefault((book['author_slug'], primary_author(book).lower()), []).append(book)
+    clusters = []
+    for (author_slug, author_key), members in blocks.items():
+        grouped = {}
+        for book, root in zip(members, _block_roots(author_key, members, threshold)):
+            grouped.setdefault(root, []).append(book)
+        clusters += [(author_slug, author_key, group) for group in grouped.values()]
+    _name_clusters(clusters)
+    return len(clusters)
+
+
+def edition_similarity(config):
+    """Umbral de EDITION_SIMILARITY para load_processed_books, o None si EDITION_CLUSTERING está desactivado."""
+    return config.get('EDITION_SIMILARITY', 0.75) if config.get('EDITION_CLUSTERING', True) else None
+
+
+def _first_key(group):
+    return min(book.get('title_slug') or '' for book in group)
@@ -0,0 +1,95 @@
+# app/utils/fragment_cache.py
+"""
+Caché de fragmentos de plantilla por (plantilla, fragmento, entradas).
+
+Uso en una plantilla:
+
+    {% cache_fragment 'footer_disclaimer', lang %} ... {% endcache_fragment %}
+
+El primer argumento es el nombre del fragmento y el resto son las entradas de las que depende su HTML
+(idioma, índices, etc.). El hash del código fuente de la plantilla se incrusta en la clave al compilar,
+así que editar la plantilla invalida sus fragmentos. La caché vive en el entorno Jinja de cada proceso
+(servidor o worker del generador) y se reutiliza entre páginas.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """LRU acotada y thread-safe de fragmentos ya renderizados."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """Etiqueta {% cache_fragment nombre, entrada1, ... %}...{% endcache_fragment %}."""
+
+    tags = {'cache_fragment'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def _template_hash(self, template_name):
+        try:
+            source, _, _ = self.environment.loader.get_source(self.environment, template_name)
+        except Exception:
+            return template_name or ''
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_args = [nodes.Const(f"{parser.name}:{self._template_hash(parser.name)}"), parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key_args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache_fragment',), drop_needle=True)
+        call = self.call_method('_render_cached', [nodes.List(key_args)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key_parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = repr(key_parts)
+        rendered = cache.get(key)
+        if rendered is None:
+            rendered = caller()
+            cache.set(key, rendered)
+        return rendered
+
+
+def init_fragment_cache(app):
+    """Registra la etiqueta cache_fragment; con FRAGMENT_CACHE desactivado la etiqueta solo renderiza el bloque."""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config.get('FRAGMENT_CACHE', True):
+        app.jinja_env.fragment_cache = FragmentCache(app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 4096))
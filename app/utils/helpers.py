@@ -1,4 +1,5 @@
 # app/utils/helpers.py
+import ast
 import re
 from unidecode import unidecode
 import json
@@ -46,17 +47,64 @@ def get_sitemap_char_group_for_author(name_or_slug, slugifier_func=slugify_ascii
     # O, si se pasa un nombre, se slugifica.
     slug = slugifier_func(str(name_or_slug)) # Aplicar siempre el slugifier esperado
 
-    logger_helpers.debug(f"get_sitemap_char_group (helper): Input='{name_or_slug}', Slug='{slug}' (con {slugifier_func.__name__})")
+    logger_helpers.debug(
+        "get_sitemap_char_group (helper): Input='%s', Slug='%s' (con %s)", name_or_slug, slug, slugifier_func.__name__
+    )
     
     if not slug:
         return special_key_to_use
     
     char = slug[0].lower()
     res = char if char in alphabet_to_use else special_key_to_use
-    logger_helpers.debug(f"get_sitemap_char_group (helper): PrimerChar='{char}', Grupo='{res}'")
+    logger_helpers.debug("get_sitemap_char_group (helper): PrimerChar='%s', Grupo='%s'", char, res)
     return res
 
 
+def get_sitemap_char_group_for_slug(author_slug):
+    """Versión rápida para slugs ya normalizados (no vuelve a slugificar): 'a'-'z' o '0'."""
+    if not author_slug:
+        return SPECIAL_CHARS_SITEMAP_KEY_HELPER
+    char = str(author_slug)[0].lower()
+    return char if char in ALPHABET_SITEMAP_HELPER else SPECIAL_CHARS_SITEMAP_KEY_HELPER
+
+
+def get_book_identifier(book):
+    """Identificador usado en las URLs de detalle de libro (isbn10, isbn13 o asin, en ese orden)."""
+    return book.get('isbn10') or book.get('isbn13') or book.get('asin')
+
+
+def get_book_url_key(book):
+    """
+    (author_slug, title_slug, identificador) de la página de detalle del libro, o None si no la tiene. Es la
+    clave única de un libro: hay identificadores repetidos (p. ej. isbn13 '9999999999999') en libros distintos.
+    """
+    identifier = get_book_identifier(book)
+    author_slug, title_slug = book.get('author_slug'), book.get('title_slug')
+    return (author_slug, title_slug, identifier) if author_slug and title_slug and identifier else None
+
+
+_SIMPLE_LIST_RE = re.compile(r"\['[^'\"\\]*'(?:, '[^'\"\\]*')*\]")
+
+
+def parse_list_field(value):
+    """Campos de lista de los CSV ("['Fantasy', 'Humor']") o texto separado por comas."""
+    if not value:
+        return []
+    text = str(value).strip()
+    if text == '[]':
+        return []
+    if _SIMPLE_LIST_RE.fullmatch(text):
+        return text[2:-2].split("', '")  # Caso habitual (sin comillas ni escapes): sin pasar por literal_eval
+    if text.startswith('['):
+        try:
+            parsed = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            parsed = None
+        if isinstance(parsed, (list, tuple)):
+            return [str(item) for item in parsed]
+    return text.split(',')
+
+
 def ensure_https_filter(url_string):
     """Filtro Jinja2 para asegurar que una URL es HTTPS."""
     if not url_string:
@@ -0,0 +1,63 @@
+# app/utils/log_utils.py
+"""
+Logging para el camino caliente del build.
+
+- EventCounters: los eventos por página (escrita, saltada...) se acumulan en memoria y se vuelcan en
+  una sola línea cada flush_interval segundos, en lugar de una línea de log por página.
+- Cola de logs: los workers solo encolan registros (QueueHandler); un QueueListener en el proceso
+  padre los formatea y escribe con un único handler, sin que varios procesos compitan por stderr.
+"""
+import logging
+import logging.handlers
+import threading
+import time
+from collections import Counter
+
+COUNTERS_FLUSH_INTERVAL = 10.0
+
+
+class EventCounters:
+    """Contadores agregados con volcado periódico (thread-safe: los incrementan también los hilos de escritura)."""
+
+    def __init__(self, logger, label, flush_interval=COUNTERS_FLUSH_INTERVAL):
+        self._logger = logger
+        self._label = label
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self.totals = Counter()
+        self._last_flush = time.monotonic()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._pending[name] += amount
+            self.totals[name] += amount
+            due = time.monotonic() - self._last_flush >= self._flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, totals = dict(self._pending), dict(self.totals)
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+        summary = ", ".join(f"{name}=+{count} (total {totals[name]})" for name, count in sorted(pending.items()))
+        self._logger.info("%s: %s", self._label, summary)
+
+
+def start_log_listener(log_queue, *handlers):
+    """Arranca en el proceso padre el listener que vacía la cola de logs de los workers."""
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def attach_queue_handler(logger, log_queue, level):
+    """Sustituye los handlers del logger por un QueueHandler (en el worker solo se encola el registro)."""
+    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
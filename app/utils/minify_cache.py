@@ -0,0 +1,59 @@
+# app/utils/minify_cache.py
+import hashlib
+import os
+from pathlib import Path
+
+from flask_minify.parsers import Parser
+
+# Parser de Flask-Minify con las mismas opciones que usa create_app (html, js y css inline),
+# para que el HTML minificado en build sea idéntico al que se serviría en el servidor.
+_parser = None
+
+
+def _get_parser():
+    global _parser
+    if _parser is None:
+        _parser = Parser(fail_safe=True, go=False)
+        _parser.update_runtime_options(html=True, js=True, cssless=True)
+    return _parser
+
+
+def minify_html_cached(content, cache_dir):
+    """
+    Minifica HTML (bytes) usando una caché en disco indexada por el hash del contenido de entrada.
+    :return: Tupla (bytes minificados, True si vino de la caché).
+    """
+    key = hashlib.sha1(content).hexdigest()
+    cache_path = Path(cache_dir) / key[:2] / f"{key}.html"
+    if cache_path.exists():
+        os.utime(cache_path)  # Marca de uso para prune_minify_cache
+        return cache_path.read_bytes(), True
+
+    minified = _get_parser().minify(content.decode('utf-8'), 'html').encode('utf-8')
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(minified)
+    os.replace(tmp_path, cache_path)  # Atómico: varios workers pueden escribir la misma clave
+    return minified, False
+
+
+def prune_minify_cache(cache_dir, max_bytes):
+    """
+    Acota la caché a max_bytes borrando primero las entradas usadas (leídas o escritas) hace más tiempo.
+    Devuelve (entradas borradas, entradas conservadas).
+    """
+    entries = []
+    for cache_path in Path(cache_dir).glob('*/*.html'):
+        try:
+            stat = cache_path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, cache_path))
+    entries.sort(reverse=True)  # Más recientes primero
+    total = removed = 0
+    for _, size, cache_path in entries:
+        total += size
+        if total > max_bytes:
+            cache_path.unlink(missing_ok=True)
+            removed += 1
+    return removed, len(entries) - removed
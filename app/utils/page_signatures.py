@@ -0,0 +1,94 @@
+# app/utils/page_signatures.py
+"""
+Firmas de contenido de las páginas generadas (las que guarda el manifest de generate_static.py).
+Las comparten el generador y el servidor híbrido (app.utils.static_site) para decidir si un archivo
+de _site sigue vigente para los datos cargados.
+"""
+import hashlib
+import json
+
+
+def calculate_signature(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def get_book_signature_fields(data):
+    return dict(sorted({
+        "isbn10": data.get("isbn10"), "isbn13": data.get("isbn13"), "asin": data.get("asin"),
+        "title_slug": data.get("title_slug"), "author_slug": data.get("author_slug"),
+        "description": data.get("description_short") or data.get("description"),
+        "cover_image_url": (data.get("image_url_l") or data.get("image_url_m") or data.get("image_url_s")),
+        "publication_date": data.get("publication_date"), "publisher": data.get("publisher_name"),
+        "language_code": data.get("language_code"),
+    }.items()))
+
+
+def _book_ids(books):
+    return sorted([b.get('isbn10') or b.get('isbn13') or b.get('asin') for b in books])
+
+
+def book_page_signature(book, related_ids=None, facet_links=None):
+    """
+    related_ids: identificadores de sus libros relacionados; facet_links: sus (tipo, slug, nombre) con página
+    de faceta. Solo entran en la firma si los hay.
+    """
+    fields = get_book_signature_fields(book)
+    if related_ids:
+        fields = {**fields, "related": list(related_ids)}
+    if facet_links:
+        fields = {**fields, "facets": [list(link) for link in facet_links]}
+    return calculate_signature(fields)
+
+
+def author_page_signature(author_slug, books, page_number=1, has_next=False):
+    """books: libros de la página en el orden en que se muestran (el orden también cambia el HTML)."""
+    return calculate_signature({
+        "book_ids": [b.get('isbn10') or b.get('isbn13') or b.get('asin') for b in books], "author_slug": author_slug,
+        "page": page_number, "has_next": has_next
+    })
+
+
+def versions_page_signature(author_slug, base_title_slug, books):
+    return calculate_signature({"book_ids": _book_ids(books), "author_slug": author_slug, "base_title_slug": base_title_slug})
+
+
+def facet_page_signature(facet_type, facet_slug, facet_name, page_number, has_next, books):
+    """Los libros por su URL de detalle: el identificador solo se repite entre libros distintos."""
+    return calculate_signature({
+        "books": sorted([b.get('author_slug'), b.get('title_slug'), b.get('isbn10') or b.get('isbn13') or b.get('asin')]
+                        for b in books),
+        "facet": [facet_type, facet_slug, facet_name],
+        "page": page_number, "has_next": has_next
+    })
+
+
+def facet_list_signature(facet_type, values):
+    return calculate_signature({"facet_type": facet_type, "values": [list(value) for value in values]})
+
+
+def leaderboard_page_signature(board, scope, scope_name, books):
+    """books en orden de la clasificación, por su URL de detalle y con los valores que muestra la página."""
+    return calculate_signature({
+        "board": [board, scope, scope_name],
+        "books": [
+            [b.get('author_slug'), b.get('title_slug'), b.get('isbn10') or b.get('isbn13') or b.get('asin'),
+             b.get('average_rating'), b.get('numRatings')]
+            for b in books
+        ],
+    })
+
+
+def leaderboard_list_signature(page):
+    return calculate_signature({
+        "boards": page['boards'], "years": page['years'], "categories": [list(c) for c in page['categories']]
+    })
+
+
+def index_page_signature(app, lang_code):
+    """La portada de idioma depende de los bestsellers y del selector de idiomas; "/" (lang_code None) solo redirige."""
+    if lang_code is None:
+        return calculate_signature({"redirect_to": app.config.get('DEFAULT_LANGUAGE', 'en')})
+    return calculate_signature({
+        "lang": lang_code, "languages": app.config.get('SUPPORTED_LANGUAGES', ['en']),
+        "bestsellers": getattr(app, 'bestsellers_data', []) or []
+    })
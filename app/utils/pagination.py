@@ -0,0 +1,45 @@
+# app/utils/pagination.py
+"""
+Paginación de listas de libros con cortes estables (páginas de faceta y de autor).
+
+Los libros se ordenan por (título, identificador, autor) y una página termina en un libro cuyo crc32 de su
+clave de URL (autor, título, identificador; única aunque haya identificadores repetidos) cae en 1 de cada
+(page_size - mínimo) valores, con un mínimo de page_size/4 y un máximo de
+2*page_size libros por página. Como los cortes dependen del propio libro y no de su posición, añadir o quitar
+un libro solo cambia la página que lo contiene (salvo que sea el libro del corte o la página llegue al máximo:
+entonces se unen o parten páginas y se renumeran las siguientes); un troceo por tamaño fijo desplazaría todas
+las páginas siguientes y el manifest del build tendría que regenerarlas.
+"""
+import zlib
+
+from app.utils.helpers import get_book_identifier, get_book_url_key
+
+
+def book_sort_key(book):
+    return (book.get('title_slug') or '', get_book_identifier(book) or '', book.get('author_slug') or '')
+
+
+def _cut_hash(book):
+    key = get_book_url_key(book) or (book.get('title_slug') or '', get_book_identifier(book) or '')
+    return zlib.crc32('/'.join(key).encode('utf-8'))
+
+
+def stable_pages(books, page_size):
+    """Trocea books (ya ordenados con book_sort_key) con cortes definidos por el contenido."""
+    min_size = max(1, page_size // 4)
+    max_size = page_size * 2
+    spacing = max(1, page_size - min_size)
+    pages, current = [], []
+    for book in books:
+        current.append(book)
+        if len(current) >= max_size or (
+            len(current) >= min_size and _cut_hash(book) % spacing == 0
+        ):
+            pages.append(current)
+            current = []
+    if current:
+        if pages and len(current) < min_size and len(pages[-1]) + len(current) <= max_size:
+            pages[-1] = pages[-1] + current  # Cola demasiado corta: se une a la última página
+        else:
+            pages.append(current)
+    return pages
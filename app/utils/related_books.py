@@ -0,0 +1,249 @@
+# app/utils/related_books.py
+"""
+Libros relacionados precalculados (top-k por libro) a partir de categorías y autores compartidos y valoraciones.
+
+Similitud de a con b: suma del IDF de las categorías compartidas más RELATED_AUTHOR_WEIGHT si comparten autor,
+multiplicada por un factor de calidad de b (nota media y número de valoraciones). Se excluyen el propio libro
+y sus otras ediciones (mismo autor y título base: ya las enlaza la página de versiones).
+
+El producto disperso libros x categorías se hace con listas invertidas (NumPy no es dependencia del proyecto):
+por cada una de las RELATED_CANDIDATE_CATEGORIES categorías menos frecuentes del libro, Counter.update sobre su
+lista de libros (ordenada por popularidad y limitada a RELATED_MAX_POSTINGS) cuenta en C las coincidencias, y
+solo los RELATED_PRESELECT mejores candidatos se puntúan con los pesos exactos.
+
+La tabla (RELATED_BOOKS_PATH) guarda la clave de cada libro (autor, título e identificador de su URL de detalle:
+hay identificadores repetidos), una firma de sus rasgos y, por libro, los índices de sus relacionados. Al
+actualizarla solo se recalculan los libros nuevos o con rasgos cambiados, los que apuntaban a un libro cambiado
+o eliminado y aquellos en cuyo top-k entra ahora un libro cambiado. El resto conserva su fila aunque el IDF se
+haya movido un poco (puede diferir en empates de una reconstrucción completa, que se hace si cambia más de
+RELATED_FULL_REBUILD_RATIO del catálogo o con --full).
+"""
+import hashlib
+import json
+import math
+import os
+from collections import Counter
+
+from app.utils.helpers import get_book_url_key, parse_list_field, slugify_ascii
+
+TABLE_VERSION = 2
+
+
+def _to_float(value):
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+def book_features(book):
+    """(categorías, autores, obra) normalizados de un libro."""
+    categories = frozenset(c.strip().lower() for c in parse_list_field(book.get('categories')) if c.strip())
+    author_names = [book['author']] if book.get('author') else parse_list_field(book.get('author_list'))
+    authors = frozenset(slugify_ascii(name) for name in author_names if name and name.strip())
+    return categories, authors, (book.get('author_slug'), book.get('base_title_slug'))
+
+
+def quality(book):
+    """Factor de valoraciones entre 1 y 1.5: nota media y (en escala logarítmica) número de valoraciones."""
+    rating = min(_to_float(book.get('average_rating')), 5.0) / 5.0
+    votes = min(math.log10(1 + _to_float(book.get('numRatings'))), 6.0) / 6.0
+    return 1.0 + 0.25 * rating + 0.25 * votes
+
+
+def _signature(book, features):
+    categories, authors, work = features
+    payload = [sorted(categories), sorted(authors), list(work), book.get('average_rating'), book.get('numRatings')]
+    return hashlib.md5(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+class RelatedBooksModel:
+    """Listas invertidas e IDF del catálogo para puntuar candidatos."""
+
+    def __init__(self, books, params):
+        self.params = params
+        self.keys, self.books, seen = [], [], set()
+        for book in books:
+            key = get_book_url_key(book)
+            if key and key not in seen:  # Como las rutas (CatalogIndex.by_url): con la misma URL gana el primero
+                seen.add(key)
+                self.keys.append(key)
+                self.books.append(book)
+        self.features = [book_features(book) for book in self.books]
+        self.quality = [quality(book) for book in self.books]
+        self.signatures = [_signature(book, features) for book, features in zip(self.books, self.features)]
+        popularity_order = sorted(
+            range(len(self.books)), key=lambda i: _to_float(self.books[i].get('numRatings')), reverse=True
+        )
+        category_books, author_books = {}, {}
+        for i in popularity_order:
+            categories, authors, _ = self.features[i]
+            for category in categories:
+                category_books.setdefault(category, []).append(i)
+            for author in authors:
+                author_books.setdefault(author, []).append(i)
+        total = max(len(self.books), 1)
+        self.idf = {category: math.log(total / len(members)) for category, members in category_books.items()}
+        max_postings = params['max_postings']
+        self.category_postings = {category: members[:max_postings] for category, members in category_books.items()}
+        self.author_postings = author_books
+
+    def similarity(self, i, j):
+        """Parte simétrica de la puntuación (categorías y autor compartidos)."""
+        categories_i, authors_i, _ = self.features[i]
+        categories_j, authors_j, _ = self.features[j]
+        score = sum(self.idf[category] for category in categories_i & categories_j)
+        if authors_i & authors_j:
+            score += self.params['author_weight']
+        return score
+
+    def scored_candidates(self, i):
+        """[(puntuación, j)] de los candidatos preseleccionados de i, sin él mismo ni sus otras ediciones."""
+        categories, authors, work = self.features[i]
+        counts = Counter()
+        # Las categorías menos frecuentes (mayor IDF) son las que más discriminan
+        for category in sorted(categories, key=self.idf.get, reverse=True)[:self.params['candidate_categories']]:
+            counts.update(self.category_postings[category])
+        for author in authors:
+            for j in self.author_postings[author]:
+                counts[j] += len(categories) + 1  # Mismo autor: siempre entre los preseleccionados
+        counts.pop(i, None)
+        scored = []
+        for j, _ in counts.most_common(self.params['preselect']):
+            if self.features[j][2] == work:
+                continue
+            score = self.similarity(i, j)
+            if score > 0:
+                scored.append((score * self.quality[j], j))
+        return scored
+
+    def top_k(self, i):
+        """(índices de los k relacionados de i, puntuación del último o 0 si hay menos de k)."""
+        k = self.params['top_k']
+        best = sorted(self.scored_candidates(i), key=lambda pair: (-pair[0], pair[1]))[:k]
+        return [j for _, j in best], (round(best[-1][0], 6) if len(best) == k else 0.0)
+
+
+def load_related_table(path):
+    """Tabla guardada o None si no existe o no se puede leer."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return table if table.get('version') == TABLE_VERSION else None
+
+
+def related_params(config):
+    return {
+        'top_k': config.get('RELATED_TOP_K', 6),
+        'max_postings': config.get('RELATED_MAX_POSTINGS', 300),
+        'candidate_categories': config.get('RELATED_CANDIDATE_CATEGORIES', 5),
+        'preselect': config.get('RELATED_PRESELECT', 50),
+        'author_weight': config.get('RELATED_AUTHOR_WEIGHT', 8.0),
+    }
+
+
+def _previous_rows(previous, params):
+    """{clave: (firma, claves de sus relacionados, puntuación del último)} de la tabla previa con los mismos parámetros."""
+    if not previous or previous.get('params') != params:
+        return {}
+    old_keys = [tuple(key) for key in previous['keys']]
+    return {
+        key: (signature, [old_keys[r] for r in row], min_score)
+        for key, signature, row, min_score in zip(old_keys, previous['signatures'], previous['rows'], previous['min_scores'])
+    }
+
+
+def _dirty_rows(model, old_rows, changed):
+    """
+    Filas a recalcular: las de libros cambiados, las que apuntan a uno cambiado o eliminado y aquellas en cuyo
+    top-k puede entrar ahora un libro cambiado.
+    """
+    current = set(model.keys)
+    stale_keys = {model.keys[i] for i in changed} | {key for key in old_rows if key not in current}
+    dirty = set(changed)
+    for i, key in enumerate(model.keys):
+        if i not in dirty and any(r in stale_keys for r in old_rows[key][1]):
+            dirty.add(i)
+    # Un libro cambiado puede entrar en el top-k de otros: la similitud es simétrica, así que basta con
+    # comparar su puntuación vista desde cada candidato con el último del top-k guardado de ese candidato
+    k = model.params['top_k']
+    for c in changed:
+        for _, j in model.scored_candidates(c):
+            if j in dirty:
+                continue
+            _, old_row, min_score = old_rows[model.keys[j]]
+            if len(old_row) < k or model.similarity(c, j) * model.quality[c] > min_score:
+                dirty.add(j)
+    return dirty
+
+
+def update_related_table(books, previous, params, full_rebuild_ratio=0.3):
+    """
+    (tabla nueva, número de libros recalculados). Con una tabla previa de los mismos parámetros solo se
+    recalculan las filas afectadas; si cambió más de full_rebuild_ratio del catálogo se recalcula todo.
+    """
+    model = RelatedBooksModel(books, params)
+    n = len(model.keys)
+    old_rows = _previous_rows(previous, params)
+    changed = {i for i in range(n) if (old_rows.get(model.keys[i]) or (None,))[0] != model.signatures[i]}
+    if not old_rows or len(changed) > full_rebuild_ratio * n:
+        dirty = set(range(n))
+    else:
+        dirty = _dirty_rows(model, old_rows, changed)
+    index_of = {key: i for i, key in enumerate(model.keys)}
+    rows, min_scores = [], []
+    for i, key in enumerate(model.keys):
+        if i in dirty:
+            row, min_score = model.top_k(i)
+        else:
+            _, old_row, min_score = old_rows[key]
+            row = [index_of[r] for r in old_row]
+        rows.append(row)
+        min_scores.append(min_score)
+    table = {
+        'version': TABLE_VERSION, 'params': params, 'keys': [list(key) for key in model.keys],
+        'signatures': model.signatures, 'rows': rows, 'min_scores': min_scores,
+    }
+    return table, len(dirty)
+
+
+def save_related_table(path, table):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def refresh_related_table(books, config, full=False):
+    """Actualiza la tabla de RELATED_BOOKS_PATH (entera si full). Devuelve (tabla, libros recalculados)."""
+    path = config.get('RELATED_BOOKS_PATH', '.cache/related_books.json')
+    previous = None if full else load_related_table(path)
+    table, recomputed = update_related_table(
+        books, previous, related_params(config), config.get('RELATED_FULL_REBUILD_RATIO', 0.3)
+    )
+    if table != previous:
+        save_related_table(path, table)
+    return table, recomputed
+
+
+def related_index(table):
+    """{clave de libro: [claves de sus relacionados]} de una tabla (vacío si no hay tabla); ver get_book_url_key."""
+    if not table:
+        return {}
+    keys = [tuple(key) for key in table['keys']]
+    return {key: [keys[r] for r in row] for key, row in zip(keys, table['rows']) if row}
+
+
+def init_related_books(app):
+    """Carga la tabla de RELATED_BOOKS_PATH en app.related_books (la calcula scripts/precompute_related.py o el build)."""
+    app.related_books = related_index(
+        load_related_table(app.config.get('RELATED_BOOKS_PATH', '.cache/related_books.json'))
+    )
+
+
+def related_book_ids(app, book):
+    """Claves (author_slug, title_slug, identificador) de los relacionados del libro."""
+    return (getattr(app, 'related_books', None) or {}).get(get_book_url_key(book), [])
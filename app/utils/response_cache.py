@@ -0,0 +1,237 @@
+# app/utils/response_cache.py
+"""
+Caché en memoria de páginas HTML ya renderizadas para el servidor (run.py / gunicorn).
+
+Las vistas de libro, autor, versiones, facetas, clasificaciones e índice se renderizan y minifican una sola
+vez por (URL, versión de datos); las siguientes peticiones sirven los bytes guardados (y su variante gzip)
+con ETag fuerte y Last-Modified, respondiendo 304 si el cliente ya los tiene. Si llegan varias
+peticiones a la vez para una página que no está en caché, solo una la renderiza y las demás esperan
+su resultado (single-flight). La caché es por proceso: cada worker de gunicorn tiene la suya.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+
+from app.models.facet_index import FACET_ENDPOINTS
+from app.models.leaderboards import LEADERBOARD_ENDPOINTS
+from app.utils.minify_cache import _get_parser
+
+CACHED_ENDPOINTS = (
+    'main.index', 'main.book_by_identifier', 'main.author_books', 'main.author_books_page', 'main.book_versions'
+) + FACET_ENDPOINTS + LEADERBOARD_ENDPOINTS
+SINGLE_FLIGHT_TIMEOUT = 30.0
+
+
+class CachedPage:
+    __slots__ = ('body', 'gzip_body', 'etag', 'mimetype')
+
+    def __init__(self, body, gzip_body, mimetype):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.mimetype = mimetype
+
+    @property
+    def size(self):
+        return len(self.body) + len(self.gzip_body)
+
+
+class ResponseCache:
+    """LRU acotada por número de entradas y por bytes, thread-safe, con single-flight por clave."""
+
+    def __init__(self, max_entries=2048, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def claim(self, key):
+        """Devuelve None si esta petición debe renderizar la clave, o el Event de quien ya la está renderizando."""
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._inflight[key] = threading.Event()
+            return pending
+
+    def release(self, key):
+        with self._lock:
+            pending = self._inflight.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def compute_data_version(app):
+    """
+    (versión, fecha de modificación) de los datos servidos, a partir de tamaño y mtime de los CSV de libros,
+    bestsellers y traducciones. Los datos se cargan al arrancar, así que se calcula una vez por proceso.
+    """
+    paths = [app.config.get('BESTSELLERS_JSON_PATH'), app.config.get('TRANSLATIONS_JSON_PATH')]
+    books_dir = app.config.get('BOOKS_DATA_DIR')
+    if books_dir and os.path.isdir(books_dir):
+        paths.extend(os.path.join(books_dir, name) for name in sorted(os.listdir(books_dir)) if name.endswith('.csv'))
+    h = hashlib.sha1()
+    latest_mtime = 0
+    for path in paths:
+        if not path or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        h.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+        latest_mtime = max(latest_mtime, int(stat.st_mtime))
+    return h.hexdigest()[:12], datetime.fromtimestamp(latest_mtime, tz=timezone.utc)
+
+
+def _accepts_gzip():
+    return request.accept_encodings['gzip'] > 0
+
+
+def _cache_key():
+    return (request.path, request.query_string, current_app.config['_RESPONSE_CACHE_DATA_VERSION'])
+
+
+def _build_response(entry):
+    use_gzip = _accepts_gzip()
+    response = current_app.response_class(entry.gzip_body if use_gzip else entry.body, mimetype=entry.mimetype)
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # ETag fuerte por representación: la variante gzip tiene bytes distintos
+    response.set_etag(f"{entry.etag}-gz" if use_gzip else entry.etag)
+    response.last_modified = current_app.config['_RESPONSE_CACHE_LAST_MODIFIED']
+    response.cache_control.public = True
+    response.cache_control.no_cache = True  # Se puede guardar, pero revalidando con ETag (304)
+    return response.make_conditional(request)
+
+
+def _serve_from_cache():
+    if request.method not in ('GET', 'HEAD') or request.endpoint not in CACHED_ENDPOINTS or current_app.debug:
+        return None
+    cache = current_app.response_cache
+    key = _cache_key()
+    entry = cache.get(key)
+    if entry is None:
+        pending = cache.claim(key)
+        if pending is None:
+            g._response_cache_key = key
+            return None
+        pending.wait(SINGLE_FLIGHT_TIMEOUT)
+        entry = cache.get(key)
+        if entry is None:  # El render de la otra petición falló o no era cacheable: se renderiza aquí
+            return None
+    g._response_cache_hit = True
+    return _build_response(entry)
+
+
+def _minify_body(body):
+    if not current_app.config.get('MINIFY_HTML', True) or g.pop('_html_minified', False):
+        return body
+    return _get_parser().minify(body.decode('utf-8'), 'html').encode('utf-8')
+
+
+def _store_in_cache(response):
+    if g.pop('_response_cache_hit', False):
+        return response
+    key = g.pop('_response_cache_key', None)
+    try:
+        if request.endpoint not in CACHED_ENDPOINTS or response.mimetype != 'text/html' or response.direct_passthrough:
+            return response
+        if response.is_streamed:
+            # Listado en streaming (ya minificado por bloques): se guarda al terminar de enviarse si no supera
+            # RESPONSE_CACHE_STREAM_MAX_BYTES. Hasta entonces el resto de peticiones lo renderizan por su cuenta.
+            if key is not None and response.status_code == 200:
+                response.response = _tee_into_cache(
+                    current_app._get_current_object(), response.response, key, response.mimetype
+                )
+            return response
+        # Flask-Minify omite estos endpoints: se minifica aquí, una vez por página cacheada
+        body = _minify_body(response.get_data())
+        if key is None or response.status_code != 200:  # Modo debug o error/redirección: sin caché, solo minificado
+            response.set_data(body)
+            return response
+        entry = CachedPage(body, gzip.compress(body, current_app.config.get('RESPONSE_CACHE_GZIP_LEVEL', 6)),
+                           response.mimetype)
+        current_app.response_cache.set(key, entry)
+        return _build_response(entry)
+    finally:
+        if key is not None:
+            current_app.response_cache.release(key)
+
+
+def _tee_into_cache(app, chunks, key, mimetype):
+    # Generador: se recorre al enviar la respuesta, ya fuera del contexto de la app
+    limit = app.config.get('RESPONSE_CACHE_STREAM_MAX_BYTES', 1024 * 1024)
+    parts, size = [], 0
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size <= limit:
+                parts.append(chunk)
+            else:
+                parts = None  # Demasiado grande para la caché: no se retiene en memoria
+        yield chunk
+    if parts is not None:
+        body = b''.join(parts)
+        gzipped = gzip.compress(body, app.config.get('RESPONSE_CACHE_GZIP_LEVEL', 6))
+        app.response_cache.set(key, CachedPage(body, gzipped, mimetype))
+
+
+def _release_on_error(exc):
+    key = g.pop('_response_cache_key', None)
+    if key is not None:
+        current_app.response_cache.release(key)
+
+
+def init_response_cache(app):
+    """
+    Registra los hooks de la caché de respuestas si RESPONSE_CACHE está activo. Devuelve la lista de
+    endpoints cacheados (Flask-Minify debe omitirlos: la caché guarda el HTML ya minificado) o [].
+    """
+    if not app.config.get('RESPONSE_CACHE', False):
+        return []
+    app.response_cache = ResponseCache(
+        app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 2048),
+        app.config.get('RESPONSE_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+    )
+    version, last_modified = compute_data_version(app)
+    app.config['_RESPONSE_CACHE_DATA_VERSION'] = version
+    app.config['_RESPONSE_CACHE_LAST_MODIFIED'] = last_modified
+    app.before_request(_serve_from_cache)
+    app.after_request(_store_in_cache)
+    app.teardown_request(_release_on_error)
+    return [endpoint.replace('.', r'\.') + '$' for endpoint in CACHED_ENDPOINTS]
@@ -0,0 +1,97 @@
+# app/utils/search_index.py
+"""
+Índice de búsqueda estático sobre títulos y autores, escrito por generate_static.py en SEARCH_INDEX_DIR:
+- t/<prefijo>.json: {token: ids de documento} de los tokens que empiezan por ese prefijo (los primeros
+  SEARCH_PREFIX_LEN caracteres; un token más corto va en el fragmento de su propio texto). Los ids van
+  ordenados y codificados como diferencias con el anterior.
+- d/<bloque>.json: [título, autor, "autor/título/identificador"] de los documentos id // SEARCH_DOC_BLOCK,
+  con null en los huecos de libros eliminados.
+Los tokens se normalizan con slugify_ascii (unidecode). Los ids se conservan entre builds (archivo de ids
+en .cache) para que los fragmentos sin cambios salgan idénticos y no se reescriban. static/js/search.js
+pide solo el fragmento del prefijo escrito y los bloques de los resultados que muestra.
+"""
+import json
+import re
+
+from app.utils.helpers import get_book_identifier, slugify_ascii
+
+TOKEN_SPLIT_RE = re.compile(r'[-_]+')
+
+
+def normalize_tokens(text):
+    """Tokens ASCII en minúsculas del texto (la misma normalización que los slugs de las URLs)."""
+    if not text:
+        return []
+    return [token for token in TOKEN_SPLIT_RE.split(slugify_ascii(text)) if token]
+
+
+def book_tokens(book):
+    """
+    Tokens de título y autor de un libro. Salen de los slugs que ya calcula el cargador (slugify_ascii del
+    título y del autor), así que equivalen a normalize_tokens() sin volver a pasar unidecode.
+    """
+    tokens = []
+    for text_field, slug_field in (('title', 'title_slug'), ('author', 'author_slug')):
+        if book.get(text_field):
+            slug = book.get(slug_field) or slugify_ascii(book[text_field])
+            tokens += [token for token in TOKEN_SPLIT_RE.split(slug) if token]
+    return tokens
+
+
+def document_key(book, slugifier=slugify_ascii):
+    """Parte de la URL de detalle común a todos los idiomas ('autor/título/identificador'); None sin página."""
+    author_slug, title_slug, identifier = book.get('author_slug'), book.get('title_slug'), get_book_identifier(book)
+    if not all([author_slug, title_slug, identifier]):
+        return None
+    return f"{slugifier(author_slug)}/{slugifier(title_slug)}/{identifier}"
+
+
+def assign_doc_ids(keys, previous):
+    """
+    Ids estables: cada documento conserva el id de la ejecución anterior y los nuevos toman ids a partir de
+    'next_id' (no se reutilizan los de libros eliminados). previous/resultado: {"next_id": n, "ids": {...}}.
+    """
+    previous_ids = previous.get('ids', {})
+    next_id = previous.get('next_id', max(previous_ids.values(), default=-1) + 1)
+    ids = {}
+    for key in sorted(keys):
+        if key in previous_ids:
+            ids[key] = previous_ids[key]
+        else:
+            ids[key], next_id = next_id, next_id + 1
+    return {"next_id": next_id, "ids": ids}
+
+
+def _delta_encode(sorted_ids):
+    return [doc_id - prev for doc_id, prev in zip(sorted_ids, [0] + sorted_ids[:-1])]
+
+
+def _dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def build_search_index(books, previous_ids, prefix_len, doc_block):
+    """
+    ({ruta relativa: bytes JSON}, ids asignados). Un documento por URL de detalle (el primer libro del
+    catálogo con esa URL, igual que las rutas); se indexan los tokens del título y del autor.
+    """
+    docs = {}
+    for book in books:
+        key = document_key(book)
+        if key and key not in docs:
+            docs[key] = book
+    doc_ids = assign_doc_ids(docs, previous_ids)
+    postings, blocks = {}, {}
+    for key, book in docs.items():
+        doc_id = doc_ids['ids'][key]
+        for token in set(book_tokens(book)):
+            postings.setdefault(token, []).append(doc_id)
+        block = blocks.setdefault(doc_id // doc_block, {})
+        block[doc_id % doc_block] = [book.get('title') or '', book.get('author') or '', key]
+    shards = {}
+    for token in sorted(postings):
+        shards.setdefault(token[:prefix_len], {})[token] = _delta_encode(sorted(postings[token]))
+    files = {f"t/{prefix}.json": _dumps(tokens) for prefix, tokens in shards.items()}
+    for block_no, entries in blocks.items():
+        files[f"d/{block_no}.json"] = _dumps([entries.get(i) for i in range(max(entries) + 1)])
+    return files, doc_ids
@@ -0,0 +1,147 @@
+# app/utils/shell_build.py
+"""
+Modo "shell + datos" del build (generate_static.py --shell-mode) para las páginas de detalle de libro.
+
+En lugar de un HTML por libro e idioma se escribe:
+- Un shell por idioma (_shells/<lang>/book.html): book.html renderizado con marcadores (__shell_<campo>__)
+  en lugar de los datos del libro.
+- Los datos de los libros en fragmentos JSON compactos (_data/books/<n>.json), indexados y repartidos por
+  un hash FNV-1a de la clave "<autor>/<título>/<identificador>" de la URL (get_book_url_key: hay
+  identificadores repetidos) para que el cliente sepa qué fragmento pedir.
+- Un 404.html que, para las URLs de detalle sin archivo propio, carga el shell del idioma; el script
+  static/js/book_shell.js pide el fragmento y sustituye los marcadores.
+Los libros más populares (numRatings) se siguen renderizando completos.
+
+Limitaciones: servidas vía 404.html, las páginas de la cola larga responden con estado HTTP 404 (los
+buscadores no las indexan aunque estén en el sitemap) salvo que el servidor reescriba esas rutas hacia
+_shells/<lang>/book.html con 200; y el router, el shell y los fragmentos usan rutas absolutas desde la raíz
+del dominio, así que el sitio debe publicarse en la raíz (no en un subdirectorio como /<repo>/).
+"""
+import json
+
+from flask import current_app, url_for
+
+from app.utils.helpers import get_book_url_key
+
+SHELL_TOKEN = "__shell_{}__"
+# Campos de libro que usa book.html (solo se incluyen los que existen en el catálogo cargado)
+SHELL_BOOK_FIELDS = (
+    'title', 'subtitle', 'author', 'author_slug', 'title_slug', 'base_title_slug', 'isbn10', 'isbn13', 'asin',
+    'categories', 'genres', 'description', 'series', 'edition', 'firstPublishDate', 'published_year', 'characters',
+    'language', 'average_rating', 'awards', 'ratingsByStars', 'bbeVotes', 'numRatings', 'product_dimensions',
+    'publisher', 'soldBy', 'weight',
+)
+# Campos de build_book_page_data (en los fragmentos van con prefijo 'page_')
+SHELL_PAGE_FIELDS = (
+    'identifier', 'amazon_identifier', 'base_title_display', 'description_meta', 'description_social',
+    'description_ld', 'image_url',
+)
+# Campos que book.html solo muestra si tienen valor: el cliente elimina su <p>/<h3>/<meta> si vienen vacíos
+SHELL_OPTIONAL_FIELDS = (
+    'subtitle', 'isbn10', 'isbn13', 'asin', 'language', 'categories', 'description', 'series', 'edition',
+    'firstPublishDate', 'published_year', 'characters', 'genres', 'average_rating', 'awards', 'ratingsByStars',
+    'bbeVotes', 'numRatings', 'product_dimensions', 'publisher', 'soldBy', 'weight',
+)
+SHELL_HTML_FIELDS = ('description',)  # Se insertan como HTML (book.html usa | safe)
+
+
+def shell_token(field):
+    return SHELL_TOKEN.format(field)
+
+
+def shell_record_key(book):
+    """Clave "<autor>/<título>/<identificador>" del libro en los fragmentos, o None si no tiene página de detalle."""
+    url_key = get_book_url_key(book)
+    return '/'.join(str(part) for part in url_key) if url_key else None
+
+
+def identifier_shard(record_key, shard_count):
+    """FNV-1a de 32 bits sobre el UTF-8 de la clave del libro (book_shell.js calcula el mismo valor)."""
+    h = 0x811c9dc5
+    for byte in str(record_key).encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h % shard_count
+
+
+def popularity(book):
+    try:
+        return float(book.get('numRatings') or 0)
+    except ValueError:
+        return 0.0
+
+
+def split_by_popularity(books, full_render_top):
+    """(libros que se renderizan completos, libros que van al shell) según numRatings."""
+    ranked = sorted(books, key=popularity, reverse=True)
+    return ranked[:full_render_top], ranked[full_render_top:]
+
+
+def shell_book_fields(books):
+    present = set()
+    for book in books:
+        present.update(field for field in SHELL_BOOK_FIELDS if book.get(field))
+    return [field for field in SHELL_BOOK_FIELDS if field in present or field.endswith('_slug')]
+
+
+def render_book_shell(app, lang_code, book_fields):
+    """book.html con marcadores en lugar de datos, renderizado bajo una URL con marcadores (selector de idioma)."""
+    from app.routes.main_routes import render_book_page
+    shell_book = {field: shell_token(field) for field in book_fields}
+    shell_page = {field: shell_token(f"page_{field}") for field in SHELL_PAGE_FIELDS}
+    url = app.url_builder.path(
+        'main.book_by_identifier', lang_code, author_slug=shell_book['author_slug'],
+        book_slug=shell_book['title_slug'], identifier=shell_page['identifier']
+    )
+    with app.test_request_context(url):
+        html = render_book_page(lang_code, shell_book, shell_page)
+        script_tag = (
+            f'<script src="{url_for("static", filename="js/book_shell.js")}" defer '
+            f'data-shards="{current_app.config.get("SHELL_DATA_SHARDS", 256)}" '
+            f'data-shard-base="/{current_app.config.get("SHELL_DATA_DIR", "_data/books")}/" '
+            f'data-optional="{",".join(SHELL_OPTIONAL_FIELDS)}" data-html="{",".join(SHELL_HTML_FIELDS)}"></script>'
+        )
+    # Oculto hasta hidratar (el script retira el estilo); sin JS la página quedaría con marcadores
+    html = html.replace('</head>', '<style id="shell-cloak">body{visibility:hidden}</style></head>', 1)
+    return html.replace('</body>', f'{script_tag}</body>', 1)
+
+
+def book_shell_record(book, book_fields):
+    """Valores de un libro en el orden de los campos del fragmento (libro + page_*), None si vacíos."""
+    from app.routes.main_routes import build_book_page_data
+    page = build_book_page_data(book)
+    values = [book.get(field) or None for field in book_fields]
+    values += [str(page[field]) if page[field] else None for field in SHELL_PAGE_FIELDS]
+    return values
+
+
+def build_book_shards(books, book_fields, shard_count):
+    """{número de fragmento: bytes JSON} con {"fields": [...], "books": {clave del libro: [valores]}}."""
+    fields = list(book_fields) + [f"page_{field}" for field in SHELL_PAGE_FIELDS]
+    shards = {}
+    for book in books:
+        record_key = shell_record_key(book)
+        if not record_key:
+            continue
+        shards.setdefault(identifier_shard(record_key, shard_count), {})[record_key] = book_shell_record(book, book_fields)
+    return {
+        shard_no: json.dumps({"fields": fields, "books": records}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        for shard_no, records in shards.items()
+    }
+
+
+def render_shell_router(app, langs):
+    """404.html: para /<lang>/<segmento de libro>/<autor>/<título>/<id>/ sin archivo carga el shell del idioma."""
+    shell_dir = app.config.get('SHELL_DIR', '_shells')
+    routes = {lang: {"segment": app.url_builder.segment_path('main.book_by_identifier', lang).split('/')[-1],
+                     "shell": f"/{shell_dir}/{lang}/book.html"} for lang in langs}
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8" /><meta name="robots" content="noindex" />'
+        '<title>404</title><script>(function(){'
+        f'var routes={json.dumps(routes, separators=(",", ":"))};'
+        'var p=location.pathname.split("/").filter(Boolean),r=routes[p[0]];'
+        'if(p.length!==5||!r||p[1]!==r.segment)return;'
+        'fetch(r.shell).then(function(res){if(!res.ok)throw new Error(res.status);return res.text();})'
+        '.then(function(html){document.open();document.write(html);document.close();})'
+        '.catch(function(){});'
+        '})();</script></head><body><h1>404</h1></body></html>'
+    )
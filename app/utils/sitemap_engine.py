@@ -0,0 +1,492 @@
+# app/utils/sitemap_engine.py
+"""
+Motor único de sitemaps (lo usan main_routes, sitemap_routes y generate_static.py).
+
+- Agrupa el catálogo por char group en una sola pasada (SitemapBuckets), incluidas las claves
+  numéricas de archivo (books_<n>.csv) a partir de 'source_file_key', sin comprobar archivos en disco.
+- Serializa cada <url> directamente a texto y lo escribe en streaming (a archivo o a la respuesta).
+- Parte automáticamente en varios archivos al llegar a los límites del protocolo (50.000 URLs / 50 MB):
+  sitemap_<lang>_<key>.xml, sitemap_<lang>_<key>-2.xml, ... y opcionalmente escribe una copia .gz.
+- lastmod estable: sale del último cambio real de cada página (manifest de generación) o del propio
+  libro; nunca de la fecha del día. En el build, cada sitemap solo se reescribe si cambió alguna de sus
+  páginas (URL o lastmod, ver sitemap_signature).
+- Las páginas de faceta (app.models.facet_index) y de clasificación (app.models.leaderboards) van en su
+  propio bucket, FACET_SITEMAP_KEY.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from flask import current_app, url_for
+from markupsafe import escape
+
+from app.models.facet_index import FACET_TYPES, facet_endpoint, get_facet_index
+from app.models.leaderboards import leaderboard_pages
+from app.utils.helpers import (
+    ALPHABET_SITEMAP_HELPER, SPECIAL_CHARS_SITEMAP_KEY_HELPER,
+    ensure_https_filter, get_book_identifier, get_sitemap_char_group_for_slug
+)
+
+SITEMAP_MAX_URLS = 50000
+FACET_SITEMAP_KEY = 'facets'
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+URLSET_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+    'xmlns:xhtml="http://www.w3.org/1999/xhtml" '
+    'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+)
+URLSET_CLOSE = '</urlset>'
+SITEMAPINDEX_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+)
+SITEMAPINDEX_CLOSE = '</sitemapindex>'
+
+_URLSET_OVERHEAD = len(URLSET_OPEN.encode('utf-8')) + len(URLSET_CLOSE.encode('utf-8'))
+
+
+def timestamp_to_date_str(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+
+class ManifestLastmod:
+    """
+    lastmod por URL a partir del manifest de generación ({ruta de salida: {'lastmod'|'timestamp', ...}}).
+    Se llama con la URL externa de la página; devuelve 'YYYY-MM-DD' o None si la página no está en el manifest.
+    """
+
+    def __init__(self, manifest, out_dir, root_url):
+        self.root_url = root_url
+        self.by_rel_url = {}
+        out_dir = Path(out_dir)
+        for path_str, entry in manifest.items():
+            path_obj = Path(path_str)
+            if path_obj.name != 'index.html':
+                continue
+            try:
+                rel_dir = path_obj.parent.relative_to(out_dir).as_posix()
+            except ValueError:
+                continue
+            lastmod = entry.get('lastmod')
+            if not lastmod and entry.get('timestamp'):
+                lastmod = timestamp_to_date_str(entry['timestamp'])
+            if lastmod:
+                self.by_rel_url['' if rel_dir == '.' else rel_dir + '/'] = lastmod
+
+    def __call__(self, loc):
+        if not loc.startswith(self.root_url):
+            return None
+        return self.by_rel_url.get(loc[len(self.root_url):])
+
+
+class SitemapBuckets:
+    """Índice char_key -> libros, construido en una sola pasada sobre el catálogo."""
+
+    def __init__(self, books):
+        self.by_key = {}
+        for book in books:
+            author_key = get_sitemap_char_group_for_slug(book.get('author_slug'))
+            self.by_key.setdefault(author_key, []).append(book)
+            file_key = book.get('source_file_key')
+            if file_key and file_key.isdigit():
+                self.by_key.setdefault(file_key, []).append(book)
+
+    def keys(self):
+        """Claves de sitemap: siempre a-z y '0', más las claves numéricas de archivo presentes."""
+        author_keys = list(ALPHABET_SITEMAP_HELPER) + [SPECIAL_CHARS_SITEMAP_KEY_HELPER]
+        file_keys = [k for k in self.by_key if k.isdigit() and k != SPECIAL_CHARS_SITEMAP_KEY_HELPER]
+        return sorted(set(author_keys + file_keys))
+
+    def books_for(self, char_key):
+        return self.by_key.get(char_key, [])
+
+
+def get_sitemap_buckets(app):
+    """Buckets cacheados en la app (se invalidan si cambia la lista de libros cargada)."""
+    books = getattr(app, 'books_data', []) or []
+    cached = getattr(app, '_sitemap_buckets', None)
+    if cached is None or cached[0] is not books:
+        cached = (books, SitemapBuckets(books))
+        app._sitemap_buckets = cached
+    return cached[1]
+
+
+def parse_sitemap_part(char_group):
+    """'a' -> ('a', 1); 'a-3' -> ('a', 3)."""
+    key, sep, part = char_group.partition('-')
+    if sep and part.isdigit() and int(part) >= 1:
+        return key, int(part)
+    return char_group, 1
+
+
+def sitemap_part_filename(lang_code, char_key, part_no):
+    suffix = '' if part_no == 1 else f"-{part_no}"
+    return f"sitemap_{lang_code}_{char_key}{suffix}.xml"
+
+
+def _alternates(build_url, endpoint, default_lang, supported_langs, **kwargs):
+    alternates = [
+        (alt_lang, build_url(endpoint, alt_lang, _external=True, **kwargs))
+        for alt_lang in supported_langs
+    ]
+    alternates.append(('x-default', build_url(endpoint, default_lang, _external=True, **kwargs)))
+    return alternates
+
+
+def render_url_entry(loc, lastmod=None, changefreq=None, priority=None, alternates=(), image_url=None, image_title=None):
+    parts = ['<url><loc>', str(escape(loc)), '</loc>']
+    if lastmod:
+        parts += ['<lastmod>', str(escape(lastmod)), '</lastmod>']
+    if changefreq:
+        parts += ['<changefreq>', changefreq, '</changefreq>']
+    if priority:
+        parts += ['<priority>', priority, '</priority>']
+    for alt_lang, href in alternates:
+        parts += ['<xhtml:link rel="alternate" hreflang="', alt_lang, '" href="', str(escape(href)), '" />']
+    if image_url:
+        parts += ['<image:image><image:loc>', str(escape(ensure_https_filter(image_url))), '</image:loc>']
+        if image_title:
+            parts += ['<image:title>', str(escape(image_title)), '</image:title>']
+        parts.append('</image:image>')
+    parts.append('</url>')
+    return ''.join(parts)
+
+
+def _author_page_counter(app):
+    """Número de páginas de cada autor (app.models.catalog_index importa este módulo: import local)."""
+    from app.models.catalog_index import get_catalog_index
+    catalog = get_catalog_index(app)
+    return lambda author_slug: len(catalog.author_pages(author_slug) or ())
+
+
+def _bucket_pages(app, books):
+    """
+    (endpoint, kwargs, libro) de cada página de un bucket: detalle de libro, versiones y autor (todas sus páginas,
+    sin duplicados), en el mismo orden que se recorre el catálogo.
+    """
+    author_page_count = _author_page_counter(app)
+    processed_versions, processed_authors = set(), set()
+    for book in books:
+        author_slug = book.get('author_slug')
+        book_slug = book.get('title_slug')
+        base_book_slug = book.get('base_title_slug')
+        identifier = get_book_identifier(book)
+        if author_slug and book_slug and identifier:
+            yield 'main.book_by_identifier', dict(author_slug=author_slug, book_slug=book_slug, identifier=identifier), book
+        if author_slug and base_book_slug and (author_slug, base_book_slug) not in processed_versions:
+            processed_versions.add((author_slug, base_book_slug))
+            yield 'main.book_versions', dict(author_slug=author_slug, base_book_slug=base_book_slug), book
+        if author_slug and author_slug not in processed_authors:
+            processed_authors.add(author_slug)
+            yield 'main.author_books', dict(author_slug=author_slug), book
+            for page_number in range(2, author_page_count(author_slug) + 1):
+                yield 'main.author_books_page', dict(author_slug=author_slug, page=page_number), book
+
+
+# Prioridad de cada tipo de página de bucket en el sitemap
+_BUCKET_PRIORITIES = {
+    'main.book_by_identifier': '0.8', 'main.book_versions': '0.7', 'main.author_books': '0.6', 'main.author_books_page': '0.5'
+}
+
+
+def iter_bucket_url_entries(books, lang_code, default_lang, supported_langs, lastmod_lookup=None):
+    """
+    Genera el XML de cada <url> de un bucket (páginas de _bucket_pages). lastmod_lookup(loc) da el último cambio
+    de la página (ver ManifestLastmod); sin él, en libros y versiones se usa 'last_modified_date' del libro, o se
+    omite lastmod.
+    """
+    lastmod_lookup = lastmod_lookup or (lambda loc: None)
+    build_url = current_app.url_builder.url_for
+    for endpoint, kwargs, book in _bucket_pages(current_app, books):
+        loc = build_url(endpoint, lang_code, _external=True, **kwargs)
+        lastmod = lastmod_lookup(loc)
+        if endpoint in ('main.book_by_identifier', 'main.book_versions'):
+            lastmod = lastmod or book.get('last_modified_date')
+        image_url, image_title = None, None
+        if endpoint == 'main.book_by_identifier':
+            image_url, image_title = book.get('image_url'), book.get('title', '')
+        yield render_url_entry(
+            loc, lastmod, 'monthly', _BUCKET_PRIORITIES[endpoint],
+            _alternates(build_url, endpoint, default_lang, supported_langs, **kwargs), image_url, image_title
+        )
+
+
+def _facet_pages(app):
+    """(endpoint, kwargs) de cada página de faceta y de clasificación, en orden estable."""
+    if app.config.get('FACET_PAGES', True):
+        index = get_facet_index(app)
+        for facet_type in FACET_TYPES:
+            slugs = index.value_slugs(facet_type)
+            if slugs:
+                yield facet_endpoint(facet_type, 'list'), {}
+            for slug in slugs:
+                yield facet_endpoint(facet_type, 'books'), {'facet_slug': slug}
+                for page_number in range(2, len(index.pages(facet_type, slug)) + 1):
+                    yield facet_endpoint(facet_type, 'books_page'), {'facet_slug': slug, 'page': page_number}
+    yield from leaderboard_pages(app)
+
+
+def iter_facet_url_entries(lang_code, default_lang, supported_langs, lastmod_lookup=None):
+    """XML de cada <url> de las páginas de faceta (índices de valores y páginas de libros) y de clasificación."""
+    lastmod_lookup = lastmod_lookup or (lambda loc: None)
+    build_url = current_app.url_builder.url_for
+    for endpoint, kwargs in _facet_pages(current_app):
+        loc = build_url(endpoint, lang_code, _external=True, **kwargs)
+        alternates = _alternates(build_url, endpoint, default_lang, supported_langs, **kwargs)
+        yield render_url_entry(loc, lastmod_lookup(loc), 'weekly', '0.5', alternates)
+
+
+def sitemap_keys(app):
+    """Claves de los sitemaps de un idioma: las de los buckets y FACET_SITEMAP_KEY si hay páginas de faceta o clasificación."""
+    keys = get_sitemap_buckets(app).keys()
+    return keys + [FACET_SITEMAP_KEY] if next(_facet_pages(app), None) else keys
+
+
+def sitemap_url_entries(app, char_key, lang_code, lastmod_lookup=None):
+    """Entradas de un sitemap por clave (bucket o facetas) o None si la clave no existe."""
+    supported_langs = app.config.get('SUPPORTED_LANGUAGES', ['en'])
+    default_lang = app.config.get('DEFAULT_LANGUAGE', 'en')
+    if char_key not in sitemap_keys(app):
+        return None
+    if char_key == FACET_SITEMAP_KEY:
+        return iter_facet_url_entries(lang_code, default_lang, supported_langs, lastmod_lookup)
+    books = get_sitemap_buckets(app).books_for(char_key)
+    return iter_bucket_url_entries(books, lang_code, default_lang, supported_langs, lastmod_lookup)
+
+
+def split_into_parts(entry_iter):
+    """
+    Asigna cada entrada a una parte respetando los límites del protocolo.
+    Genera tuplas (número de parte, xml de la entrada).
+    """
+    part_no, count, size = 1, 0, _URLSET_OVERHEAD
+    for entry_xml in entry_iter:
+        entry_size = len(entry_xml.encode('utf-8'))
+        if count and (count >= SITEMAP_MAX_URLS or size + entry_size > SITEMAP_MAX_BYTES):
+            part_no, count, size = part_no + 1, 0, _URLSET_OVERHEAD
+        count += 1
+        size += entry_size
+        yield part_no, entry_xml
+
+
+def stream_sitemap_part(entry_iter, wanted_part=1):
+    """Genera el XML (en trozos) de una sola parte; útil para respuestas en streaming del servidor."""
+    yield URLSET_OPEN
+    for part_no, entry_xml in split_into_parts(entry_iter):
+        if part_no > wanted_part:
+            break
+        if part_no == wanted_part:
+            yield entry_xml
+    yield URLSET_CLOSE
+
+
+def count_bucket_parts(books):
+    """Número de partes estimado por número de URLs (para los índices que sirve el servidor)."""
+    versions = {(b.get('author_slug'), b.get('base_title_slug')) for b in books
+                if b.get('author_slug') and b.get('base_title_slug')}
+    authors = {b.get('author_slug') for b in books if b.get('author_slug')}
+    total = len(books) + len(versions) + len(authors)
+    return max(1, -(-total // SITEMAP_MAX_URLS))
+
+
+def core_part_names(app, lang_code):
+    """Nombres de las partes que lista el índice sitemap_<lang>_core.xml que sirve el servidor."""
+    buckets = get_sitemap_buckets(app)
+    names = []
+    for key in sitemap_keys(app):
+        if key == FACET_SITEMAP_KEY:
+            parts = max(1, -(-sum(1 for _ in _facet_pages(app)) // SITEMAP_MAX_URLS))
+        else:
+            parts = count_bucket_parts(buckets.books_for(key))
+        names += [sitemap_part_filename(lang_code, key, part_no) for part_no in range(1, parts + 1)]
+    return names
+
+
+class _PartFile:
+    """Archivo de salida (y su copia .gz) escrito a un temporal y movido de forma atómica al cerrar."""
+
+    def __init__(self, path_obj, gzip_enabled):
+        self.path = path_obj
+        self._tmp = path_obj.with_name(path_obj.name + '.tmp')
+        self._fh = open(self._tmp, 'w', encoding='utf-8')
+        self._gz_tmp = path_obj.with_name(path_obj.name + '.gz.tmp') if gzip_enabled else None
+        self._gz = gzip.open(self._gz_tmp, 'wt', encoding='utf-8', compresslevel=9) if gzip_enabled else None
+
+    def write(self, text):
+        self._fh.write(text)
+        if self._gz is not None:
+            self._gz.write(text)
+
+    def close(self):
+        self._fh.close()
+        os.replace(self._tmp, self.path)
+        written = [self.path]
+        if self._gz is not None:
+            self._gz.close()
+            gz_path = self.path.with_name(self.path.name + '.gz')
+            os.replace(self._gz_tmp, gz_path)
+            written.append(gz_path)
+        return written
+
+
+def write_sitemap_files(entry_iter, out_dir, lang_code, char_key, gzip_enabled=True):
+    """
+    Escribe en streaming las partes de un sitemap de bucket. Devuelve (nombres de las partes, rutas escritas).
+    Siempre se escribe al menos la parte 1 (vacía si el bucket no tiene URLs).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    part_names, written_paths = [], []
+    current, current_no = None, 0
+    for part_no, entry_xml in split_into_parts(entry_iter):
+        if part_no != current_no:
+            if current is not None:
+                current.write(URLSET_CLOSE)
+                written_paths += current.close()
+            current_no = part_no
+            part_name = sitemap_part_filename(lang_code, char_key, part_no)
+            part_names.append(part_name)
+            current = _PartFile(out_dir / part_name, gzip_enabled)
+            current.write(URLSET_OPEN)
+        current.write(entry_xml)
+    if current is None:
+        part_name = sitemap_part_filename(lang_code, char_key, 1)
+        part_names.append(part_name)
+        current = _PartFile(out_dir / part_name, gzip_enabled)
+        current.write(URLSET_OPEN)
+    current.write(URLSET_CLOSE)
+    written_paths += current.close()
+    return part_names, written_paths
+
+
+def render_sitemap_index(entries):
+    """entries: iterable de (loc, lastmod o None)."""
+    parts = [SITEMAPINDEX_OPEN]
+    for loc, lastmod in entries:
+        parts += ['<sitemap><loc>', str(escape(loc)), '</loc>']
+        if lastmod:
+            parts += ['<lastmod>', str(escape(lastmod)), '</lastmod>']
+        parts.append('</sitemap>')
+    parts.append(SITEMAPINDEX_CLOSE)
+    return ''.join(parts)
+
+
+def sitemap_file_url(filename):
+    """URL externa de un archivo de sitemap (misma raíz que /sitemap.xml)."""
+    root_url = url_for('main.sitemap_index_xml', _external=True)
+    return root_url[:-len('sitemap.xml')] + filename
+
+
+def write_text_file(path_obj, text, gzip_enabled=False):
+    part = _PartFile(Path(path_obj), gzip_enabled)
+    part.write(text)
+    return part.close()
+
+
+def _sitemap_paths(out_dir, part_names, gzip_enabled):
+    paths = [Path(out_dir) / name for name in part_names]
+    return paths + [p.with_name(p.name + '.gz') for p in paths] if gzip_enabled else paths
+
+
+def sitemap_signature(app, char_key, lang_code, lastmod_lookup=None):
+    """
+    Firma de lo que determina un sitemap: URL y lastmod (del manifest) de cada página que lista, imagen, título y
+    last_modified_date de los libros, y los idiomas de las alternates. Cambia cuando cambia alguna de sus páginas
+    (también por libros relacionados, facetas o agrupación de ediciones, que entran en su firma de página y por
+    tanto en su lastmod) y solo construye una URL por página, no todas las entradas.
+    """
+    lastmod_lookup = lastmod_lookup or (lambda loc: None)
+    build_url = app.url_builder.url_for
+    digest = hashlib.md5()
+    digest.update(json.dumps(
+        [lang_code, app.config.get('DEFAULT_LANGUAGE', 'en'), list(app.config.get('SUPPORTED_LANGUAGES', ['en']))]
+    ).encode('utf-8'))
+    if char_key == FACET_SITEMAP_KEY:
+        pages = ((endpoint, kwargs, None) for endpoint, kwargs in _facet_pages(app))
+    else:
+        pages = _bucket_pages(app, get_sitemap_buckets(app).books_for(char_key))
+    for endpoint, kwargs, book in pages:
+        loc = build_url(endpoint, lang_code, _external=True, **kwargs)
+        fields = [loc, lastmod_lookup(loc)]
+        if book is not None and endpoint in ('main.book_by_identifier', 'main.book_versions'):
+            fields += [book.get('last_modified_date'), book.get('image_url'), book.get('title', '')]
+        digest.update(json.dumps(fields, ensure_ascii=False, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _is_up_to_date(state, key, signature, paths):
+    entry = state.get(key) if state is not None else None
+    return bool(entry) and entry.get('signature') == signature and all(p.exists() for p in paths)
+
+
+def _record_state(state, key, signature, part_names=None):
+    if state is None:
+        return
+    now = datetime.now(timezone.utc)
+    entry = {"signature": signature, "timestamp": now.timestamp(), "lastmod": now.strftime('%Y-%m-%d')}
+    if part_names is not None:
+        entry["parts"] = part_names
+    state[key] = entry
+
+
+def write_index_file(path_obj, entries, gzip_enabled=False, state=None):
+    """
+    Escribe un sitemap índice (entries: (loc, lastmod)) solo si su contenido cambió respecto a state.
+    Devuelve (rutas del índice, True si se reescribió).
+    """
+    path_obj = Path(path_obj)
+    entries = list(entries)
+    paths = _sitemap_paths(path_obj.parent, [path_obj.name], gzip_enabled)
+    signature = hashlib.md5(json.dumps(entries).encode('utf-8')).hexdigest()
+    if _is_up_to_date(state, str(path_obj), signature, paths):
+        return paths, False
+    write_text_file(path_obj, render_sitemap_index(entries), gzip_enabled)
+    _record_state(state, str(path_obj), signature)
+    return paths, True
+
+
+def state_lastmod(state, path_obj):
+    entry = (state or {}).get(str(path_obj)) or {}
+    return entry.get('lastmod')
+
+
+def write_language_sitemaps(app, lang_code, out_dir, char_keys=None, write_core=True,
+                            state=None, lastmod_lookup=None):
+    """
+    Escribe los sitemaps de un idioma (todos los buckets y las facetas, o solo char_keys) y su índice
+    sitemap_<lang>_core.xml. Requiere contexto de request (url_for externo).
+
+    state (p. ej. el manifest de generación) guarda la firma de cada sitemap (sitemap_signature): los que no
+    cambiaron no se vuelven a escribir y conservan su lastmod, igual que el índice si ninguna parte cambió.
+    Devuelve (todas las rutas de sitemap del idioma, número de archivos reescritos).
+    """
+    gzip_enabled = app.config.get('SITEMAP_GZIP', True)
+    root_url = sitemap_file_url('')
+    keys_to_write = char_keys if char_keys is not None else sitemap_keys(app)
+
+    all_paths, core_entries, rewritten = [], [], 0
+    for char_key in keys_to_write:
+        state_key = str(Path(out_dir) / sitemap_part_filename(lang_code, char_key, 1))
+        signature = sitemap_signature(app, char_key, lang_code, lastmod_lookup)
+        part_names = ((state or {}).get(state_key) or {}).get('parts') or []
+        paths = _sitemap_paths(out_dir, part_names, gzip_enabled)
+        if not (part_names and _is_up_to_date(state, state_key, signature, paths)):
+            entries = sitemap_url_entries(app, char_key, lang_code, lastmod_lookup) or ()
+            part_names, paths = write_sitemap_files(entries, out_dir, lang_code, char_key, gzip_enabled)
+            _record_state(state, state_key, signature, part_names)
+            rewritten += len(paths)
+        all_paths += paths
+        bucket_lastmod = state_lastmod(state, state_key)
+        core_entries += [(root_url + name, bucket_lastmod) for name in part_names]
+
+    if write_core:
+        core_path = Path(out_dir) / f"sitemap_{lang_code}_core.xml"
+        paths, changed = write_index_file(core_path, core_entries, gzip_enabled, state)
+        all_paths += paths
+        rewritten += len(paths) if changed else 0
+    return all_paths, rewritten
@@ -0,0 +1,275 @@
+# app/utils/static_site.py
+"""
+Servicio híbrido desde el sitio prebuilt (STATIC_SITE_OUTPUT_DIR, el _site de generate_static.py).
+
+Para las páginas de índice, libro, autor, versiones, facetas y clasificaciones el servidor busca primero el
+archivo generado y, si su firma (la del manifest del build o la que registró el propio servidor al escribirlo) coincide con
+la de los datos cargados, lo envía con send_file (sendfile/wsgi.file_wrapper, sin copiarlo a memoria).
+Si falta o está obsoleto, la petición sigue por la ruta normal y el HTML resultante se escribe de vuelta
+de forma atómica (archivo temporal + os.replace), minificado igual que en el build.
+
+Las páginas escritas por el servidor se anotan en STATIC_SITE_SERVED_LOG (una línea JSON por página,
+en modo append): el resto de workers de gunicorn las ven sin volver a renderizarlas y generate_static.py
+las incorpora a su manifest en la siguiente ejecución.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from flask import current_app, g, request, send_file
+
+from app.models.catalog_index import get_catalog_index
+from app.models.facet_index import FACET_ENDPOINTS, FACET_TYPES, book_facet_links, facet_endpoint, get_facet_index
+from app.models.leaderboards import LEADERBOARD_ENDPOINTS, get_leaderboards
+from app.utils.minify_cache import minify_html_cached
+from app.utils.related_books import related_book_ids
+from app.utils.page_signatures import (
+    book_page_signature, author_page_signature, versions_page_signature, index_page_signature,
+    facet_page_signature, facet_list_signature, leaderboard_page_signature, leaderboard_list_signature
+)
+
+PAGE_ENDPOINTS = (
+    'main.index', 'main.book_by_identifier', 'main.author_books', 'main.author_books_page', 'main.book_versions'
+) + FACET_ENDPOINTS + LEADERBOARD_ENDPOINTS
+REFRESH_INTERVAL = 1.0  # Segundos entre comprobaciones del manifest y del registro de páginas servidas
+
+
+def facet_signature(app, endpoint, view_args):
+    """Firma de una página de faceta (índice de valores o página de libros); None si no existe."""
+    facet_type = view_args.get('facet_type')
+    if facet_type not in FACET_TYPES or not app.config.get('FACET_PAGES', True):
+        return None
+    index = get_facet_index(app)
+    if endpoint == facet_endpoint(facet_type, 'list'):
+        values = [(slug, index.name(facet_type, slug)) for slug in index.value_slugs(facet_type)]
+        return facet_list_signature(facet_type, values) if values else None
+    facet_slug, page = view_args.get('facet_slug'), view_args.get('page') or '1'
+    pages = index.pages(facet_type, facet_slug)
+    if not pages or not page.isdigit() or not 1 <= int(page) <= len(pages):
+        return None
+    page_number = int(page)
+    return facet_page_signature(
+        facet_type, facet_slug, index.name(facet_type, facet_slug), page_number, page_number < len(pages),
+        pages[page_number - 1]
+    )
+
+
+def leaderboard_signature(app, endpoint, view_args):
+    """Firma de una clasificación o de su índice; None si no tiene página."""
+    if not app.config.get('LEADERBOARDS', True):
+        return None
+    index = get_leaderboards(app)
+    if endpoint == 'main.leaderboard_list':
+        return leaderboard_list_signature(index.list_page()) if index.keys() else None
+    board, scope = view_args.get('board'), view_args.get('scope')
+    books = index.books(board, scope)
+    return leaderboard_page_signature(board, scope, index.name(board, scope), books) if books else None
+
+
+class StaticSiteStore:
+    """Estado compartido por los hilos de un proceso: firmas registradas del manifest y de las páginas servidas."""
+
+    def __init__(self, app):
+        self.out_dir = app.config.get('STATIC_SITE_OUTPUT_DIR', '_site')
+        self.manifest_path = app.config.get('STATIC_SITE_MANIFEST', '.cache/generation_manifest.json')
+        self.served_log_path = app.config.get('STATIC_SITE_SERVED_LOG', '.cache/served_pages.jsonl')
+        self.minify_cache_dir = (
+            app.config.get('MINIFY_CACHE_DIR', '.cache/minify') if app.config.get('MINIFY_HTML_BUILD', True) else None
+        )
+        self._lock = threading.Lock()
+        self._manifest, self._manifest_mtime = {}, None
+        self._served, self._log_ino, self._log_offset = {}, None, 0
+        self._next_refresh = 0.0
+        self.hits = 0
+        self.write_backs = 0
+
+    def output_path(self, request_path):
+        """Ruta (en el formato de las claves del manifest) del index.html de una URL; None si no es válida."""
+        parts = [part for part in request_path.split('/') if part]
+        if not parts or any(part in ('.', '..') or '\\' in part for part in parts):
+            return None
+        return str(Path(self.out_dir).joinpath(*parts, 'index.html'))
+
+    def current_signature(self, app, endpoint, view_args):
+        """Firma de la página para los datos cargados (la misma que calcula el generador); None si no hay página."""
+        if endpoint == 'main.index':
+            lang_code = view_args.get('lang_code')
+            return index_page_signature(app, lang_code) if lang_code in app.config.get('SUPPORTED_LANGUAGES', ['en']) else None
+        catalog = get_catalog_index(app)
+        author_slug = view_args.get('author_slug')
+        if endpoint == 'main.book_by_identifier':
+            book = catalog.by_url.get((author_slug, view_args.get('book_slug'), view_args.get('identifier')))
+            return book_page_signature(book, related_book_ids(app, book), book_facet_links(app, book)) if book else None
+        if endpoint in ('main.author_books', 'main.author_books_page'):
+            pages, page = catalog.author_pages(author_slug), view_args.get('page') or '1'
+            if not pages or not page.isdigit() or not 1 <= int(page) <= len(pages):
+                return None
+            page_number = int(page)
+            return author_page_signature(author_slug, pages[page_number - 1], page_number, page_number < len(pages))
+        if endpoint == 'main.book_versions':
+            base_title_slug = view_args.get('base_book_slug')
+            books = catalog.books_by_version.get((author_slug, base_title_slug))
+            return versions_page_signature(author_slug, base_title_slug, books) if books else None
+        if endpoint in FACET_ENDPOINTS:
+            return facet_signature(app, endpoint, view_args)
+        if endpoint in LEADERBOARD_ENDPOINTS:
+            return leaderboard_signature(app, endpoint, view_args)
+        return None
+
+    def _refresh(self):
+        """Relee el manifest si cambió y las líneas nuevas del registro de páginas servidas (con el lock tomado)."""
+        self._reload_manifest()
+        self._tail_served_log()
+
+    def _reload_manifest(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != self._manifest_mtime:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+                self._manifest_mtime = mtime
+            except (OSError, json.JSONDecodeError):
+                pass  # El generador lo está reescribiendo: se reintenta en el siguiente refresco
+
+    def _tail_served_log(self):
+        try:
+            stat = os.stat(self.served_log_path)
+        except OSError:
+            return
+        if stat.st_ino != self._log_ino or stat.st_size < self._log_offset:
+            self._log_ino, self._log_offset = stat.st_ino, 0  # Rotado por generate_static.py
+        if stat.st_size == self._log_offset:
+            return
+        with open(self.served_log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            chunk = f.read(stat.st_size - self._log_offset)
+        complete = chunk[:chunk.rfind(b'\n') + 1]  # Solo líneas completas
+        self._log_offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+                self._served[entry['path']] = entry['signature']
+            except (ValueError, KeyError):
+                continue
+
+    def is_fresh(self, path_str, signature):
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_refresh:
+                self._refresh()
+                self._next_refresh = now + REFRESH_INTERVAL
+            recorded = (self._served.get(path_str), (self._manifest.get(path_str) or {}).get('signature'))
+        return signature in recorded and os.path.isfile(path_str)
+
+    @staticmethod
+    def _tmp_path(path_str):
+        path_obj = Path(path_str)
+        path_obj.parent.mkdir(parents=True, exist_ok=True)
+        return path_obj.with_name(f".{path_obj.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def write_back(self, path_str, data, signature):
+        tmp_path = self._tmp_path(path_str)
+        tmp_path.write_bytes(data)
+        self._publish(tmp_path, path_str, signature)
+
+    def write_back_stream(self, path_str, chunks, signature, logger):
+        """
+        Como write_back para una respuesta en streaming: copia los bloques a un temporal según se envían y solo
+        publica el archivo si la respuesta se envió entera. Un error de disco no corta la respuesta.
+        """
+        tmp_file, complete = None, False
+        try:
+            try:
+                tmp_path = self._tmp_path(path_str)
+                tmp_file = open(tmp_path, 'wb')
+            except OSError:
+                logger.exception(f"No se pudo escribir {path_str} en el sitio estático.")
+            for chunk in chunks:
+                if tmp_file is not None:
+                    try:
+                        tmp_file.write(chunk)
+                    except OSError:
+                        logger.exception(f"No se pudo escribir {path_str} en el sitio estático.")
+                        tmp_file.close()
+                        tmp_path.unlink(missing_ok=True)
+                        tmp_file = None
+                yield chunk
+            complete = True
+        finally:
+            if tmp_file is not None:
+                tmp_file.close()
+                if complete:
+                    try:
+                        self._publish(tmp_path, path_str, signature)
+                    except OSError:
+                        logger.exception(f"No se pudo escribir {path_str} en el sitio estático.")
+                else:
+                    tmp_path.unlink(missing_ok=True)  # Cliente desconectado: página incompleta
+
+    def _publish(self, tmp_path, path_str, signature):
+        os.replace(tmp_path, path_str)
+        line = json.dumps({"path": path_str, "signature": signature, "timestamp": time.time()}) + "\n"
+        os.makedirs(os.path.dirname(self.served_log_path) or '.', exist_ok=True)
+        with open(self.served_log_path, 'a', encoding='utf-8') as f:
+            f.write(line)  # Una sola escritura en modo append: atómica entre procesos para líneas cortas
+        with self._lock:
+            self._served[path_str] = signature
+            self.write_backs += 1
+
+
+def _serve_prebuilt():
+    if request.method not in ('GET', 'HEAD') or request.endpoint not in PAGE_ENDPOINTS:
+        return None
+    store = current_app.static_site
+    path_str = store.output_path(request.path)
+    signature = path_str and store.current_signature(current_app, request.endpoint, request.view_args or {})
+    if not signature:
+        return None  # Sin página para estos datos: la ruta responde (404, redirección...)
+    if store.is_fresh(path_str, signature):
+        store.hits += 1
+        return send_file(os.path.abspath(path_str), mimetype='text/html', conditional=True)
+    g._static_site_target = (path_str, signature)
+    return None
+
+
+def _write_back(response):
+    target = g.pop('_static_site_target', None)
+    if target is None or response.status_code != 200 or response.mimetype != 'text/html' or response.direct_passthrough:
+        return response
+    store = current_app.static_site
+    path_str, signature = target
+    if response.is_streamed:
+        # Listado en streaming (app.utils.streaming): se copia al sitio estático según se envía
+        response.response = store.write_back_stream(path_str, response.response, signature, current_app.logger)
+        return response
+    data = response.get_data()
+    if store.minify_cache_dir:
+        # Mismo minificado (y caché en disco) que la etapa de build: el archivo queda idéntico al generado
+        data, _ = minify_html_cached(data, store.minify_cache_dir)
+        response.set_data(data)
+        g._html_minified = True
+    try:
+        store.write_back(path_str, data, signature)
+    except OSError:
+        current_app.logger.exception(f"No se pudo escribir {path_str} en el sitio estático.")
+    return response
+
+
+def init_static_site(app):
+    """
+    Activa el servicio híbrido si STATIC_SITE_SERVING está activo. Devuelve los patrones de endpoints que
+    Flask-Minify debe omitir (los minifica la escritura de vuelta) o [].
+    """
+    if not app.config.get('STATIC_SITE_SERVING', False):
+        return []
+    app.static_site = StaticSiteStore(app)
+    app.before_request(_serve_prebuilt)
+    app.after_request(_write_back)
+    if not app.static_site.minify_cache_dir:
+        return []
+    return [endpoint.replace('.', r'\.') + '$' for endpoint in PAGE_ENDPOINTS]
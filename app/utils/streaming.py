@@ -0,0 +1,123 @@
+# app/utils/streaming.py
+"""
+Render en streaming de los listados (autor, versiones y facetas) en el servidor: stream_template envía el
+HTML según Jinja lo genera, en bloques de unos STREAM_FLUSH_BYTES, sin construir la página entera en memoria.
+
+Con minificación el resultado es el mismo que el de Flask-Minify sobre la página entera: cada bloque se corta
+antes del último '<' que queda fuera de <script>, <style>, <pre>, <textarea> y comentarios (ninguna etiqueta,
+nodo de texto ni elemento literal queda partido), se minifica su JS/CSS inline con el Parser de Flask-Minify
+y pasa por un único parser incremental de htmlmin, que conserva el estado (dentro de <head>, espacios previos...)
+entre bloques y entrega (y olvida) la salida ya definitiva tras cada bloque, así que la página nunca está entera
+en memoria. Flask-Minify necesita la respuesta entera, así que estos endpoints se le excluyen (init_streaming
+devuelve sus patrones); la caché de respuestas y la escritura de vuelta al sitio estático copian los bloques
+según salen.
+"""
+import re
+
+from flask import current_app, stream_template
+from flask_minify.parsers import Parser
+from htmlmin.parser import HTMLMinParser
+
+from app.models.facet_index import FACET_TYPES, facet_endpoint
+
+STREAMED_ENDPOINTS = ('main.author_books', 'main.author_books_page', 'main.book_versions') + tuple(
+    facet_endpoint(facet_type, kind) for facet_type in FACET_TYPES for kind in ('books', 'books_page')
+)
+# Opciones de htmlmin del parser html de Flask-Minify (flask_minify.parsers.Html)
+HTMLMIN_OPTIONS = {'remove_comments': True, 'remove_optional_attribute_quotes': False, 'remove_empty_space': True}
+_RAW_OPEN_RE = re.compile(r'<(script|style|pre|textarea)\b|<!--', re.I)
+_RAW_CLOSE_RES = {tag: re.compile(rf'</{tag}\s*>', re.I) for tag in ('script', 'style', 'pre', 'textarea')}
+_COMMENT_CLOSE_RE = re.compile('-->')
+_inline_parser = None
+
+
+class _StreamingParser(HTMLMinParser):
+    """HTMLMinParser que devuelve y descarta la salida ya definitiva (take_finished) en lugar de acumularla."""
+    # htmlmin consulta el último fragmento (espacios dobles) y, con uno solo, puede descartarlo ante un doctype
+    KEEP = 2
+
+    def take_finished(self):
+        data = self._data_buffer
+        if len(data) <= self.KEEP:
+            return ''
+        done = ''.join(data[:-self.KEEP])
+        del data[:-self.KEEP]
+        return done
+
+
+def _get_inline_parser():
+    """Parser de Flask-Minify que solo minifica el JS y CSS inline (el HTML lo hace el Minifier incremental)."""
+    global _inline_parser
+    if _inline_parser is None:
+        _inline_parser = Parser(fail_safe=True, go=False)
+        _inline_parser.update_runtime_options(html=False, js=True, cssless=True)
+    return _inline_parser
+
+
+def safe_cut(html):
+    """Posición del último '<' fuera de elementos literales y comentarios en la que cortar html (0 si ninguna)."""
+    cut, pos = 0, 0
+    while True:
+        opening = _RAW_OPEN_RE.search(html, pos)
+        cut = max(cut, html.rfind('<', pos, opening.start() if opening else len(html)))
+        if opening is None:
+            return cut
+        cut = opening.start()
+        closing_re = _RAW_CLOSE_RES[opening.group(1).lower()] if opening.group(1) else _COMMENT_CLOSE_RE
+        closing = closing_re.search(html, opening.end())
+        if closing is None:
+            return cut  # Elemento literal aún abierto: se corta antes de él
+        pos = closing.end()
+
+
+def iter_blocks(chunks, flush_bytes, minify):
+    """Agrupa los trozos de Jinja en bloques de al menos flush_bytes (minificados si minify) y los codifica."""
+    minifier = _StreamingParser(**HTMLMIN_OPTIONS) if minify else None
+    parts, size = [], 0
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size < flush_bytes:
+            continue
+        buffer = ''.join(parts)
+        cut = safe_cut(buffer) if minifier else len(buffer)
+        parts, size = [buffer[cut:]], len(buffer) - cut
+        if minifier is None:
+            yield buffer.encode('utf-8')
+        elif cut:
+            minifier.feed(_get_inline_parser().minify(buffer[:cut], 'html'))
+            done = minifier.take_finished()
+            if done:
+                yield done.encode('utf-8')
+    buffer = ''.join(parts)
+    if minifier is not None:
+        minifier.feed(_get_inline_parser().minify(buffer, 'html'))
+        minifier.close()
+        buffer = minifier.result
+    if buffer:
+        yield buffer.encode('utf-8')
+
+
+def streaming_enabled():
+    """Si las vistas de listado responden en streaming (el build llama a los render_* sin streaming)."""
+    return current_app.config.get('STREAM_LISTING_PAGES', True)
+
+
+def stream_page(template_name, **context):
+    """
+    Respuesta en streaming de una plantilla, en bloques minificados si MINIFY_HTML (o si la página se va a
+    escribir de vuelta al sitio estático con MINIFY_HTML_BUILD, como haría el build).
+    """
+    config = current_app.config
+    minify = config.get('MINIFY_HTML', True) or (
+        config.get('STATIC_SITE_SERVING', False) and config.get('MINIFY_HTML_BUILD', True)
+    )
+    blocks = iter_blocks(stream_template(template_name, **context), config.get('STREAM_FLUSH_BYTES', 16 * 1024), minify)
+    return current_app.response_class(blocks, mimetype='text/html')
+
+
+def init_streaming(app):
+    """Patrones de endpoints que Flask-Minify debe omitir si STREAM_LISTING_PAGES está activo (o [])."""
+    if not app.config.get('STREAM_LISTING_PAGES', True):
+        return []
+    return [endpoint.replace('.', r'\.') + '$' for endpoint in STREAMED_ENDPOINTS]
@@ -0,0 +1,33 @@
+# app/utils/template_cache.py
+import os
+
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+def configure_bytecode_cache(app):
+    """
+    Activa la caché de bytecode de Jinja en disco (compartida por workers del generador y de gunicorn).
+    Jinja invalida cada entrada por el checksum del código fuente de la plantilla. La ruta (bajo CACHE_DIR)
+    se resuelve desde el directorio de trabajo, como el resto de cachés.
+    """
+    cache_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def precompile_templates(app):
+    """
+    Carga todas las plantillas al arrancar: si su bytecode está en caché solo se deserializa,
+    si no se compila una vez y queda guardado para el resto de procesos.
+    """
+    loaded = 0
+    for template_name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(template_name)
+            loaded += 1
+        except TemplateSyntaxError as e:
+            app.logger.error(f"Error de sintaxis precompilando plantilla '{template_name}': {e}")
+    app.logger.debug(f"{loaded} plantillas precompiladas/cargadas desde caché de bytecode.")
+    return loaded
@@ -1,12 +1,42 @@
 # app/utils/translations.py
-from flask import current_app
+from string import Formatter
+
+from flask import current_app, has_app_context
+from jinja2 import nodes
 from app.utils.helpers import load_json_file
 
 
+def _parse_format_template(translation_string):
+    """
+    Pre-parsea una cadena con placeholders ('Libros de {author}') a [(literal, nombre_campo), ...].
+    Devuelve None si no tiene placeholders o si usa algo más que {nombre} (se formatea con str.format).
+    """
+    if '{' not in translation_string and '}' not in translation_string:
+        return None
+    try:
+        parsed = list(Formatter().parse(translation_string))
+    except ValueError:
+        return None
+    pieces = []
+    for literal, field_name, format_spec, conversion in parsed:
+        if field_name is not None and (not field_name.isidentifier() or format_spec or conversion):
+            return None
+        pieces.append((literal, field_name))
+    return pieces
+
+
 class TranslationManager:
-    def __init__(self, translations_path, default_lang='en'):
+    """
+    Traducciones compiladas al arrancar: una tabla plana por idioma con el fallback al idioma por
+    defecto ya fusionado, las cadenas con placeholders pre-parseadas y una función t() cacheada por idioma.
+    Las claves que faltan se registran (y, si warn_missing, se avisa una sola vez por idioma y clave) en
+    lugar de loguear en cada render; el build no avisa y las resume en su informe de cobertura.
+    """
+
+    def __init__(self, translations_path, default_lang='en', warn_missing=True):
         self.translations = load_json_file(translations_path) or {}
         self.default_lang = default_lang
+        self.warn_missing = warn_missing
         if not self.translations:
             logger = getattr(current_app, 'logger', None)
             log_message = (
@@ -21,64 +51,107 @@ class TranslationManager:
                 'en': {'title': 'Book List (Default)', 'author': 'Author (Default)'},
                 'es': {'title': 'Lista de Libros (Por Defecto)', 'author': 'Autor (Por Defecto)'}
             }
+        self.missing_keys = set()  # (idioma efectivo, clave) pedidas en t() sin traducción
+        self._compile()
 
-    def _get_translation_string(self, key, lang_dict_effective, lang_dict_default, effective_lang):
-        """Helper para obtener la cadena de traducción, probando efectivo y luego default."""
-        translation_string = lang_dict_effective.get(key)
-        if translation_string is None:
-            translation_string = lang_dict_default.get(key)
+    def _compile(self):
+        default_dict = self.translations.get(self.default_lang, {})
+        self.tables, self.format_templates, self._t_funcs = {}, {}, {}
+        for lang in set(self.translations) | {self.default_lang}:
+            table = {key: value for key, value in default_dict.items() if value is not None}
+            table.update(
+                (key, value) for key, value in self.translations.get(lang, {}).items() if value is not None
+            )
+            self.tables[lang] = table
+            self.format_templates[lang] = {
+                key: pieces for key, value in table.items()
+                if isinstance(value, str) and (pieces := _parse_format_template(value)) is not None
+            }
 
-        if translation_string is None:
-            logger = getattr(current_app, 'logger', None)
-            if logger:  # Loguear siempre si falta una clave y hay logger  # E261 Corregido
-                log_msg = (
-                    f"Translation key '{key}' not found for lang '{effective_lang}' "
-                    f"or default '{self.default_lang}'."
-                )
-                logger.warning(log_msg)
-            return key  # Devolver la clave si no se encuentra traducción  # E261 Corregido
-        return translation_string
+    def _report_missing(self, effective_lang, key):
+        if (effective_lang, key) in self.missing_keys:
+            return
+        self.missing_keys.add((effective_lang, key))
+        if self.warn_missing and has_app_context():
+            current_app.logger.warning(
+                f"Translation key '{key}' not found for lang '{effective_lang}' "
+                f"or default '{self.default_lang}' (se avisa una sola vez)."
+            )
 
-    def _format_translation(self, key, translation_string, logger, **kwargs):
-        """Helper para formatear la cadena de traducción con kwargs."""
+    def _format_translation(self, key, translation_string, pieces, **kwargs):
+        """Interpola kwargs: con el template pre-parseado si lo hay, si no con str.format."""
         try:
+            if pieces is not None:
+                return ''.join(
+                    literal if field_name is None else literal + format(kwargs[field_name])
+                    for literal, field_name in pieces
+                )
             return translation_string.format(**kwargs)
         except KeyError as e:
-            if logger:
-                log_msg = (
+            if has_app_context():
+                current_app.logger.error(
                     f"Missing key '{e}' in translation arguments for key '{key}', "
                     f"string '{translation_string}', args {kwargs}"
                 )
-                logger.error(log_msg)
             return translation_string  # Fallback
         except Exception as e:
-            if logger:
-                log_msg = (
+            if has_app_context():
+                current_app.logger.error(
                     f"Error formatting translation for key '{key}', "
                     f"string '{translation_string}', args {kwargs}: {e}"
                 )
-                logger.error(log_msg)
             return translation_string  # Fallback
 
-    def get_translation_func(self, lang):  # noqa: C901
+    def get_translation_func(self, lang):
         """
-        Devuelve una función t(key, **kwargs) para el idioma dado que soporta interpolación.
+        Devuelve la función t(key, **kwargs) del idioma dado (la misma en cada llamada) con interpolación.
         """
         effective_lang = lang if lang in self.translations else self.default_lang
-        lang_dict_effective = self.translations.get(effective_lang, {})
-        lang_dict_default = self.translations.get(self.default_lang, {})
-        logger = getattr(current_app, 'logger', None)
+        t = self._t_funcs.get(effective_lang)
+        if t is not None:
+            return t
+        table = self.tables.get(effective_lang, {})
+        format_templates = self.format_templates.get(effective_lang, {})
 
         def t(key, **kwargs):
-            translation_string = self._get_translation_string(
-                key, lang_dict_effective, lang_dict_default, effective_lang
-            )
-            if translation_string == key and kwargs:  # Solo loguear si hay kwargs y no se encontró  # E261 Corregido
-                if logger:
-                    logger.debug(f"Key '{key}' not found, returning key. Kwargs {kwargs} ignored.")
-                return key  # Devuelve la clave directamente si no se encontró  # E261 Corregido
-
+            translation_string = table.get(key)
+            if translation_string is None:
+                self._report_missing(effective_lang, key)
+                return key  # Devolver la clave si no se encuentra traducción
             if kwargs:
-                return self._format_translation(key, translation_string, logger, **kwargs)
+                return self._format_translation(key, translation_string, format_templates.get(key), **kwargs)
             return translation_string
+
+        self._t_funcs[effective_lang] = t
         return t
+
+    def coverage_report(self, used_keys):
+        """
+        Cobertura por idioma de las claves usadas (p. ej. las de collect_template_translation_keys):
+        {'lang': {'fallback': [claves resueltas con el idioma por defecto], 'missing': [claves sin traducción]}}.
+        """
+        default_dict = self.translations.get(self.default_lang, {})
+        report = {}
+        for lang in sorted(self.tables):
+            own = self.translations.get(lang, {})
+            report[lang] = {
+                'fallback': sorted(k for k in used_keys if own.get(k) is None and default_dict.get(k) is not None),
+                'missing': sorted(k for k in used_keys if k not in self.tables[lang]),
+            }
+        return report
+
+
+def collect_template_translation_keys(jinja_env):
+    """Claves literales usadas como t('clave', ...) en todas las plantillas."""
+    keys = set()
+    for template_name in jinja_env.list_templates():
+        source, _, _ = jinja_env.loader.get_source(jinja_env, template_name)
+        try:
+            tree = jinja_env.parse(source)
+        except Exception:
+            continue
+        for call in tree.find_all(nodes.Call):
+            if (isinstance(call.node, nodes.Name) and call.node.name == 't' and call.args
+                    and isinstance(call.args[0], nodes.Const) and isinstance(call.args[0].value, str)):
+                keys.add(call.args[0].value)
+    return keys
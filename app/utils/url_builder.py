@@ -0,0 +1,138 @@
+# app/utils/url_builder.py
+"""
+Constructor de URLs localizadas precompilado.
+
+url_for pasa por el hook url_defaults de main_routes (varias lecturas de config y get_url_segment por
+segmento) en cada llamada, y una página de libro o una entrada de sitemap lo llama muchas veces
+(canonical, og:url, JSON-LD, alternates por idioma). Aquí cada regla de URL_SEGMENTS_TO_TRANSLATE se
+compila una vez por idioma, con lang_code y el segmento traducido ya sustituidos, y el resto de la URL
+se arma con operaciones de cadena. Al arrancar se compara contra url_for: si alguna regla no coincide,
+esa regla sigue usando url_for.
+"""
+import re
+from urllib.parse import quote
+
+from flask import g, request, url_for
+
+# Mismos caracteres seguros que el conversor por defecto de Werkzeug (BaseConverter.to_url)
+_PATH_SAFE = "!$&'()*+,/:;=@"
+_RULE_VAR_RE = re.compile(r'<(?:[^:<>]+:)?([^:<>]+)>')
+
+
+def _quote(value):
+    return quote(str(value), safe=_PATH_SAFE)
+
+
+def _translated_segment(config, segment_key, lang_code):
+    """Misma resolución que get_url_segment / url_defaults: idioma, idioma por defecto, clave canónica."""
+    default_lang = config.get('DEFAULT_LANGUAGE', 'en')
+    if lang_code not in config.get('SUPPORTED_LANGUAGES', ['en']):
+        lang_code = default_lang
+    segments_for_key = config.get('URL_SEGMENT_TRANSLATIONS', {}).get(segment_key, {})
+    translated = segments_for_key.get(lang_code)
+    if translated is None and lang_code != default_lang:
+        translated = segments_for_key.get(default_lang)
+    return translated if translated is not None else segment_key
+
+
+class LocalizedUrlBuilder:
+    """Plantillas de ruta por (endpoint, idioma): lista de literales y nombres de variable restantes."""
+
+    def __init__(self, app):
+        self.config = app.config
+        self._rules = {}
+        self._compiled = {}
+        for endpoint, segment_params in (app.config.get('URL_SEGMENTS_TO_TRANSLATE') or {}).items():
+            rule = next(iter(app.url_map.iter_rules(endpoint)), None) if endpoint in app.view_functions else None
+            if rule is None or not isinstance(segment_params, dict):
+                continue
+            pieces = _RULE_VAR_RE.split(rule.rule)  # literal, variable, literal, variable, ...
+            self._rules[endpoint] = (pieces, {param: key for key, param in segment_params.items()})
+        for endpoint in list(self._rules):
+            for lang_code in app.config.get('SUPPORTED_LANGUAGES', ['en']):
+                self._compile(endpoint, lang_code)
+
+    def _compile(self, endpoint, lang_code):
+        pieces, segment_keys_by_param = self._rules[endpoint]
+        fixed = {'lang_code': _quote(lang_code)}
+        for param, segment_key in segment_keys_by_param.items():
+            fixed[param] = _quote(_translated_segment(self.config, segment_key, lang_code))
+        tokens, variables, literal = [], [], ''
+        for i, piece in enumerate(pieces):
+            if i % 2 == 0:
+                literal += piece
+            elif piece in fixed:
+                literal += fixed[piece]
+            else:
+                tokens.append(literal)
+                variables.append(piece)
+                literal = ''
+        tokens.append(literal)
+        compiled = (tokens, variables, frozenset(variables))
+        self._compiled[(endpoint, lang_code)] = compiled
+        return compiled
+
+    def endpoints(self):
+        return list(self._rules)
+
+    def path(self, endpoint, lang_code, **values):
+        """Ruta relativa a la raíz de la app ('/en/book/a/b/123/'); None si la regla no está compilada."""
+        if endpoint not in self._rules:
+            return None
+        compiled = self._compiled.get((endpoint, lang_code)) or self._compile(endpoint, lang_code)
+        tokens, variables, variable_set = compiled
+        if values.keys() != variable_set:
+            return None
+        parts = [tokens[0]]
+        for name, token in zip(variables, tokens[1:]):
+            parts.append(_quote(values[name]))
+            parts.append(token)
+        return ''.join(parts)
+
+    def segment_path(self, endpoint, lang_code):
+        """Prefijo fijo de la regla ya localizado, sin barras exteriores ('en/book')."""
+        compiled = self._compiled.get((endpoint, lang_code)) or self._compile(endpoint, lang_code)
+        return compiled[0][0].strip('/')
+
+    def url_for(self, endpoint, lang_code=None, _external=False, **values):
+        """Equivalente a url_for para las reglas compiladas (con lang_code explícito); si no, delega en url_for."""
+        built = self.path(endpoint, lang_code, **values) if lang_code is not None and request else None
+        if built is None:
+            if lang_code is not None:
+                values['lang_code'] = lang_code
+            return url_for(endpoint, _external=_external, **values)
+        path_root, external_root = _request_roots()
+        return (external_root if _external else path_root) + built
+
+
+def _request_roots():
+    """(raíz de rutas, raíz externa) de la petición actual, calculadas una vez con url_for."""
+    roots = getattr(g, '_url_builder_roots', None)
+    if roots is None:
+        roots = (request.script_root, url_for('main.root_index', _external=True).removesuffix('/'))
+        g._url_builder_roots = roots
+    return roots
+
+
+def _sample_values(variables):
+    return {name: f"{name.replace('_', '-')}-1" for name in variables}
+
+
+def init_url_builder(app):
+    """
+    Crea app.url_builder y la global de plantillas localized_url (misma firma que url_for).
+    Las reglas cuyo resultado no coincide con url_for se descartan y siguen usando url_for.
+    """
+    builder = LocalizedUrlBuilder(app)
+    with app.test_request_context('/'):
+        for endpoint in builder.endpoints():
+            for lang_code in app.config.get('SUPPORTED_LANGUAGES', ['en']):
+                values = _sample_values(builder._compiled[(endpoint, lang_code)][1])
+                expected = url_for(endpoint, lang_code=lang_code, _external=True, **values)
+                if builder.url_for(endpoint, lang_code, _external=True, **values) != expected:
+                    app.logger.warning(f"URL precompilada de '{endpoint}' no coincide con url_for; se usará url_for.")
+                    del builder._rules[endpoint]
+                    break
+    app.url_builder = builder
+    app.jinja_env.globals['localized_url'] = builder.url_for
+    return builder
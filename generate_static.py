@@ -1,15 +1,16 @@
 # generate_static.py
-import shutil
 from pathlib import Path
 import re
 from unidecode import unidecode
 import logging
 import os
-from multiprocessing import Pool, cpu_count, current_process
+from multiprocessing import Pool, Queue, cpu_count, current_process
+from multiprocessing.util import Finalize
+from concurrent.futures import ThreadPoolExecutor
+import threading
 # from functools import partial # No se usa partial con starmap
 import argparse
 import json
-import hashlib
 import time
 
 # --- Carga de .env ---
@@ -31,6 +32,18 @@ try:
 except ImportError:
     print("[generate_static.py] python-dotenv not found, .env file will not be loaded.")
 
+# Módulos de la app (después del .env: app.config lee el entorno al importarse)
+# Firmas de página compartidas con el servidor híbrido (app.utils.static_site)
+from app.utils.page_signatures import (
+    book_page_signature, author_page_signature, versions_page_signature, index_page_signature,
+    facet_page_signature, facet_list_signature, leaderboard_page_signature, leaderboard_list_signature
+)
+from app.models.facet_index import FACET_TYPES, facet_endpoint, get_facet_index, book_facet_links
+from app.models.leaderboards import get_leaderboards, leaderboard_endpoint
+from app.config import Config
+from app.models.catalog_index import get_catalog_index
+from app.utils.minify_cache import minify_html_cached, prune_minify_cache
+
 # --- Configuración del Logger ---
 script_logger = logging.getLogger('generate_static_script')
 if not script_logger.handlers:
@@ -60,12 +73,22 @@ SPECIAL_CHARS_SITEMAP_KEY = "0"
 # Estas se inicializarán en worker_init
 worker_app_instance = None
 worker_logger = None
+worker_page_writer = None
+worker_counters = None
 slugify_to_use_global_worker = None
 get_sitemap_char_group_for_author_worker = None # Será la función de app.utils.helpers
 
 # --- Paths y Configuración ---
-MANIFEST_DIR, MANIFEST_FILE = Path(".cache"), Path(".cache/generation_manifest.json")
+MANIFEST_DIR, MANIFEST_FILE = Path(Config.CACHE_DIR), Path(Config.STATIC_SITE_MANIFEST)
+TRANSLATION_COVERAGE_FILE = MANIFEST_DIR / "translation_coverage.json"
+SEARCH_DOC_IDS_FILE = MANIFEST_DIR / "search_doc_ids.json"  # Ids estables de los documentos del índice de búsqueda
 OUTPUT_DIR = Path(os.environ.get('STATIC_SITE_OUTPUT_DIR', '_site'))
+# Etapa de escritura asíncrona de cada worker: hilos de escritura y máximo de páginas pendientes en memoria
+WRITER_THREADS = int(os.environ.get('STATIC_WRITER_THREADS', '4'))
+WRITER_MAX_PENDING = int(os.environ.get('STATIC_WRITER_MAX_PENDING', '256'))
+WORKER_LOG_FORMAT = '%(asctime)s-%(name)s-%(levelname)s-%(message)s'
+PUBLIC_DIR = Path("public")
+SHELL_ROUTER_FILE = "404.html"  # Router del modo shell (salvo que public/ traiga su propio 404.html)
 
 
 # --- Funciones de Ayuda (Específicas del Generador o Fallbacks) ---
@@ -90,27 +113,66 @@ except ImportError:
     def get_sitemap_char_group_for_author_local_fallback(name_or_slug, slugifier_func):
         if not name_or_slug: return SPECIAL_CHARS_SITEMAP_KEY # Usa la constante global de generate_static
         slug = slugifier_func(str(name_or_slug))
-        script_logger.debug(f"get_sitemap_char_group (local fallback): Input='{name_or_slug}', Slug='{slug}' (con {slugifier_func.__name__})")
+        script_logger.debug(
+            "get_sitemap_char_group (local fallback): Input='%s', Slug='%s' (con %s)",
+            name_or_slug, slug, slugifier_func.__name__
+        )
         if not slug: return SPECIAL_CHARS_SITEMAP_KEY
         char = slug[0].lower()
         # Usa la constante global de generate_static
         res = char if char in ALPHABET else SPECIAL_CHARS_SITEMAP_KEY
-        script_logger.debug(f"get_sitemap_char_group (local fallback): PrimerChar='{char}', Grupo='{res}'")
+        script_logger.debug("get_sitemap_char_group (local fallback): PrimerChar='%s', Grupo='%s'", char, res)
         return res
     get_sitemap_char_group_for_author_main = get_sitemap_char_group_for_author_local_fallback
 
 
-def get_translated_url_segment_for_generator(key, lang, trans, def_lang, def_val=None):
-    default_res = def_val if def_val is not None else key
-    if not trans or not isinstance(trans,dict): return default_res
-    segs = trans.get(key,{})
-    if not isinstance(segs,dict): return default_res
-    val = segs.get(lang)
-    if val: return val
-    if lang != def_lang:
-        val_dl = segs.get(def_lang)
-        if val_dl: return val_dl
-    return default_res
+def _book_url_parts(book, slugifier):
+    author_orig, title_orig = book.get('author_slug'), book.get('title_slug')
+    ident = book.get('isbn10') or book.get('isbn13') or book.get('asin')
+    if not all([author_orig, title_orig, ident]):
+        return None
+    return 'main.book_by_identifier', [slugifier(author_orig), slugifier(title_orig), str(ident)]
+
+
+def _author_url_parts(item_data, slugifier):
+    (author_orig, page_number, _page_count), related_books = item_data
+    if not related_books:
+        return None
+    if page_number == 1:
+        return 'main.author_books', [slugifier(author_orig)]
+    return 'main.author_books_page', [slugifier(author_orig), str(page_number)]
+
+
+def _item_url_parts(page_type, item_data, slugifier):
+    """(endpoint, partes dinámicas de la URL) de un item de tarea, o None si no genera página."""
+    if page_type == "book":
+        return _book_url_parts(item_data, slugifier)
+    if page_type == "author":
+        return _author_url_parts(item_data, slugifier)
+    if page_type == "versions":
+        (author_orig, base_title_orig), related_books = item_data
+        return ('main.book_versions', [slugifier(author_orig), slugifier(base_title_orig)]) if related_books else None
+    if page_type == "facet":
+        facet_type, facet_slug, page_number = item_data
+        if page_number == 1:
+            return facet_endpoint(facet_type, 'books'), [facet_slug]
+        return facet_endpoint(facet_type, 'books_page'), [facet_slug, str(page_number)]
+    if page_type == "facet_list":
+        return facet_endpoint(item_data, 'list'), []
+    if page_type == "leaderboard":
+        board, scope = item_data
+        return leaderboard_endpoint(scope), [board] if scope is None else [board, scope]
+    if page_type == "leaderboard_list":
+        return 'main.leaderboard_list', []
+    return None
+
+
+def _page_url_and_path(out_dir_base, lang, endpoint, dynamic_parts, url_builder):
+    """URL de Flask y ruta de salida de una página localizada (prefijo '<lang>/<segmento>' precompilado en la app)."""
+    prefix = url_builder.segment_path(endpoint, lang)
+    flask_url_path_elements = [prefix] + dynamic_parts
+    flask_url = "/" + "/".join(s.strip("/") for s in flask_url_path_elements if s.strip("/")) + "/"
+    return flask_url, Path(out_dir_base).joinpath(*prefix.split("/"), *dynamic_parts, "index.html")
 
 def load_manifest():
     if MANIFEST_FILE.exists():
@@ -125,54 +187,139 @@ def save_manifest(data):
     with open(MANIFEST_FILE,'w',encoding='utf-8') as f: json.dump(data,f,indent=2)
     script_logger.info(f"Manifest guardado ({len(data)} entradas).")
 
-def get_book_signature_fields(data):
-    return dict(sorted({"isbn10":data.get("isbn10"),"isbn13":data.get("isbn13"),"asin":data.get("asin"),
-                        "title_slug":data.get("title_slug"),"author_slug":data.get("author_slug"),
-                        "description":data.get("description_short")or data.get("description"),
-                        "cover_image_url":(data.get("image_url_l")or data.get("image_url_m")or data.get("image_url_s")),
-                        "publication_date":data.get("publication_date"),"publisher":data.get("publisher_name"),
-                        "language_code":data.get("language_code")}.items()))
-
-def calculate_signature(data): return hashlib.md5(json.dumps(data,sort_keys=True,ensure_ascii=False).encode('utf-8')).hexdigest()
 def should_regenerate_page(path_str,sig,manifest,log):
-    entry=manifest.get(path_str)
-    if not entry: log.debug(f"REGEN (nuevo): {path_str}"); return True
-    if entry.get('signature')!=sig: log.debug(f"REGEN (firma): {path_str}"); return True
-    if not Path(path_str).exists(): log.debug(f"REGEN (no existe): {path_str}"); return True
-    log.debug(f"SALTAR: {path_str}"); return False
-
-def _save_page_local(client,url,path_obj,log):
+    # Camino caliente (una llamada por página e idioma): mensajes con formato diferido
+    entry = manifest.get(path_str)
+    if not entry:
+        log.debug("REGEN (nuevo): %s", path_str)
+        return True
+    if entry.get('signature') != sig:
+        log.debug("REGEN (firma): %s", path_str)
+        return True
+    if not Path(path_str).exists():
+        log.debug("REGEN (no existe): %s", path_str)
+        return True
+    log.debug("SALTAR: %s", path_str)
+    return False
+
+
+def _save_page_local(client, url, path_obj, log, minify_cache_dir=None):
     try:
         resp=client.get(url)
         if resp.status_code==200:
             if resp.data:
-                path_obj.parent.mkdir(parents=True,exist_ok=True)
-                with open(path_obj,'wb') as f: f.write(resp.data)
-                log.info(f"GENERADO: {url} -> {path_obj}")
+                data = minify_html_cached(resp.data, minify_cache_dir)[0] if minify_cache_dir else resp.data
+                path_obj.parent.mkdir(parents=True, exist_ok=True)
+                with open(path_obj, 'wb') as f:
+                    f.write(data)
+                log.debug("GENERADO: %s -> %s", url, path_obj)
+                return True
             else: log.info(f"URL {url} 200 sin datos.")
         elif 300<=resp.status_code<400: log.warning(f"{url} REDIR {resp.status_code} -> {resp.headers.get('Location')}. NO guardado.")
         elif resp.status_code==404: log.warning(f"404: {url}. NO guardado.")
         else: log.error(f"HTTP {resp.status_code} para {url}. NO guardado.")
     except Exception: log.exception(f"EXCEPCIÓN {url}")
-
-
-def worker_init():
-    global worker_app_instance, worker_logger, slugify_to_use_global_worker, get_sitemap_char_group_for_author_worker
+    return False
+
+
+class WriteBehindWriter:
+    """
+    Escritura asíncrona (write-behind) de páginas: el worker entrega los bytes renderizados y sigue
+    renderizando mientras un pool de hilos crea directorios y escribe. La cola está acotada
+    (WRITER_MAX_PENDING) para que la memoria no crezca si el disco va más lento que el render.
+    """
+    def __init__(self, log, max_workers=WRITER_THREADS, max_pending=WRITER_MAX_PENDING, counters=None):
+        self._log = log
+        self._counters = counters
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='page-writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._made_dirs = set()  # Cada directorio padre se crea una sola vez
+
+    def _write(self, path_obj, data, url):
+        try:
+            parent = path_obj.parent
+            if parent not in self._made_dirs:
+                parent.mkdir(parents=True, exist_ok=True)
+                self._made_dirs.add(parent)
+            with open(path_obj, 'wb') as f:
+                f.write(data)
+            self._log.debug("GENERADO: %s -> %s", url, path_obj)
+            if self._counters is not None:
+                self._counters.incr("escritas")
+        except Exception:
+            self._log.exception("EXCEPCIÓN escribiendo %s", path_obj)
+            if self._counters is not None:
+                self._counters.incr("errores")
+        finally:
+            self._slots.release()
+
+    def submit(self, path_obj, data, url):
+        self._slots.acquire()  # Backpressure: bloquea si hay demasiadas escrituras pendientes
+        self._executor.submit(self._write, path_obj, data, url)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def _save_rendered_page_local(app, url, render_page, path_obj, log, writer=None, minify_cache_dir=None):
+    """
+    Renderiza directamente la vista (sin pasar por test_client), minifica el HTML (con caché en disco por hash
+    de entrada) si se da minify_cache_dir y lo guarda (vía writer si se da).
+    """
+    try:
+        with app.test_request_context(url):
+            html = render_page()
+        if html:
+            data = html.encode('utf-8')
+            if minify_cache_dir:
+                data = minify_html_cached(data, minify_cache_dir)[0]
+            if writer is not None:
+                writer.submit(path_obj, data, url)
+            else:
+                path_obj.parent.mkdir(parents=True, exist_ok=True)
+                with open(path_obj, 'wb') as f:
+                    f.write(data)
+                log.debug("GENERADO: %s -> %s", url, path_obj)
+            return True
+        log.info(f"URL {url} renderizada sin datos.")
+    except Exception:
+        log.exception(f"EXCEPCIÓN {url}")
+    return False
+
+
+def worker_init(log_queue=None):
+    global worker_app_instance, worker_logger, worker_page_writer, worker_counters
+    global slugify_to_use_global_worker, get_sitemap_char_group_for_author_worker
     
     from app import create_app # APP DEBE SER IMPORTABLE
+    from app.config import StaticBuildConfig
+    from app.utils.log_utils import EventCounters, attach_queue_handler
     os.environ['IS_STATIC_GENERATION_WORKER']='1'
     proc_name = current_process().name
-    worker_app_instance = create_app()
+    worker_app_instance = create_app(StaticBuildConfig)
     
     worker_logger = logging.getLogger(f'gsw.{proc_name.split("-")[-1]}')
-    if worker_logger.hasHandlers(): worker_logger.handlers.clear()
-    h = logging.StreamHandler()
-    fmtr = logging.Formatter('%(asctime)s-%(name)s-%(levelname)s-%(message)s')
-    h.setFormatter(fmtr)
-    worker_logger.addHandler(h)
     lvl_name = os.environ.get('SCRIPT_LOG_LEVEL','INFO').upper()
-    worker_logger.setLevel(getattr(logging, lvl_name, logging.INFO))
-    worker_logger.propagate = False
+    if log_queue is not None:
+        # Los registros van a la cola; el proceso padre los escribe con un único handler
+        attach_queue_handler(worker_logger, log_queue, getattr(logging, lvl_name, logging.INFO))
+        attach_queue_handler(worker_app_instance.logger, log_queue, worker_app_instance.logger.level)
+    else:
+        if worker_logger.hasHandlers():
+            worker_logger.handlers.clear()
+        h = logging.StreamHandler()
+        h.setFormatter(logging.Formatter(WORKER_LOG_FORMAT))
+        worker_logger.addHandler(h)
+        worker_logger.setLevel(getattr(logging, lvl_name, logging.INFO))
+        worker_logger.propagate = False
+
+    # Eventos por página agregados en contadores con volcado periódico (en vez de una línea por página)
+    worker_counters = EventCounters(worker_logger, "Páginas")
+    # Las escrituras pendientes se vacían al salir el worker (requiere pool.close()/join(), no terminate());
+    # después se vuelcan los contadores finales. Ambos antes del cierre de la cola de logs (exitpriority 10).
+    worker_page_writer = WriteBehindWriter(worker_logger, counters=worker_counters)
+    Finalize(worker_page_writer, worker_page_writer.close, exitpriority=101)
+    Finalize(worker_counters, worker_counters.flush, exitpriority=100)
     
     try: 
         from app.utils.helpers import slugify_ascii as slugify_app_w, get_sitemap_char_group_for_author as gs_helper_w
@@ -200,13 +347,18 @@ def worker_init():
 
 
 def _generate_task_common(item_data, cfg_manifest_tuple, page_type):  # noqa: C901
+    from app.routes.main_routes import (
+        build_book_page_data, build_author_page_data, build_versions_page_data, build_facet_page_data,
+        build_facet_list_data, build_leaderboard_page_data, build_leaderboard_list_data, render_book_page,
+        render_author_page, render_versions_page, render_facet_page, render_facet_list_page, render_leaderboard_page,
+        render_leaderboard_list_page
+    )
+    from app.utils.related_books import related_book_ids
     config_params, manifest_data_global, *_ = cfg_manifest_tuple
     LANGUAGES = config_params['LANGUAGES']
-    DEFAULT_LANGUAGE = config_params['DEFAULT_LANGUAGE']
-    URL_SEGMENT_TRANSLATIONS = config_params['URL_SEGMENT_TRANSLATIONS']
     OUTPUT_DIR_BASE = Path(config_params['OUTPUT_DIR'])
     FORCE_REGENERATE = config_params.get('FORCE_REGENERATE_ALL', False)
-    ALL_BOOKS = config_params['ALL_BOOKS_DATA']
+    MINIFY_CACHE_DIR = config_params.get('MINIFY_CACHE_DIR')
 
     log_target = worker_logger # Usa el logger del worker
     # Usa las funciones asignadas en worker_init
@@ -216,79 +368,132 @@ def _generate_task_common(item_data, cfg_manifest_tuple, page_type):  # noqa: C9
     app_for_context = worker_app_instance
 
     generated_pages_info = []
-    current_page_signature, segment_key_for_url, dynamic_url_parts = "", "", []
+    current_page_signature = ""
+
+    url_parts = _item_url_parts(page_type, item_data, current_slugifier)
+    if url_parts is None:
+        log_target.debug(f"Saltando item {page_type} sin página (datos incompletos o sin libros).")
+        return []
+    endpoint_for_url, str_dynamic_parts = url_parts
 
     if page_type == "book":
         book = item_data
-        author_orig, title_orig = book.get('author_slug'), book.get('title_slug')
-        ident = book.get('isbn10') or book.get('isbn13') or book.get('asin')
-        if not all([author_orig, title_orig, ident]):
-            log_target.debug(f"Saltando libro (datos incompletos): ID '{ident}'")
-            return []
-        author_s, title_s = current_slugifier(author_orig), current_slugifier(title_orig)
-        current_page_signature = calculate_signature(get_book_signature_fields(book))
-        segment_key_for_url, dynamic_url_parts = 'book', [author_s, title_s, str(ident)]
+        current_page_signature = book_page_signature(
+            book, related_book_ids(app_for_context, book), book_facet_links(app_for_context, book)
+        )
+        build_page_data = lambda: build_book_page_data(book)  # noqa: E731
+        render_page = lambda lang, page: render_book_page(lang, book, page)  # noqa: E731
     elif page_type == "author":
-        author_orig = item_data
-        author_s = current_slugifier(author_orig)
-        related_books = [b for b in ALL_BOOKS if current_slugifier(b.get('author_slug')) == author_s]
-        if not related_books:
-            log_target.debug(f"No hay libros para autor '{author_s}' (original '{author_orig}').")
-            return []
-        ids = sorted([b.get('isbn10') or b.get('isbn13') or b.get('asin') for b in related_books])
-        current_page_signature = calculate_signature({"book_ids": ids, "author_slug": author_orig})
-        segment_key_for_url, dynamic_url_parts = 'author', [author_s]
+        # El item ya llega paginado desde el proceso principal: ((autor, página, total de páginas), libros de la página)
+        (author_orig, page_number, page_count), related_books = item_data
+        author_s = str_dynamic_parts[0]
+        current_page_signature = author_page_signature(author_orig, related_books, page_number, page_number < page_count)
+        build_page_data = lambda: build_author_page_data(author_s, related_books, page_number, page_count)  # noqa: E731
+        render_page = lambda lang, page: render_author_page(lang, related_books, page)  # noqa: E731
     elif page_type == "versions":
-        author_orig, base_title_orig = item_data
-        author_s, base_title_s = current_slugifier(author_orig), current_slugifier(base_title_orig)
-        related_books = [
-            b for b in ALL_BOOKS
-            if current_slugifier(b.get('author_slug')) == author_s and
-               current_slugifier(b.get('base_title_slug')) == base_title_s
-        ]
-        if not related_books:
-            log_target.debug(f"No hay versiones para '{author_s}','{base_title_s}'.")
+        # El item ya llega agrupado desde el proceso principal: ((autor, título base), libros)
+        (author_orig, base_title_orig), related_books = item_data
+        author_s, base_title_s = str_dynamic_parts
+        current_page_signature = versions_page_signature(author_orig, base_title_orig, related_books)
+        build_page_data = lambda: build_versions_page_data(author_s, base_title_s, related_books)  # noqa: E731
+        render_page = lambda lang, page: render_versions_page(lang, related_books, page)  # noqa: E731
+    elif page_type == "facet":
+        # Los libros de la página salen del índice de facetas del worker (misma paginación que el servidor)
+        facet_type, facet_slug, page_number = item_data
+        facet_index = get_facet_index(app_for_context)
+        pages = facet_index.pages(facet_type, facet_slug) or []
+        if not 1 <= page_number <= len(pages):
+            return []
+        page_books, has_next = pages[page_number - 1], page_number < len(pages)
+        current_page_signature = facet_page_signature(
+            facet_type, facet_slug, facet_index.name(facet_type, facet_slug), page_number, has_next, page_books
+        )
+        build_page_data = lambda: build_facet_page_data(facet_type, facet_slug, page_number, len(pages))  # noqa: E731
+        render_page = lambda lang, page: render_facet_page(lang, page_books, page)  # noqa: E731
+    elif page_type == "facet_list":
+        facet_type = item_data
+        with app_for_context.app_context():
+            list_data = build_facet_list_data(facet_type)
+        current_page_signature = facet_list_signature(facet_type, list_data['values'])
+        build_page_data = lambda: list_data  # noqa: E731
+        render_page = lambda lang, page: render_facet_list_page(lang, page)  # noqa: E731
+    elif page_type == "leaderboard":
+        # Como las facetas: el item es (clasificación, ámbito) y los libros salen del índice del worker
+        board, scope = item_data
+        leaderboards = get_leaderboards(app_for_context)
+        ranked_books = leaderboards.books(board, scope)
+        if not ranked_books:
             return []
-        ids = sorted([b.get('isbn10') or b.get('isbn13') or b.get('asin') for b in related_books])
-        current_page_signature = calculate_signature({
-            "book_ids": ids, "author_slug": author_orig, "base_title_slug": base_title_orig
-        })
-        segment_key_for_url, dynamic_url_parts = 'versions', [author_s, base_title_s]
+        current_page_signature = leaderboard_page_signature(board, scope, leaderboards.name(board, scope), ranked_books)
+        build_page_data = lambda: build_leaderboard_page_data(board, scope)  # noqa: E731
+        render_page = lambda lang, page: render_leaderboard_page(lang, ranked_books, page)  # noqa: E731
+    elif page_type == "leaderboard_list":
+        with app_for_context.app_context():
+            list_data = build_leaderboard_list_data()
+        current_page_signature = leaderboard_list_signature(list_data)
+        build_page_data = lambda: list_data  # noqa: E731
+        render_page = lambda lang, page: render_leaderboard_list_page(lang, page)  # noqa: E731
     else:
         log_target.error(f"Tipo de página desconocido: {page_type}")
         return []
 
     with app_for_context.app_context():
-        with app_for_context.test_client() as client:
-            for lang in LANGUAGES:
-                segment_translated = get_translated_url_segment_for_generator(
-                    segment_key_for_url, lang, URL_SEGMENT_TRANSLATIONS, DEFAULT_LANGUAGE, segment_key_for_url
-                )
-                str_dynamic_parts = [str(p) for p in dynamic_url_parts]
-                flask_url_path_elements = [f"/{lang}", segment_translated] + str_dynamic_parts
-                flask_url = "/" + "/".join(s.strip("/") for s in flask_url_path_elements if s.strip("/")) + "/"
-
-                output_path_parts = [lang, segment_translated] + str_dynamic_parts + ["index.html"]
-                output_path_obj = OUTPUT_DIR_BASE.joinpath(*output_path_parts)
-                output_path_str = str(output_path_obj)
-
-                if FORCE_REGENERATE or should_regenerate_page(
-                    output_path_str, current_page_signature, manifest_data_global, log_target
-                ):
-                    _save_page_local(client, flask_url, output_path_obj, log_target)
-                    generated_pages_info.append({
-                        "path": output_path_str, "signature": current_page_signature, "timestamp": time.time()
-                    })
+        # Parte del contexto independiente del idioma: se calcula una sola vez por item
+        # (y solo si alguna página del item necesita regenerarse).
+        page_data = None
+        for lang in LANGUAGES:
+            flask_url, output_path_obj = _page_url_and_path(
+                OUTPUT_DIR_BASE, lang, endpoint_for_url, str_dynamic_parts, app_for_context.url_builder
+            )
+            output_path_str = str(output_path_obj)
+
+            if not (FORCE_REGENERATE or should_regenerate_page(
+                output_path_str, current_page_signature, manifest_data_global, log_target
+            )):
+                worker_counters.incr("saltadas")
+                continue
+            if page_data is None:
+                page_data = build_page_data()
+            if not _save_rendered_page_local(
+                app_for_context, flask_url, lambda: render_page(lang, page_data), output_path_obj, log_target,
+                writer=worker_page_writer, minify_cache_dir=MINIFY_CACHE_DIR
+            ):
+                # Sin entrada de manifest: la página se reintenta en la siguiente ejecución
+                worker_counters.incr("errores")
+                continue
+            generated_pages_info.append({
+                "path": output_path_str, "signature": current_page_signature, "timestamp": time.time()
+            })
     return generated_pages_info
 
+
 def generate_book_detail_pages_task(item_data, cfg_manifest_tuple):
     return _generate_task_common(item_data, cfg_manifest_tuple, "book")
 
-def generate_author_pages_task(author_slug_original, cfg_manifest_tuple):
-    return _generate_task_common(author_slug_original, cfg_manifest_tuple, "author")
 
-def generate_versions_pages_task(author_base_title_slugs_original, cfg_manifest_tuple):
-    return _generate_task_common(author_base_title_slugs_original, cfg_manifest_tuple, "versions")
+def generate_author_pages_task(author_item, cfg_manifest_tuple):
+    return _generate_task_common(author_item, cfg_manifest_tuple, "author")
+
+
+def generate_versions_pages_task(versions_item, cfg_manifest_tuple):
+    return _generate_task_common(versions_item, cfg_manifest_tuple, "versions")
+
+
+def generate_facet_pages_task(facet_item, cfg_manifest_tuple):
+    return _generate_task_common(facet_item, cfg_manifest_tuple, "facet")
+
+
+def generate_facet_list_pages_task(facet_type, cfg_manifest_tuple):
+    return _generate_task_common(facet_type, cfg_manifest_tuple, "facet_list")
+
+
+def generate_leaderboard_pages_task(leaderboard_item, cfg_manifest_tuple):
+    return _generate_task_common(leaderboard_item, cfg_manifest_tuple, "leaderboard")
+
+
+def generate_leaderboard_list_pages_task(_item, cfg_manifest_tuple):
+    return _generate_task_common(None, cfg_manifest_tuple, "leaderboard_list")
+
 
 def _parse_cli_args():
     parser = argparse.ArgumentParser(description="Generador de sitio estático.")
@@ -305,20 +510,25 @@ def _parse_cli_args():
             "Si es 'core', genera solo 'sitemap_<lang>_core.xml' (como índice) y todos los sitemaps de carácter de ese idioma."
         )
     )
+    parser.add_argument("--shell-mode", action="store_true",
+                        help="Páginas de libro como shell por idioma + datos JSON fragmentados "
+                             "(salvo los libros más populares). Solo en ejecuciones completas (sin --language ni --char-key).")
+    parser.add_argument("--no-minify", action="store_true",
+                        help="Desactivar la minificación de build (independiente de MINIFY_HTML del servidor).")
     parser.add_argument("--log-level", type=str, default=os.environ.get('SCRIPT_LOG_LEVEL','INFO').upper(),
                         choices=['DEBUG','INFO','WARNING','ERROR','CRITICAL'], help="Nivel de log.")
     return parser.parse_args()
 
 def _setup_environment_data(args, logger): # noqa: C901
     from app import create_app 
-    from app.models.data_loader import load_processed_books as app_load_books
+    from app.config import StaticBuildConfig
 
     logger.info(f"Args: {args}")
     if args.force_regenerate: logger.info("FORZANDO REGENERACIÓN.")
     manifest = load_manifest(); logger.info(f"Manifest: {len(manifest)} entradas.")
     if 'IS_STATIC_GENERATION_WORKER' in os.environ: del os.environ['IS_STATIC_GENERATION_WORKER']
     
-    app = create_app()
+    app = create_app(StaticBuildConfig)
     logger.info(f"App Flask creada. APP_ROOT:'{app.config.get('APPLICATION_ROOT')}', SERVER_NAME:'{app.config.get('SERVER_NAME')}'")
 
     filename_key_for_data = None
@@ -339,13 +549,13 @@ def _setup_environment_data(args, logger): # noqa: C901
         logger.info(f"char_key '{args.char_key}' (letra o '0'). Se usará para filtrar autores en tareas paralelas.")
     
     if filename_key_for_data:
-        books_dir = app.config.get('BOOKS_DATA_DIR')
-        if books_dir:
-            logger.info(f"Recargando datos de libros SOLO desde 'books_{filename_key_for_data}.csv'")
-            app.books_data = app_load_books(books_dir, filename_filter_key=filename_key_for_data)
-            logger.info(f"Libros después de filtro de archivo: {len(app.books_data)}")
-            if not app.books_data: logger.warning(f"No se cargaron libros de 'books_{filename_key_for_data}.csv'.")
-        else: logger.error("BOOKS_DATA_DIR no configurado.")
+        # Se filtra el catálogo ya cargado (no se recarga el CSV): los grupos de ediciones, y con ellos los
+        # slugs de versiones, se calculan sobre el catálogo entero, igual que en los workers y el servidor
+        logger.info(f"Filtrando datos de libros a los de 'books_{filename_key_for_data}.csv'")
+        app.books_data = [b for b in (app.books_data or []) if b.get('source_file_key') == filename_key_for_data]
+        logger.info(f"Libros después de filtro de archivo: {len(app.books_data)}")
+        if not app.books_data:
+            logger.warning(f"No se cargaron libros de 'books_{filename_key_for_data}.csv'.")
     
     all_cfg_langs = app.config.get('SUPPORTED_LANGUAGES',['en'])
     langs_proc = [args.language] if args.language and args.language in all_cfg_langs else all_cfg_langs
@@ -360,7 +570,6 @@ def _setup_environment_data(args, logger): # noqa: C901
 
     return {"app":app, "manifest":manifest, "languages_to_process":langs_proc,
             "default_language":app.config.get('DEFAULT_LANGUAGE','en'),
-            "url_segment_translations":app.config.get('URL_SEGMENT_TRANSLATIONS',{}),
             "books_data_for_tasks":books_final_for_tasks,
             "output_dir_path":OUTPUT_DIR,
             "char_key_for_author_filter": actual_char_key_for_author_filter,
@@ -377,21 +586,29 @@ def _prepare_output_directory(app,out_dir,lang,cleanup,sitemap_char_key_original
         return
 
     if cleanup and is_fully_unfiltered_run :
-        if out_dir.exists(): logger.info(f"Eliminando {out_dir}"); shutil.rmtree(out_dir)
-        out_dir.mkdir(parents=True,exist_ok=True); logger.info(f"{out_dir} creado/limpio.")
+        # Sin rmtree: las páginas válidas se conservan (y con ellas el manifest); los huérfanos
+        # se podan al final con _prune_stale_outputs.
+        out_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"{out_dir} asegurado (ejecución completa no destructiva).")
+        # Sincronización incremental por hash: solo se copian los archivos que cambiaron
+        from app.utils.assets import sync_static_assets, sync_file_by_hash
         if app_static_folder_abs.exists()and app_static_folder_abs.is_dir():
-            target=out_dir/Path(app.static_url_path.strip('/')).name
-            if target.exists():shutil.rmtree(target)
-            shutil.copytree(app_static_folder_abs,target,dirs_exist_ok=True); logger.info(f"'{app_static_folder_abs.name}' copiada.")
+            target = out_dir / Path(app.static_url_path.strip('/')).name
+            copied, removed = sync_static_assets(
+                app_static_folder_abs, target, app.config.get('STATIC_ASSET_MANIFEST', 'assets-manifest.json')
+            )
+            logger.info(f"'{app_static_folder_abs.name}' sincronizada: {copied} copiados, {removed} eliminados.")
         else: logger.warning(f"Static dir no encontrado: {app_static_folder_abs}")
-        public=Path("public")
+        public = PUBLIC_DIR
         if public.exists()and public.is_dir():
             copied_files_count = 0
             for item in public.iterdir():
                 if item.is_file():
-                    try: shutil.copy2(item,out_dir/item.name); copied_files_count+=1
-                    except Exception as e: logger.error(f"Error copiando '{item.name}': {e}")
-            logger.info(f"{copied_files_count} archivos de public/ copiados.")
+                    try:
+                        copied_files_count += sync_file_by_hash(item, out_dir / item.name)
+                    except Exception as e:
+                        logger.error(f"Error copiando '{item.name}': {e}")
+            logger.info(f"{copied_files_count} archivos de public/ copiados (sin cambios omitidos).")
     else:
         out_dir.mkdir(parents=True,exist_ok=True)
         if lang: (out_dir/lang).mkdir(parents=True,exist_ok=True)
@@ -399,99 +616,97 @@ def _prepare_output_directory(app,out_dir,lang,cleanup,sitemap_char_key_original
 
 
 def get_all_defined_sitemap_char_keys(app, logger_ref):
-    author_filter_keys = list(ALPHABET) + [SPECIAL_CHARS_SITEMAP_KEY]
-    data_file_keys = []
-    books_data_dir_str = app.config.get('BOOKS_DATA_DIR')
-    
-    # Intentar obtener de la configuración de la app primero
-    # VALID_SITEMAP_CHAR_GROUPS_AUTHOR_FILTER = app.config.get('VALID_SITEMAP_CHAR_GROUPS_AUTHOR_FILTER', author_filter_keys)
-    # VALID_SITEMAP_CHAR_GROUPS_DATA_FILES = app.config.get('VALID_SITEMAP_CHAR_GROUPS_DATA_FILES', [])
-    
-    # if not VALID_SITEMAP_CHAR_GROUPS_DATA_FILES and books_data_dir_str: # Si no está en config, intentar descubrir
-    if books_data_dir_str: # Siempre intentar descubrir si books_data_dir está presente
-        books_data_dir = Path(books_data_dir_str)
-        if books_data_dir.is_dir():
-            for i in range(100): 
-                if (books_data_dir / f"books_{i}.csv").exists():
-                    data_file_keys.append(str(i))
-        # else:
-        #     VALID_SITEMAP_CHAR_GROUPS_DATA_FILES = data_file_keys # Usar los descubiertos
-
-    # combined_keys = list(set(VALID_SITEMAP_CHAR_GROUPS_AUTHOR_FILTER + VALID_SITEMAP_CHAR_GROUPS_DATA_FILES))
-    combined_keys = list(set(author_filter_keys + data_file_keys))
-    logger_ref.debug(f"Todos los char_keys definidos para sitemaps: {sorted(combined_keys)}")
-    return sorted(combined_keys)
-
-
-def _generate_main_process_pages(app, langs_to_process, out_dir, lang_arg_cli, force_regen, sitemap_char_key_cli, logger): # noqa: C901
+    # Sale de los buckets del motor de sitemaps (una pasada en memoria, sin comprobar archivos en disco)
+    from app.utils.sitemap_engine import get_sitemap_buckets
+    combined_keys = get_sitemap_buckets(app).keys()
+    logger_ref.debug(f"Todos los char_keys definidos para sitemaps: {combined_keys}")
+    return combined_keys
+
+
+def _generate_main_process_pages(app, langs_to_process, out_dir, lang_arg_cli, force_regen, sitemap_char_key_cli, manifest,
+                                 minify_cache_dir, logger):  # noqa: C901
+    """Portadas ("/" y "/<lang>/"): solo se reescriben si cambió su firma. Devuelve las entradas de manifest escritas."""
     logger.info(
         f"Gen main pages: lang_arg_cli='{lang_arg_cli}', sitemap_char_key_cli='{sitemap_char_key_cli}', "
         f"langs_to_process={langs_to_process}"
     )
+    pages = []
+    if not lang_arg_cli and not sitemap_char_key_cli:
+        pages.append(("/", out_dir / "index.html", index_page_signature(app, None)))
+    if not sitemap_char_key_cli or sitemap_char_key_cli == "core":
+        pages += [
+            (f"/{lang_c}/", out_dir / lang_c / "index.html", index_page_signature(app, lang_c)) for lang_c in langs_to_process
+        ]
 
+    new_entries = []
     with app.app_context(), app.test_client() as client:
-        is_fully_unfiltered_run = not lang_arg_cli and not sitemap_char_key_cli
-        
-        if is_fully_unfiltered_run:
-            if force_regen or not (out_dir / "index.html").exists():
-                _save_page_local(client, "/", out_dir / "index.html", logger)
-        
-        generate_lang_indexes = not sitemap_char_key_cli or sitemap_char_key_cli == "core"
-        if generate_lang_indexes:
-            for lang_c in langs_to_process:
-                if force_regen or not (out_dir / lang_c / "index.html").exists():
-                    _save_page_local(client, f"/{lang_c}/", out_dir / lang_c / "index.html", logger)
+        for url, path_obj, signature in pages:
+            if force_regen or should_regenerate_page(str(path_obj), signature, manifest, logger):
+                if _save_page_local(client, url, path_obj, logger, minify_cache_dir):
+                    new_entries.append({"path": str(path_obj), "signature": signature, "timestamp": time.time()})
+    return new_entries
 
-        all_individual_sitemap_keys = get_all_defined_sitemap_char_keys(app, logger)
 
+def _generate_sitemaps(app, langs_to_process, out_dir, lang_arg_cli, force_regen, sitemap_char_key_cli, manifest,  # noqa: C901
+                       logger):
+    """
+    Sitemaps con el motor en streaming (sin pasar por test_client). Se ejecuta después de las tareas para que
+    lastmod salga del manifest ya actualizado; solo se reescriben los buckets cuyo contenido cambió.
+    Devuelve (todas las rutas de sitemap, número de archivos reescritos).
+    """
+    from app.utils.sitemap_engine import (
+        write_language_sitemaps, write_index_file, sitemap_file_url, state_lastmod, ManifestLastmod
+    )
+    if force_regen:
+        for path_str in [p for p in manifest if Path(p).name.startswith("sitemap")]:
+            del manifest[path_str]
+
+    sitemap_paths, rewritten = [], 0
+    all_individual_sitemap_keys = get_all_defined_sitemap_char_keys(app, logger)
+    # url_for externo necesita contexto de request
+    with app.test_request_context("/"):
+        lastmod_lookup = ManifestLastmod(manifest, out_dir, sitemap_file_url(""))
         for lang_c in langs_to_process:
-            sitemap_lang_core_url = f"/sitemap_{lang_c}_core.xml"
-            sitemap_lang_core_path = out_dir / f"sitemap_{lang_c}_core.xml"
-            
-            if sitemap_char_key_cli:
-                if sitemap_char_key_cli == "core":
-                    logger.info(f"Modo --char-key core: Generando sitemap índice y todos los de carácter para '{lang_c}'.")
-                    _save_page_local(client, sitemap_lang_core_url, sitemap_lang_core_path, logger)
-                    for char_k in all_individual_sitemap_keys:
-                        s_char_url = f"/sitemap_{lang_c}_{char_k}.xml"
-                        s_char_path = out_dir / f"sitemap_{lang_c}_{char_k}.xml"
-                        _save_page_local(client, s_char_url, s_char_path, logger)
-                else:
-                    if sitemap_char_key_cli not in all_individual_sitemap_keys:
-                        logger.warning(
-                            f"El char_key '{sitemap_char_key_cli}' no está en la lista de sitemaps de carácter definidos "
-                            f"({all_individual_sitemap_keys}). Se intentará generar de todas formas."
-                        )
-                    s_char_url = f"/sitemap_{lang_c}_{sitemap_char_key_cli}.xml"
-                    s_char_path = out_dir / f"sitemap_{lang_c}_{sitemap_char_key_cli}.xml"
-                    logger.info(f"Modo --char-key '{sitemap_char_key_cli}': Generando solo sitemap de carácter específico: {s_char_path}")
-                    _save_page_local(client, s_char_url, s_char_path, logger)
-            else: # Sin --char-key (ejecución completa o solo --language)
-                logger.info(f"Modo ejecución completa para idioma '{lang_c}': Generando sitemap índice y todos los de carácter.")
-                _save_page_local(client, sitemap_lang_core_url, sitemap_lang_core_path, logger)
-                for char_k in all_individual_sitemap_keys:
-                    s_char_url = f"/sitemap_{lang_c}_{char_k}.xml"
-                    s_char_path = out_dir / f"sitemap_{lang_c}_{char_k}.xml"
-                    _save_page_local(client, s_char_url, s_char_path, logger)
-
-        if is_fully_unfiltered_run:
-            sitemap_main_url = "/sitemap.xml"
-            sitemap_main_path = out_dir / "sitemap.xml"
-            logger.info(f"Generando sitemap ÍNDICE principal: {sitemap_main_path}")
-            _save_page_local(client, sitemap_main_url, sitemap_main_path, logger)
-
+            if sitemap_char_key_cli and sitemap_char_key_cli != "core":
+                if sitemap_char_key_cli not in all_individual_sitemap_keys:
+                    logger.warning(
+                        f"El char_key '{sitemap_char_key_cli}' no está en la lista de sitemaps de carácter definidos "
+                        f"({all_individual_sitemap_keys}). Se intentará generar de todas formas."
+                    )
+                logger.info(
+                    f"Modo --char-key '{sitemap_char_key_cli}': Generando solo sitemap de carácter específico para '{lang_c}'."
+                )
+                paths, count = write_language_sitemaps(
+                    app, lang_c, out_dir, [sitemap_char_key_cli], write_core=False, state=manifest,
+                    lastmod_lookup=lastmod_lookup
+                )
+            else:
+                logger.info(f"Generando sitemap índice y todos los de carácter para '{lang_c}'.")
+                paths, count = write_language_sitemaps(app, lang_c, out_dir, state=manifest, lastmod_lookup=lastmod_lookup)
+            sitemap_paths += paths
+            rewritten += count
 
-def _run_parallel_tasks(env_data, force_regen, author_filter_char_key_for_tasks, logger): # noqa: C901
-    num_procs=max(1,cpu_count()-1 if cpu_count()>1 else 1); logger.info(f"Pool: {num_procs} procesos.")
+        if not lang_arg_cli and not sitemap_char_key_cli:
+            sitemap_main_path = out_dir / "sitemap.xml"
+            all_langs = app.config.get('SUPPORTED_LANGUAGES', ['en'])
+            core_entries = [
+                (sitemap_file_url(f"sitemap_{lang_c}_core.xml"),
+                 state_lastmod(manifest, out_dir / f"sitemap_{lang_c}_core.xml"))
+                for lang_c in all_langs
+            ]
+            paths, changed = write_index_file(sitemap_main_path, core_entries, app.config.get('SITEMAP_GZIP', True), manifest)
+            if changed:
+                logger.info(f"Sitemap ÍNDICE principal reescrito: {sitemap_main_path}")
+            sitemap_paths += paths
+            rewritten += len(paths) if changed else 0
+    logger.info(f"Sitemaps: {rewritten} archivos reescritos, {len(sitemap_paths) - rewritten} sin cambios.")
+    return [str(p) for p in sitemap_paths], rewritten
+
+
+def _build_task_defs(env_data, author_filter_char_key_for_tasks, logger):  # noqa: C901
+    """Items de cada tarea paralela: lista de (nombre, page_type, función, items)."""
     books_src = env_data["books_data_for_tasks"]
 
-    cfg_tasks={'LANGUAGES':env_data["languages_to_process"],'DEFAULT_LANGUAGE':env_data["default_language"],
-               'URL_SEGMENT_TRANSLATIONS':env_data["url_segment_translations"],'OUTPUT_DIR':str(env_data["output_dir_path"]),
-               'FORCE_REGENERATE_ALL':force_regen,
-               'ALL_BOOKS_DATA': books_src
-               }
-    task_args=(cfg_tasks,env_data["manifest"].copy()); new_entries=[]
-    
     # Usar la función get_sitemap_char_group_for_author_main importada/definida globalmente
     # y el slugify_to_use_global_main.
     # Estas ya están seleccionadas (de app o local fallback) al inicio del script.
@@ -500,11 +715,17 @@ def _run_parallel_tasks(env_data, force_regen, author_filter_char_key_for_tasks,
 
 
     detail_items = list(books_src)
-    author_items_source = {b.get('author_slug') for b in books_src if b.get('author_slug')}
-    version_items_source = {
-        (b.get('author_slug'), b.get('base_title_slug'))
-        for b in books_src if b.get('author_slug') and b.get('base_title_slug')
-    }
+    # Agrupación en una sola pasada: cada tarea recibe ya sus libros, sin reescanear el catálogo
+    # (ni enviarlo entero a cada worker con cada item).
+    books_by_author, books_by_version = {}, {}
+    for b in books_src:
+        a_slug, bt_slug = b.get('author_slug'), b.get('base_title_slug')
+        if a_slug:
+            books_by_author.setdefault(a_slug, []).append(b)
+            if bt_slug:
+                books_by_version.setdefault((a_slug, bt_slug), []).append(b)
+    author_items_source = set(books_by_author)
+    version_items_source = set(books_by_version)
 
     if author_filter_char_key_for_tasks and env_data["languages_to_process"]:
         logger.info(f"Filtrando contenido de tareas paralelas por char_key de autor: '{author_filter_char_key_for_tasks}'")
@@ -529,14 +750,62 @@ def _run_parallel_tasks(env_data, force_regen, author_filter_char_key_for_tasks,
             logger.warning(f"No hay elementos para tareas paralelas con char_key de autor '{author_filter_char_key_for_tasks}'.")
             return []
     
-    task_defs=[("Detalle",generate_book_detail_pages_task, detail_items),
-               ("Autor",generate_author_pages_task, list(author_items_source))]
-    # ELIMINADO VERSIONES
-    # , ("Versiones",generate_versions_pages_task, list(version_items_source))
-               
-
-    with Pool(processes=num_procs,initializer=worker_init) as pool:
-        for name,func,items in task_defs:
+    # Versiones: los grupos (autor, título base) salen de la misma pasada de agrupación, así que cada
+    # item llega con sus libros y el coste por página es del orden del de las páginas de detalle.
+    # Cubre también las URLs de main.book_versions que anuncian los sitemaps.
+    # Autores: una tarea por página, con la misma paginación estable que el servidor (CatalogIndex.author_pages)
+    app = env_data["app"]
+    catalog = get_catalog_index(app)
+    author_items = [
+        ((a, n, len(pages)), page_books) for a in sorted(author_items_source)
+        for pages in [catalog.author_pages(a)] for n, page_books in enumerate(pages, 1)
+    ]
+    task_defs = [("Detalle", "book", generate_book_detail_pages_task, detail_items),
+                 ("Autor", "author", generate_author_pages_task, author_items),
+                 ("Versiones", "versions", generate_versions_pages_task,
+                  [(k, books_by_version[k]) for k in sorted(version_items_source)])]
+    # Facetas: solo sin filtro de autor (una página de categoría mezcla autores de todas las letras). El
+    # proceso principal solo reparte (tipo, slug, número de página); cada worker pagina con su propio índice.
+    if app.config.get('FACET_PAGES', True) and not author_filter_char_key_for_tasks:
+        facet_index = get_facet_index(app)
+        facet_types = [t for t in FACET_TYPES if facet_index.value_slugs(t)]
+        facet_items = [
+            (t, slug, n) for t in facet_types for slug in facet_index.value_slugs(t)
+            for n in range(1, len(facet_index.pages(t, slug)) + 1)
+        ]
+        task_defs += [("Facetas", "facet", generate_facet_pages_task, facet_items),
+                      ("Índices de facetas", "facet_list", generate_facet_list_pages_task, facet_types)]
+    # Clasificaciones: también sin filtro de autor; el proceso principal reparte (clasificación, ámbito)
+    if app.config.get('LEADERBOARDS', True) and not author_filter_char_key_for_tasks:
+        leaderboard_items = get_leaderboards(app).keys()
+        task_defs += [("Clasificaciones", "leaderboard", generate_leaderboard_pages_task, leaderboard_items),
+                      ("Índice de clasificaciones", "leaderboard_list", generate_leaderboard_list_pages_task,
+                       [None] if leaderboard_items else [])]
+    return task_defs
+
+
+def _run_parallel_tasks(env_data, task_defs, force_regen, minify_cache_dir, logger):  # noqa: C901
+    num_procs = max(1, cpu_count() - 1 if cpu_count() > 1 else 1)
+    logger.info(f"Pool: {num_procs} procesos.")
+    cfg_tasks = {'LANGUAGES': env_data["languages_to_process"], 'DEFAULT_LANGUAGE': env_data["default_language"],
+                 'OUTPUT_DIR': str(env_data["output_dir_path"]),
+                 'FORCE_REGENERATE_ALL': force_regen,
+                 'MINIFY_CACHE_DIR': minify_cache_dir
+                 }
+    task_args = (cfg_tasks, env_data["manifest"].copy())
+    new_entries = []
+    if not task_defs:
+        return new_entries
+
+    # Logs de los workers: una sola cola hacia el proceso padre, que los escribe con un único handler
+    from app.utils.log_utils import start_log_listener
+    log_queue = Queue(-1)
+    worker_log_handler = logging.StreamHandler()
+    worker_log_handler.setFormatter(logging.Formatter(WORKER_LOG_FORMAT))
+    log_listener = start_log_listener(log_queue, worker_log_handler)
+
+    with Pool(processes=num_procs, initializer=worker_init, initargs=(log_queue,)) as pool:
+        for name, _page_type, func, items in task_defs:
             if items:
                 logger.info(f"Paralelo {name}({len(items)})...")
                 starmap_iterable = [(item, task_args) for item in items]
@@ -549,23 +818,260 @@ def _run_parallel_tasks(env_data, force_regen, author_filter_char_key_for_tasks,
                 logger.info(f"  {name}: {count} entradas de manifest actualizadas/añadidas desde workers.")
             else:
                 logger.info(f"No items para tareas paralelas '{name}'.")
+        # Cierre ordenado: los workers terminan de escribir sus páginas pendientes antes de salir
+        pool.close()
+        pool.join()
+    log_listener.stop()
     return new_entries
 
-def _finalize_generation(manifest,new_entries,out_dir,lang_arg,orig_char_key_cli,logger): # noqa: C901
-    updated=False
+
+def _collect_expected_output_paths(env_data, task_defs, out_dir, sitemap_paths, data_paths=()):
+    """Rutas que una ejecución completa debe dejar en out_dir (páginas, sitemaps, modo shell e índice de búsqueda)."""
+    langs = env_data["languages_to_process"]
+    url_builder = env_data["app"].url_builder
+    # Los sitemaps (con sus partes y copias .gz) los informa el motor de sitemaps al escribirlos
+    expected = {str(out_dir / "index.html")} | set(sitemap_paths) | set(data_paths)
+    for lang in langs:
+        expected.add(str(out_dir / lang / "index.html"))
+    for _name, page_type, _func, items in task_defs:
+        for item in items:
+            url_parts = _item_url_parts(page_type, item, slugify_to_use_global_main)
+            if url_parts is None:
+                continue
+            for lang in langs:
+                expected.add(str(_page_url_and_path(out_dir, lang, url_parts[0], url_parts[1], url_builder)[1]))
+    return expected
+
+
+def _is_generated_output(rel_path, static_dir_name, data_roots=()):
+    """Si rel_path es del generador: páginas index.html, sitemaps, modo shell e índice de búsqueda (no static/ ni public/)."""
+    if rel_path.parts and rel_path.parts[0] == static_dir_name:
+        return False
+    if rel_path.name == "index.html":
+        return True
+    if rel_path.parts and rel_path.parts[0] in data_roots:
+        return True
+    if rel_path.parts == (SHELL_ROUTER_FILE,):
+        return not (PUBLIC_DIR / SHELL_ROUTER_FILE).exists()
+    return len(rel_path.parts) == 1 and rel_path.name.startswith("sitemap") and rel_path.name.endswith((".xml", ".xml.gz"))
+
+
+def _remove_empty_parents(dirs, out_root):
+    """Directorios que quedaron vacíos tras la poda: solo los padres de archivos borrados (de más profundo a menos)."""
+    for dir_obj in sorted(dirs, key=lambda d: len(d.parts), reverse=True):
+        while dir_obj.resolve() != out_root and dir_obj.is_dir() and not any(dir_obj.iterdir()):
+            dir_obj.rmdir()
+            dir_obj = dir_obj.parent
+
+
+def _prune_stale_outputs(app, out_dir, expected_paths, manifest, logger):
+    """
+    Sustituye al rmtree de las ejecuciones completas: borra solo los huérfanos (libros, autores,
+    idiomas o sitemaps que ya no existen) y deja intactas las páginas válidas y sus entradas de manifest.
+    Solo toca out_dir: las entradas de manifest de otros directorios de salida (otro STATIC_SITE_OUTPUT_DIR) se conservan.
+    """
+    static_dir_name = Path(app.static_url_path.strip('/')).name
+    data_roots = {Path(app.config.get(key, default)).parts[0] for key, default in
+                  (('SHELL_DIR', '_shells'), ('SHELL_DATA_DIR', '_data/books'), ('SEARCH_INDEX_DIR', '_search'))}
+    out_root = out_dir.resolve()
+    stale = set()
+    for path_str in [p for p in manifest if p not in expected_paths]:
+        path_obj = Path(path_str)
+        if not path_obj.resolve().is_relative_to(out_root):
+            continue
+        del manifest[path_str]
+        if path_obj.is_file():
+            stale.add(path_obj)
+    if out_dir.exists():
+        for path_obj in out_dir.rglob("*"):
+            if str(path_obj) in expected_paths or not path_obj.is_file():
+                continue
+            if _is_generated_output(path_obj.relative_to(out_dir), static_dir_name, data_roots):
+                stale.add(path_obj)
+    for path_obj in stale:
+        path_obj.unlink()
+    _remove_empty_parents({path_obj.parent for path_obj in stale}, out_root)
+    logger.info(f"Poda de huérfanos: {len(stale)} archivos eliminados, {len(expected_paths)} rutas esperadas.")
+
+
+def _merge_manifest_entries(manifest, new_entries, logger):
+    """
+    Incorpora las entradas de páginas escritas. 'lastmod' (fecha usada en los sitemaps) solo avanza si cambió
+    la firma; regenerar una página idéntica (--force-regenerate, archivo borrado) conserva la fecha anterior.
+    """
+    from app.utils.sitemap_engine import timestamp_to_date_str
     if new_entries:
         logger.info(f"Actualizando manifest: {len(new_entries)} entradas.")
-        updated=True
-        for e in new_entries:
-            manifest[e['path']]={"signature":e['signature'],"timestamp":e['timestamp']}
+    for e in new_entries:
+        prev = manifest.get(e['path']) or {}
+        if prev.get('signature') == e['signature']:
+            lastmod = prev.get('lastmod') or timestamp_to_date_str(prev.get('timestamp') or e['timestamp'])
+        else:
+            lastmod = timestamp_to_date_str(e['timestamp'])
+        manifest[e['path']] = {"signature": e['signature'], "timestamp": e['timestamp'], "lastmod": lastmod}
+
+
+def _absorb_served_pages(app, manifest, logger):
+    """
+    Páginas que el servidor híbrido (STATIC_SITE_SERVING) renderizó y escribió en el sitio desde el último build:
+    se incorporan al manifest para no volver a renderizarlas. El registro se rota antes de leerlo.
+    """
+    log_path = Path(app.config.get('STATIC_SITE_SERVED_LOG', MANIFEST_DIR / 'served_pages.jsonl'))
+    if not log_path.is_file():
+        return []
+    merging_path = log_path.with_name(log_path.name + '.merging')
+    os.replace(log_path, merging_path)
+    latest = {}
+    with open(merging_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if Path(entry.get('path', '')).is_file() and entry.get('signature'):
+                if entry['path'] not in latest or entry['timestamp'] >= latest[entry['path']]['timestamp']:
+                    latest[entry['path']] = entry
+    merging_path.unlink()
+    entries = list(latest.values())
+    if entries:
+        logger.info(f"{len(entries)} páginas escritas por el servidor híbrido incorporadas al manifest.")
+    _merge_manifest_entries(manifest, entries, logger)
+    return entries
+
+
+def _apply_shell_mode(app, task_defs, logger):
+    """Modo shell: solo los libros más populares conservan página de detalle completa. Devuelve (task_defs, libros shell)."""
+    from app.utils.shell_build import split_by_popularity
+    top_n = app.config.get('SHELL_FULL_RENDER_TOP', 1000)
+    shell_books = []
+    for i, (name, page_type, func, items) in enumerate(task_defs):
+        if page_type != "book":
+            continue
+        full_items, shell_books = split_by_popularity(items, top_n)
+        task_defs[i] = (name, page_type, func, full_items)
+        logger.info(f"Modo shell: {len(full_items)} libros con HTML completo, {len(shell_books)} servidos con shell + datos.")
+    return task_defs, shell_books
+
+
+def _write_bytes_if_changed(path_obj, data):
+    if path_obj.is_file() and path_obj.read_bytes() == data:
+        return False
+    path_obj.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path_obj.with_name(f".{path_obj.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path_obj)
+    return True
+
+
+def _generate_book_shells(app, langs, out_dir, shell_books, minify_cache_dir, logger):
+    """
+    Shells de detalle de libro por idioma, fragmentos JSON de datos y router 404.html; cada archivo solo se
+    reescribe si cambió su contenido. Los shells se minifican aquí, como las páginas en los workers.
+    Devuelve todas las rutas de la salida del modo shell (para la poda de huérfanos).
+    """
+    from app.utils.shell_build import shell_book_fields, render_book_shell, build_book_shards, render_shell_router
+    shell_dir = out_dir / app.config.get('SHELL_DIR', '_shells')
+    data_dir = out_dir / app.config.get('SHELL_DATA_DIR', '_data/books')
+    shard_count = app.config.get('SHELL_DATA_SHARDS', 256)
+    all_paths, written = [], 0
+    with app.app_context():
+        book_fields = shell_book_fields(shell_books)
+        outputs = []
+        for lang in langs:
+            html = render_book_shell(app, lang, book_fields).encode('utf-8')
+            if minify_cache_dir:
+                html = minify_html_cached(html, minify_cache_dir)[0]
+            outputs.append((shell_dir / lang / "book.html", html))
+        outputs += [(data_dir / f"{shard_no}.json", data)
+                    for shard_no, data in build_book_shards(shell_books, book_fields, shard_count).items()]
+        if (PUBLIC_DIR / SHELL_ROUTER_FILE).exists():
+            logger.warning(
+                f"public/{SHELL_ROUTER_FILE} existe: no se escribe el router del modo shell (debe cargar los shells él mismo)."
+            )
+        else:
+            outputs.append((out_dir / SHELL_ROUTER_FILE, render_shell_router(app, langs).encode('utf-8')))
+    for path_obj, data in outputs:
+        all_paths.append(str(path_obj))
+        written += _write_bytes_if_changed(path_obj, data)
+    logger.info(
+        f"Modo shell: {written} de {len(outputs)} archivos (shells, fragmentos de datos, router) reescritos; "
+        f"{len(shell_books)} libros."
+    )
+    return all_paths
+
+
+def _generate_search_index(app, out_dir, logger):
+    """
+    Índice de búsqueda estático (app.utils.search_index) de todo el catálogo; solo se reescriben los fragmentos
+    que cambiaron. Devuelve sus rutas (para la poda de huérfanos).
+    """
+    from app.utils.search_index import build_search_index
+    index_dir = out_dir / app.config.get('SEARCH_INDEX_DIR', '_search')
+    previous_ids = {}
+    if SEARCH_DOC_IDS_FILE.is_file():
+        try:
+            with open(SEARCH_DOC_IDS_FILE, 'r', encoding='utf-8') as f:
+                previous_ids = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ids del índice de búsqueda ilegibles ({e}); se reasignan.")
+    files, doc_ids = build_search_index(
+        getattr(app, 'books_data', []) or [], previous_ids,
+        app.config.get('SEARCH_PREFIX_LEN', 2), app.config.get('SEARCH_DOC_BLOCK', 64)
+    )
+    all_paths, written = [], 0
+    for rel_path, data in files.items():
+        path_obj = index_dir / rel_path
+        all_paths.append(str(path_obj))
+        written += _write_bytes_if_changed(path_obj, data)
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    with open(SEARCH_DOC_IDS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(doc_ids, f, ensure_ascii=False, separators=(',', ':'))
+    logger.info(f"Índice de búsqueda: {len(doc_ids['ids'])} documentos, {written} de {len(files)} fragmentos reescritos.")
+    return all_paths
+
+
+def _update_related_books(app, full, logger):
+    """Tabla de libros relacionados (app.utils.related_books) antes de renderizar: los workers la cargan al crear su app."""
+    from app.utils.related_books import refresh_related_table, related_index
+    start = time.time()
+    table, recomputed = refresh_related_table(getattr(app, 'books_data', []) or [], app.config, full=full)
+    app.related_books = related_index(table)
+    logger.info(
+        f"Libros relacionados: {recomputed} de {len(table['keys'])} libros recalculados en {time.time() - start:.1f}s."
+    )
+
+
+def _report_translation_coverage(app, langs, logger):
+    """Informe único de cobertura de traducciones (claves t('...') de las plantillas) en vez de avisos por render."""
+    from app.utils.translations import collect_template_translation_keys
+    manager = getattr(app, 'translations_manager', None)
+    if manager is None:
+        return
+    used_keys = collect_template_translation_keys(app.jinja_env)
+    report = {lang: entry for lang, entry in manager.coverage_report(used_keys).items() if lang in langs}
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    with open(TRANSLATION_COVERAGE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"used_keys": len(used_keys), "languages": report}, f, indent=2, ensure_ascii=False)
+    for lang, entry in report.items():
+        if entry['missing']:
+            missing = entry['missing']
+            logger.warning(f"Traducciones '{lang}': {len(missing)} claves sin traducir: {', '.join(missing)}")
+        if entry['fallback']:
+            logger.info(f"Traducciones '{lang}': {len(entry['fallback'])} claves con fallback a '{manager.default_lang}'.")
+    logger.info(f"Cobertura de traducciones ({len(used_keys)} claves usadas) en {TRANSLATION_COVERAGE_FILE}")
+
+
+def _finalize_generation(manifest, new_entries, sitemaps_rewritten, out_dir, lang_arg, orig_char_key_cli,  # noqa: C901
+                         logger):
+    updated = bool(new_entries) or sitemaps_rewritten > 0
     
     full_run_no_filters = (not lang_arg and not orig_char_key_cli)
     if updated or full_run_no_filters:
         save_manifest(manifest)
         if not updated and full_run_no_filters:
-            logger.info("Ejecución completa sin nuevas entradas de tareas paralelas, manifest guardado (puede haber cambios de sitemaps).")
+            logger.info("Ejecución completa sin páginas ni sitemaps nuevos, manifest guardado.")
     elif not updated:
-        logger.info("Manifest no actualizado (sin cambios de tareas paralelas) y no es ejecución completa. No se guardó.")
+        logger.info("Manifest no actualizado (sin páginas ni sitemaps nuevos) y no es ejecución completa. No se guardó.")
 
     msg=f"Sitio (o parte para idioma '{lang_arg or 'todos'}'"
     if orig_char_key_cli:
@@ -590,21 +1096,65 @@ def main(): # noqa: C901
     sitemap_char_key_from_cli = env_data["char_key_for_sitemap_gen_cli"]
 
     is_fully_unfiltered_cli_run = not args.language and not args.char_key
+    if args.shell_mode and not is_fully_unfiltered_cli_run:
+        script_logger.error(
+            "--shell-mode requiere una ejecución completa (los fragmentos de datos incluyen todo el catálogo). Saliendo."
+        )
+        return
     perform_cleanup = is_fully_unfiltered_cli_run or (args.force_regenerate and is_fully_unfiltered_cli_run)
 
     _prepare_output_directory(app,out_dir,args.language,perform_cleanup,sitemap_char_key_from_cli,script_logger)
+    if is_fully_unfiltered_cli_run:
+        _update_related_books(app, args.force_regenerate, script_logger)  # Con filtros se usa la tabla existente
+    served_manifest_entries = _absorb_served_pages(app, env_data["manifest"], script_logger)
+    # Minificación en el propio render (workers y proceso principal), antes de escribir cada página
+    minify_cache_dir = app.config.get('MINIFY_CACHE_DIR', '.cache/minify') if (
+        app.config.get('MINIFY_HTML_BUILD', True) and not args.no_minify) else None
+    if minify_cache_dir is None:
+        script_logger.info("Minificación de build desactivada.")
     
-    _generate_main_process_pages(
+    main_manifest_entries = _generate_main_process_pages(
         app, env_data["languages_to_process"], out_dir, args.language,
-        args.force_regenerate, sitemap_char_key_from_cli, script_logger
+        args.force_regenerate, sitemap_char_key_from_cli, env_data["manifest"], minify_cache_dir, script_logger
     )
     
-    new_manifest_entries=_run_parallel_tasks(
-        env_data, args.force_regenerate, author_filter_char_key_for_tasks, script_logger
+    task_defs = _build_task_defs(env_data, author_filter_char_key_for_tasks, script_logger)
+    shell_books = None
+    if args.shell_mode:
+        task_defs, shell_books = _apply_shell_mode(app, task_defs, script_logger)
+    new_manifest_entries = main_manifest_entries + _run_parallel_tasks(
+        env_data, task_defs, args.force_regenerate, minify_cache_dir, script_logger)
+    _merge_manifest_entries(env_data["manifest"], new_manifest_entries, script_logger)
+
+    sitemap_paths, sitemaps_rewritten = _generate_sitemaps(
+        app, env_data["languages_to_process"], out_dir, args.language,
+        args.force_regenerate, sitemap_char_key_from_cli, env_data["manifest"], script_logger
     )
+
+    shell_paths = []
+    if shell_books is not None:
+        shell_paths = _generate_book_shells(
+            app, env_data["languages_to_process"], out_dir, shell_books, minify_cache_dir, script_logger
+        )
+
+    search_paths = []
+    if is_fully_unfiltered_cli_run and app.config.get('SEARCH_INDEX_BUILD', True):
+        search_paths = _generate_search_index(app, out_dir, script_logger)
+
+    if is_fully_unfiltered_cli_run:
+        expected_paths = _collect_expected_output_paths(
+            env_data, task_defs, out_dir, sitemap_paths, shell_paths + search_paths
+        )
+        _prune_stale_outputs(app, out_dir, expected_paths, env_data["manifest"], script_logger)
+
+    if minify_cache_dir:
+        removed, kept = prune_minify_cache(minify_cache_dir, app.config.get('MINIFY_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        script_logger.info(f"Caché de minificación: {kept} entradas, {removed} eliminadas por tamaño.")
     
+    _report_translation_coverage(app, env_data["languages_to_process"], script_logger)
     _finalize_generation(
-        env_data["manifest"], new_manifest_entries, out_dir, args.language, args.char_key, script_logger
+        env_data["manifest"], new_manifest_entries + served_manifest_entries, sitemaps_rewritten, out_dir, args.language,
+        args.char_key, script_logger
     )
 
 if __name__=='__main__':
@@ -0,0 +1,37 @@
+# scripts/precompute_related.py
+"""
+Precalcula la tabla de libros relacionados (RELATED_BOOKS_PATH) para el servidor, que la carga al arrancar.
+Sin --full solo se recalculan los libros afectados por los cambios del catálogo desde la última ejecución.
+generate_static.py la actualiza por su cuenta en las ejecuciones completas.
+
+Uso (desde la raíz del proyecto): python scripts/precompute_related.py [--full]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+from app.models.data_loader import load_processed_books  # noqa: E402
+from app.utils.edition_clusters import edition_similarity  # noqa: E402
+from app.utils.related_books import refresh_related_table  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcula los libros relacionados de cada libro del catálogo.")
+    parser.add_argument("--full", action="store_true", help="Recalcular todos los libros ignorando la tabla anterior.")
+    args = parser.parse_args()
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    start = time.time()
+    books = load_processed_books(config['BOOKS_DATA_DIR'], edition_similarity=edition_similarity(config))
+    table, recomputed = refresh_related_table(books, config, full=args.full)
+    print(
+        f"{recomputed} de {len(table['keys'])} libros recalculados en {time.time() - start:.1f}s "
+        f"-> {config['RELATED_BOOKS_PATH']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# tests/conftest.py
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# Los tests importan el paquete app desde la raíz del repositorio
+sys.path.insert(0, str(ROOT))
+
+BOOK_COLUMNS = ('title', 'author_list', 'isbn13', 'categories', 'language', 'numRatings', 'average_rating')
+
+
+def book_row(title, author, isbn13, num_ratings=10, language='English', categories="['Fiction']"):
+    return {
+        'title': title, 'author_list': f"['{author}']", 'isbn13': isbn13, 'categories': categories,
+        'language': language, 'numRatings': num_ratings, 'average_rating': 4.0,
+    }
+
+
+# Catálogo mínimo: dos libros comparten el isbn13 de relleno '9999999999999' (como en el catálogo real)
+BOOKS = [
+    book_row('Alpha Book', 'Ann Author', '9780000000001', num_ratings=300),
+    book_row('Beta Book', 'Bob Writer', '9999999999999', num_ratings=200),
+    book_row('Gamma Book', 'Cat Scribe', '9999999999999', num_ratings=100, language='Spanish'),
+    book_row('Delta Book', 'Dan Poet', '9780000000004', num_ratings=50, categories="['Poetry']"),
+]
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from app.config import Config
+
+    books_dir = tmp_path / 'books'
+    books_dir.mkdir()
+    with open(books_dir / 'books_0.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=BOOK_COLUMNS)
+        writer.writeheader()
+        writer.writerows(BOOKS)
+
+    class TestConfig(Config):
+        TESTING = True
+        DEBUG = True  # Logging por defecto de Flask: sin logs/app.log en el repositorio
+        STATIC_SITE_SERVING = False
+        BOOKS_DATA_DIR = str(books_dir)
+        BESTSELLERS_JSON_PATH = str(tmp_path / 'bestsellers.json')
+        TRANSLATIONS_JSON_PATH = str(ROOT / 'data' / 'translations.json')
+        MINIFY_CACHE_DIR = str(tmp_path / 'cache' / 'minify')
+        TEMPLATE_BYTECODE_CACHE_DIR = str(tmp_path / 'cache' / 'jinja')
+        SEARCH_DB_PATH = str(tmp_path / 'cache' / 'search.sqlite3')
+        RELATED_BOOKS_PATH = str(tmp_path / 'cache' / 'related_books.json')
+        STATIC_SITE_OUTPUT_DIR = str(tmp_path / 'site')
+        LEADERBOARD_MIN_ENTRIES = 1
+
+    return create_app(TestConfig)
@@ -0,0 +1,38 @@
+# tests/test_api_cursor.py
+import base64
+import json
+
+import pytest
+
+
+def _cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _first_page_key(client):
+    response = client.get('/api/v1/authors/na/books?limit=1')
+    assert response.status_code == 200
+    cursor = response.get_json()['next_cursor']
+    return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+
+def test_valid_cursor_pages_through_listing(app):
+    client = app.test_client()
+    key = _first_page_key(client)
+    response = client.get(f'/api/v1/authors/na/books?limit=10&cursor={_cursor(key)}')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == len(app.books_data) - 1
+
+
+@pytest.mark.parametrize('mangle', [
+    lambda key: key[:1] + key[-1:],  # Longitud distinta a la de las claves del listado
+    lambda key: key + ['extra', 0],
+    lambda key: [0] * len(key),  # Tipos distintos
+    lambda key: key[:-1] + ['0'],
+])
+def test_malformed_cursor_is_bad_request(app, mangle):
+    client = app.test_client()
+    key = _first_page_key(client)
+    response = client.get(f'/api/v1/authors/na/books?cursor={_cursor(mangle(key))}')
+    assert response.status_code == 400
+    assert response.get_json()['description'] == "Cursor no válido."
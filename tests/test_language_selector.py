@@ -0,0 +1,24 @@
+# tests/test_language_selector.py
+import re
+
+import pytest
+
+
+def _selector_links(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    selector = re.search(r'class="language-selector">(.*?)</div>', response.get_data(as_text=True), re.S).group(1)
+    return {lang: href for href, lang in re.findall(r'href="([^"]+)" hreflang="([^"]+)"', selector)}
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('/es/mejores/', {'en': '/en/top/', 'de': '/de/bestenliste/'}),
+    ('/es/mejores/top-rated/', {'en': '/en/top/top-rated/', 'fr': '/fr/meilleurs/top-rated/'}),
+    ('/es/mejores/most-rated/fiction/', {'en': '/en/top/most-rated/fiction/', 'it': '/it/migliori/most-rated/fiction/'}),
+    ('/es/libro/na/alpha-book/9780000000001/', {'en': '/en/book/na/alpha-book/9780000000001/'}),
+    ('/es/categoria/', {'de': '/de/kategorie/'}),
+])
+def test_selector_links_use_the_target_language_segment(app, url, expected):
+    links = _selector_links(app.test_client(), url)
+    for lang, href in expected.items():
+        assert links[lang] == href
@@ -0,0 +1,25 @@
+# tests/test_shell_build.py
+import json
+
+from app.utils.shell_build import build_book_shards, identifier_shard, shell_book_fields, shell_record_key
+
+
+def test_shards_keep_books_with_repeated_identifier(app):
+    books = app.books_data
+    fields = shell_book_fields(books)
+    with app.app_context():
+        shards = build_book_shards(books, fields, 4)
+    records = {}
+    for shard_no, payload in shards.items():
+        shard = json.loads(payload)
+        for key, values in shard['books'].items():
+            assert identifier_shard(key, 4) == shard_no
+            records[key] = dict(zip(shard['fields'], values))
+
+    repeated = [book for book in books if book.get('isbn13') == '9999999999999']
+    assert len(repeated) == 2
+    assert len(records) == len(books)
+    for book in repeated:
+        record = records[shell_record_key(book)]
+        assert record['title'] == book['title']
+        assert shell_record_key(book) == f"{book['author_slug']}/{book['title_slug']}/9999999999999"
@@ -0,0 +1,54 @@
+# tests/test_streaming.py
+from flask_minify.parsers import Parser
+
+from app.utils import streaming
+from app.utils.streaming import iter_blocks
+
+ROW = (
+    '<li class="book">\n  <a href="/en/book/na/title-{n}/{n}/">  Title   {n} </a>\n'
+    '  <!-- fila {n} -->\n  <span>  autor  </span>\n</li>\n'
+)
+
+
+def _page(rows):
+    head = (
+        '<!DOCTYPE html>\n<html>\n<head>\n  <title>  Listado  </title>\n'
+        '  <style> body { color : red ; } </style>\n</head>\n<body>\n<ul>\n'
+    )
+    tail = '</ul>\n<pre>  texto   literal\n</pre>\n<script> var a = 1 ;  </script>\n</body>\n</html>\n'
+    return head + ''.join(ROW.format(n=n) for n in range(rows)) + tail
+
+
+def _whole_page_minified(html):
+    parser = Parser(fail_safe=True)
+    parser.update_runtime_options(html=True, js=True, cssless=True)
+    return parser.minify(html, 'html')
+
+
+def _chunks(html, size=53):
+    return [html[i:i + size] for i in range(0, len(html), size)]
+
+
+def test_minified_blocks_match_whole_page():
+    html = _page(300)
+    expected = _whole_page_minified(html)
+    for flush_bytes in (1, 37, 500, 4096, 1 << 20):
+        assert b''.join(iter_blocks(_chunks(html), flush_bytes, True)).decode('utf-8') == expected
+
+
+def test_minifier_buffer_stays_bounded(monkeypatch):
+    peaks = []
+
+    class RecordingParser(streaming._StreamingParser):
+        def take_finished(self):
+            done = super().take_finished()
+            peaks.append(sum(len(piece) for piece in self._data_buffer))
+            return done
+
+    monkeypatch.setattr(streaming, '_StreamingParser', RecordingParser)
+    flush_bytes = 4096
+    html = _page(20000)  # ~2 MB
+    for block in iter_blocks(_chunks(html), flush_bytes, True):
+        assert len(block) < 2 * flush_bytes
+    assert len(peaks) > 100
+    assert max(peaks) < 1024